@@ -0,0 +1,84 @@
+from django.contrib import admin
+from django.core import checks
+from django.utils.text import capfirst
+
+from .models import Deletion, Job, OutgoingEmail
+
+
+@admin.register(Job)
+class JobAdmin(admin.ModelAdmin):
+    list_display = (
+        'pk', 'name', 'status', 'attempts', 'run_after', 'finished'
+    )
+    list_filter = ('status', 'name')
+    search_fields = ('=idempotency_key',)
+    readonly_fields = ('locked_until', 'locked_by', 'last_error')
+
+
+@admin.register(OutgoingEmail)
+class OutgoingEmailAdmin(admin.ModelAdmin):
+    list_display = ('pk', 'recipients', 'status', 'attempts', 'sent')
+    list_filter = ('status',)
+    search_fields = ('recipients',)
+    readonly_fields = ('message', 'locked_until', 'locked_by', 'last_error')
+
+
+class BackgroundDeletionMixin:
+    """Удаление из админки без сбора всех каскадных записей: страница
+    подтверждения их не перечисляет, объект сразу скрывается, а
+    зависимые записи удаляет фоновая задача. Подкласс задаёт функцию
+    скрытия: soft_delete = staticmethod(soft_delete_post)."""
+    soft_delete = None
+
+    def check(self, **kwargs):
+        errors = super().check(**kwargs)
+        if not callable(self.soft_delete):
+            errors.append(checks.Error(
+                'BackgroundDeletionMixin требует soft_delete.',
+                obj=type(self),
+                id='core.E001',
+            ))
+        return errors
+
+    def get_deleted_objects(self, objs, request):
+        perms_needed = set()
+        if not self.has_delete_permission(request):
+            perms_needed.add(self.opts.verbose_name)
+        deleted_objects = [
+            f'{capfirst(self.opts.verbose_name)}: {obj} '
+            f'(связанные записи удалятся в фоне)'
+            for obj in objs
+        ]
+        return (
+            deleted_objects, {self.opts.verbose_name_plural: len(objs)},
+            perms_needed, []
+        )
+
+    def delete_model(self, request, obj):
+        self.soft_delete(obj)
+
+    def delete_queryset(self, request, queryset):
+        for obj in queryset:
+            self.soft_delete(obj)
+
+
+@admin.register(Deletion)
+class DeletionAdmin(admin.ModelAdmin):
+    list_display = (
+        'object_repr', 'content_type', 'status', 'progress', 'step',
+        'created', 'finished'
+    )
+    list_filter = ('status', 'content_type')
+    readonly_fields = (
+        'content_type', 'object_id', 'object_repr', 'status', 'total',
+        'deleted', 'step', 'finished'
+    )
+
+    def has_add_permission(self, request):
+        return False
+
+    def progress(self, obj):
+        if not obj.total:
+            return '—'
+        return f'{min(obj.deleted, obj.total)} из {obj.total}'
+    progress.short_description = 'Удалено'
@@ -0,0 +1,12 @@
+from django.db.backends.sqlite3 import base
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    """SQLite, в котором transaction.atomic() начинается с BEGIN IMMEDIATE.
+    Обычный BEGIN берёт блокировку на запись только при первой записи,
+    и если другой писатель успел раньше, SQLite сразу возвращает
+    «database is locked», не дожидаясь busy_timeout. IMMEDIATE
+    ждёт блокировку в начале транзакции, где ожидание работает."""
+
+    def _start_transaction_under_autocommit(self):
+        self.cursor().execute('BEGIN IMMEDIATE')
@@ -0,0 +1,17 @@
+from django.db import connections
+from django.test.utils import override_settings
+
+
+def bench_database(name: str, **overrides):
+    """Переключает default на временный файл базы для замеров.
+    Возвращает override_settings без кэша и с очередью задач,
+    поверх которых действуют overrides."""
+    connections.close_all()
+    connections['default'].settings_dict['NAME'] = name
+    return override_settings(**{
+        'JOB_QUEUE_EAGER': False,
+        'CACHES': {'default': {
+            'BACKEND': 'django.core.cache.backends.dummy.DummyCache'
+        }},
+        **overrides,
+    })
@@ -0,0 +1,13 @@
+from django.core.cache import DEFAULT_CACHE_ALIAS, caches
+from django.core.cache.backends.dummy import DummyCache
+from django.core.cache.backends.locmem import LocMemCache
+
+
+def shared_cache():
+    """Кэш по умолчанию, если он общий для всех процессов, иначе None.
+    Запись в LocMemCache видна только своему процессу: сброс её
+    в одном процессе не доходит до остальных до истечения таймаута."""
+    cache = caches[DEFAULT_CACHE_ALIAS]
+    if isinstance(cache, (LocMemCache, DummyCache)):
+        return None
+    return cache
@@ -0,0 +1,10 @@
+from django.utils.functional import SimpleLazyObject
+from posts.unread import unread_count
+
+
+def unread(request):
+    """Число новых постов в ленте подписок.
+    Считается лениво: только если шаблон выводит значок."""
+    return {
+        'unread_posts': SimpleLazyObject(lambda: unread_count(request.user))
+    }
@@ -0,0 +1,65 @@
+import os
+
+from django.conf import settings
+from django.db import connections
+
+
+def sqlite_pragmas(connection) -> dict:
+    """Прагмы из SQLITE_PRAGMAS; у базы может быть свой набор
+    в DATABASES[alias]['PRAGMAS'] (например, у реплики)."""
+    pragmas = dict(getattr(settings, 'SQLITE_PRAGMAS', {}))
+    pragmas.update(connection.settings_dict.get('PRAGMAS', {}))
+    return pragmas
+
+
+def configure_sqlite(sender, connection, **kwargs):
+    """Настраивает каждое новое соединение с SQLite: WAL, synchronous,
+    mmap, кэш страниц и ожидание блокировки вместо ошибки
+    «database is locked». Запоминает inode файла базы для
+    проверки persistent-соединений."""
+    if connection.vendor != 'sqlite':
+        return
+    for name, value in sqlite_pragmas(connection).items():
+        connection.connection.execute(f'PRAGMA {name} = {value}')
+    connection.sqlite_inode = database_inode(connection)
+
+
+def database_inode(connection):
+    if connection.is_in_memory_db():
+        return None
+    try:
+        return os.stat(connection.settings_dict['NAME']).st_ino
+    except FileNotFoundError:
+        return None
+
+
+def check_connections(**kwargs):
+    """Проверка persistent-соединений перед запросом.
+    Соединение с файлом, который подменили (восстановление из копии,
+    sync_replica) или удалили, продолжает читать старые данные —
+    такое соединение закрываем, следующий запрос откроет новое."""
+    for connection in connections.all():
+        if connection.vendor != 'sqlite' or connection.connection is None:
+            continue
+        inode = getattr(connection, 'sqlite_inode', None)
+        if inode is not None and inode != database_inode(connection):
+            connection.close()
+
+
+def table_stats(tables, using: str = 'default') -> dict:
+    """Размер таблиц и их индексов по виртуальной таблице dbstat:
+    {имя: (страниц, байт, глубина B-дерева)}."""
+    placeholders = ', '.join(['%s'] * len(tables))
+    with connections[using].cursor() as cursor:
+        cursor.execute(
+            "SELECT s.name, count(*), sum(s.pgsize), "
+            "max(length(s.path) - length(replace(s.path, '/', ''))) "
+            "FROM dbstat AS s JOIN sqlite_master AS m ON m.name = s.name "
+            f"WHERE m.tbl_name IN ({placeholders}) "
+            "GROUP BY s.name ORDER BY s.name",
+            list(tables),
+        )
+        return {
+            name: (pages, size, depth)
+            for name, pages, size, depth in cursor.fetchall()
+        }
@@ -0,0 +1,112 @@
+import time
+
+from django.contrib.contenttypes.models import ContentType
+from django.db import models, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .jobs import enqueue, lease_left
+from .models import Deletion
+
+BATCH_SIZE: int = 500
+# Запуск задачи укладывается в эту долю оставшейся аренды; дальше
+# задача ставит себя снова, и аренда не истечёт посреди удаления,
+# отдав его второму воркеру.
+RUN_LEASE_SHARE: float = 0.5
+
+
+def deletion_plan(model, queryset, seen=()):
+    """Наборы записей в порядке удаления: сначала то, что удалилось бы
+    каскадом вместе с queryset (от листьев), затем сам queryset.
+    Каждый набор — подзапрос по родительскому, а не список id."""
+    seen = (*seen, model)
+    steps = []
+    for relation in model._meta.related_objects:
+        related = relation.related_model
+        if relation.on_delete is not models.CASCADE or related in seen:
+            continue
+        children = related._base_manager.filter(
+            **{f'{relation.field.name}__in': queryset}
+        )
+        steps += deletion_plan(related, children, seen)
+    steps.append(queryset)
+    return steps
+
+
+def schedule_deletion(instance) -> Deletion:
+    """Ставит объект в очередь на фоновое удаление. Скрыть объект
+    до удаления должен вызывающий (например, флагом is_deleted)."""
+    from .tasks import delete_in_batches
+
+    deletion, _ = Deletion.objects.get_or_create(
+        content_type=ContentType.objects.get_for_model(instance),
+        object_id=instance.pk,
+        defaults={'object_repr': str(instance)[:200]},
+    )
+    enqueue(delete_in_batches, deletion.id, key=f'deletion:{deletion.id}:0')
+    return deletion
+
+
+def scheduled_deletions(model):
+    """Подзапрос id объектов модели, поставленных на удаление.
+    Пока удаление идёт, такие объекты должны быть скрыты."""
+    return Deletion.objects.filter(
+        content_type=ContentType.objects.get_for_model(model)
+    ).values('object_id')
+
+
+def is_scheduled_for_deletion(instance) -> bool:
+    return scheduled_deletions(type(instance)).filter(
+        object_id=instance.pk
+    ).exists()
+
+
+def run_deletion(deletion_id: int, batch_size: int = None,
+                 max_batches: int = None, time_limit: float = None) -> bool:
+    """Удаляет пачки по batch_size записей, каждую своей транзакцией:
+    блокировка записи SQLite держится миллисекунды, а не всё удаление.
+    Останавливается после time_limit секунд (по умолчанию доля
+    оставшейся аренды задачи, которую выдал воркер) или max_batches
+    пачек; прерванное удаление продолжается с того же места.
+    Возвращает True, когда удалено всё."""
+    batch_size = batch_size or BATCH_SIZE
+    if time_limit is None:
+        time_limit = lease_left() * RUN_LEASE_SHARE
+    deadline = time.monotonic() + time_limit
+    deletion = Deletion.objects.select_related('content_type').get(
+        id=deletion_id
+    )
+    if deletion.status == Deletion.DONE:
+        return True
+    model = deletion.content_type.model_class()
+    steps = deletion_plan(
+        model, model._base_manager.filter(pk=deletion.object_id)
+    )
+    progress = Deletion.objects.filter(id=deletion_id)
+    if deletion.total is None:
+        # Оценка: запись, достижимая двумя путями, считается дважды.
+        progress.update(
+            total=sum(step.count() for step in steps),
+            status=Deletion.RUNNING,
+        )
+    batches = 0
+    for step in steps:
+        label = step.model._meta.verbose_name_plural
+        while True:
+            ids = list(
+                step.order_by().values_list('pk', flat=True)[:batch_size]
+            )
+            if not ids:
+                break
+            if batches and (
+                batches == max_batches or time.monotonic() >= deadline
+            ):
+                return False
+            with transaction.atomic():
+                deleted = step.model._base_manager.filter(
+                    pk__in=ids
+                ).delete()[0]
+                progress.update(deleted=F('deleted') + deleted, step=label)
+            batches += 1
+    progress.update(status=Deletion.DONE, step='', finished=timezone.now())
+    return True
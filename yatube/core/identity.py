@@ -0,0 +1,37 @@
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+_identity_map = ContextVar('identity_map', default=None)
+
+
+class IdentityMap:
+    """Объекты, уже загруженные в текущем запросе, по модели
+    и значению уникального поля. Повторный поиск того же объекта
+    не идёт в базу и возвращает тот же экземпляр."""
+
+    def __init__(self):
+        self.objects = {}
+
+    def get(self, model, field: str, value):
+        return self.objects.get((model, field, value))
+
+    def add(self, instance, fields=()):
+        """Запоминает объект по pk и по уникальным полям fields."""
+        model = type(instance)
+        for field in ('pk', *fields):
+            self.objects[(model, field, getattr(instance, field))] = instance
+        return instance
+
+
+def current_map():
+    """Реестр текущего запроса; вне запроса — None."""
+    return _identity_map.get()
+
+
+@contextmanager
+def identity_scope():
+    token = _identity_map.set(IdentityMap())
+    try:
+        yield _identity_map.get()
+    finally:
+        _identity_map.reset(token)
@@ -0,0 +1,239 @@
+import json
+import random
+import traceback
+import uuid
+from contextvars import ContextVar
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Max, Min
+from django.utils import timezone
+
+from .models import Job
+
+TASKS = {}
+METRICS_SAMPLE: int = 10000
+
+# Задача, которую выполняет текущий поток воркера.
+current_job = ContextVar('current_job', default=None)
+
+
+def task(func=None, *, max_attempts: int = None):
+    """Регистрирует функцию как фоновую задачу под именем
+    module.function. Задачи должны быть идемпотентны: после
+    истечения аренды задачу может повторить другой воркер."""
+    def register(func):
+        func.task_name = f'{func.__module__}.{func.__name__}'
+        func.max_attempts = max_attempts or settings.JOB_MAX_ATTEMPTS
+        TASKS[func.task_name] = func
+        return func
+    return register(func) if func is not None else register
+
+
+def enqueue(func, *args, key: str = None, delay: float = 0, **kwargs):
+    """Ставит задачу в очередь после фиксации текущей транзакции.
+    Повторная постановка с тем же key не создаёт вторую задачу,
+    а упавшую с этим ключом перезапускает.
+    С JOB_QUEUE_EAGER задача выполняется сразу, без очереди."""
+    if settings.JOB_QUEUE_EAGER:
+        func(*args, **kwargs)
+        return
+    transaction.on_commit(
+        lambda: create_job(func, args, kwargs, key=key, delay=delay)
+    )
+
+
+def create_job(func, args=(), kwargs=None, key: str = None,
+               delay: float = 0):
+    fields = {
+        'name': func.task_name,
+        'payload': json.dumps({'args': list(args), 'kwargs': kwargs or {}}),
+        'max_attempts': func.max_attempts,
+        'run_after': timezone.now() + timedelta(seconds=delay),
+    }
+    if key is None:
+        return Job.objects.create(**fields)
+    try:
+        with transaction.atomic():
+            job = Job.objects.get_or_create(
+                idempotency_key=key, defaults=fields
+            )[0]
+    except IntegrityError:
+        job = Job.objects.get(idempotency_key=key)
+    if job.status == Job.FAILED:
+        # Иначе ключ упавшей задачи навсегда запрещал бы эту работу.
+        Job.objects.filter(id=job.id, status=Job.FAILED).update(
+            status=Job.QUEUED, attempts=0, locked_until=None, locked_by='',
+            started=None, finished=None, **fields
+        )
+        job.refresh_from_db()
+    return job
+
+
+def backoff(attempts: int) -> float:
+    """Экспоненциальная пауза перед повтором со случайным разбросом."""
+    delay = min(
+        settings.JOB_RETRY_BACKOFF * 2 ** (attempts - 1),
+        settings.JOB_RETRY_MAX_DELAY,
+    )
+    return delay * random.uniform(0.5, 1.0)
+
+
+def lease_rows(worker: str, limit: int, ready, expired=None,
+               visibility: float = None, **fields):
+    """Берёт в аренду до limit строк: сначала из ready, затем
+    с истёкшей арендой упавших воркеров из expired (оба набора уже
+    упорядочены). Строки помечаются уникальным токеном locked_by
+    и locked_until; UPDATE с условиями наборов гарантирует, что строку
+    получит только один воркер. fields дописываются в те же строки.
+    Возвращает токен или None, если брать нечего."""
+    visibility = visibility or settings.JOB_VISIBILITY_TIMEOUT
+    token = f'{worker}:{uuid.uuid4().hex[:12]}'
+    with transaction.atomic():
+        ids = list(ready.values_list('id', flat=True)[:limit])
+        if expired is not None and len(ids) < limit:
+            ids += list(
+                expired.values_list('id', flat=True)[:limit - len(ids)]
+            )
+        if not ids:
+            return None
+        free = ready.order_by()
+        if expired is not None:
+            free |= expired.order_by()
+        free.filter(id__in=ids).update(
+            locked_by=token,
+            locked_until=timezone.now() + timedelta(seconds=visibility),
+            **fields,
+        )
+    return token
+
+
+def claim(worker: str, limit: int, visibility: float = None):
+    """Берёт в аренду до limit готовых задач, включая задачи
+    с истёкшей арендой упавших воркеров."""
+    now = timezone.now()
+    token = lease_rows(
+        worker, limit,
+        Job.objects.filter(status=Job.QUEUED, run_after__lte=now)
+        .order_by('run_after'),
+        Job.objects.filter(status=Job.RUNNING, locked_until__lt=now)
+        .order_by('locked_until'),
+        visibility,
+        status=Job.RUNNING, attempts=F('attempts') + 1, started=now,
+    )
+    if token is None:
+        return []
+    return list(Job.objects.filter(locked_by=token, status=Job.RUNNING))
+
+
+def run_job(job) -> bool:
+    """Выполняет задачу и записывает результат.
+    Если аренда уже перешла к другому воркеру, результат не пишется."""
+    if give_up(job):
+        return False
+    return finish_job(job, execute_job(job))
+
+
+def give_up(job) -> bool:
+    """Воркер падал на этой задаче, пока не кончились попытки:
+    задача помечается упавшей без запуска."""
+    if job.attempts <= job.max_attempts:
+        return False
+    Job.objects.filter(id=job.id, locked_by=job.locked_by).update(
+        status=Job.FAILED, finished=timezone.now(),
+        last_error=job.last_error or 'Истекла аренда',
+    )
+    return True
+
+
+def execute_job(job):
+    """Вызывает функцию задачи. Возвращает текст ошибки или None."""
+    token = current_job.set(job)
+    try:
+        func = TASKS[job.name]
+        payload = json.loads(job.payload)
+        func(*payload['args'], **payload['kwargs'])
+    except Exception:
+        return traceback.format_exc()
+    finally:
+        current_job.reset(token)
+    return None
+
+
+def finish_job(job, error: str = None) -> bool:
+    """Записывает результат задачи, пока её аренда у этого воркера:
+    готова, повтор после паузы или упала, если попытки кончились."""
+    leased = Job.objects.filter(id=job.id, locked_by=job.locked_by)
+    if error is None:
+        leased.update(
+            status=Job.DONE, finished=timezone.now(), locked_until=None
+        )
+        return True
+    if job.attempts >= job.max_attempts:
+        leased.update(
+            status=Job.FAILED, finished=timezone.now(), last_error=error
+        )
+    else:
+        leased.update(
+            status=Job.QUEUED,
+            run_after=timezone.now() + timedelta(
+                seconds=backoff(job.attempts)
+            ),
+            locked_until=None,
+            last_error=error,
+        )
+    return False
+
+
+def lease_left() -> float:
+    """Сколько секунд осталось до конца аренды выполняемой задачи.
+    Вне воркера — JOB_VISIBILITY_TIMEOUT."""
+    job = current_job.get()
+    if job is None or job.locked_until is None:
+        return settings.JOB_VISIBILITY_TIMEOUT
+    return max((job.locked_until - timezone.now()).total_seconds(), 0)
+
+
+def purge_finished(older_than: float = None) -> int:
+    """Удаляет выполненные и упавшие задачи старше JOB_RETENTION
+    секунд. До этого ключи выполненных задач продолжают действовать,
+    а упавшие можно разобрать и перезапустить повторной постановкой."""
+    older_than = older_than or settings.JOB_RETENTION
+    deadline = timezone.now() - timedelta(seconds=older_than)
+    return Job.objects.filter(
+        status__in=(Job.DONE, Job.FAILED), finished__lt=deadline
+    ).delete()[0]
+
+
+def queue_metrics() -> dict:
+    """Глубина очереди по состояниям и задержки в секундах:
+    сколько ждёт самая старая готовая задача и средняя задержка
+    начала выполнения за последний час."""
+    now = timezone.now()
+    depth = dict.fromkeys((status for status, _ in Job.STATUSES), 0)
+    depth.update(
+        Job.objects.order_by().values_list('status')
+        .annotate(count=Count('id'))
+    )
+    ready = Job.objects.filter(status=Job.QUEUED, run_after__lte=now)
+    oldest = ready.aggregate(oldest=Min('run_after'))['oldest']
+    recent = list(
+        Job.objects.filter(started__gte=now - timedelta(hours=1))
+        .exclude(status=Job.QUEUED)
+        .values_list('started', 'run_after')[:METRICS_SAMPLE]
+    )
+    waits = [(started - run_after).total_seconds()
+             for started, run_after in recent]
+    last_finished = (
+        Job.objects.filter(status=Job.DONE)
+        .aggregate(last=Max('finished'))['last']
+    )
+    return {
+        'depth': depth,
+        'ready': ready.count(),
+        'oldest_ready_age': (now - oldest).total_seconds() if oldest else 0,
+        'avg_start_delay': sum(waits) / len(waits) if waits else 0,
+        'started_last_hour': len(waits),
+        'last_finished': last_finished.isoformat() if last_finished else None,
+    }
@@ -0,0 +1,163 @@
+import base64
+import json
+import traceback
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import EmailMultiAlternatives, get_connection
+from django.core.mail.backends.base import BaseEmailBackend
+from django.db.models import F
+from django.utils import timezone
+
+from .jobs import backoff, enqueue, lease_rows
+from .models import OutgoingEmail
+
+
+def dump_message(message) -> str:
+    """Сериализует EmailMessage в JSON. Вложения поддерживаются
+    в виде кортежей (имя, содержимое, тип), как их добавляет attach()."""
+    attachments = []
+    for filename, content, mimetype in message.attachments:
+        is_bytes = isinstance(content, bytes)
+        attachments.append([
+            filename,
+            base64.b64encode(content).decode() if is_bytes else content,
+            mimetype,
+            is_bytes,
+        ])
+    return json.dumps({
+        'subject': message.subject,
+        'body': message.body,
+        'from_email': message.from_email,
+        'to': message.to,
+        'cc': message.cc,
+        'bcc': message.bcc,
+        'reply_to': message.reply_to,
+        'headers': message.extra_headers,
+        'content_subtype': message.content_subtype,
+        'alternatives': getattr(message, 'alternatives', []),
+        'attachments': attachments,
+    }, ensure_ascii=False)
+
+
+def load_message(data: str, connection=None):
+    fields = json.loads(data)
+    message = EmailMultiAlternatives(
+        subject=fields['subject'],
+        body=fields['body'],
+        from_email=fields['from_email'],
+        to=fields['to'],
+        cc=fields['cc'],
+        bcc=fields['bcc'],
+        reply_to=fields['reply_to'],
+        headers=fields['headers'],
+        alternatives=[tuple(item) for item in fields['alternatives']],
+        connection=connection,
+    )
+    message.content_subtype = fields['content_subtype']
+    for filename, content, mimetype, is_bytes in fields['attachments']:
+        message.attach(
+            filename, base64.b64decode(content) if is_bytes else content,
+            mimetype
+        )
+    return message
+
+
+class QueuedEmailBackend(BaseEmailBackend):
+    """Почтовый бэкенд, который только кладёт письма в OutgoingEmail.
+    Запрос не ждёт почтового сервера; отправляет их воркер
+    задачей deliver_queued_email через QUEUED_EMAIL_BACKEND."""
+
+    def send_messages(self, email_messages):
+        now = timezone.now()
+        emails = [
+            OutgoingEmail(
+                message=dump_message(message),
+                recipients=', '.join(message.recipients()),
+                send_after=now,
+            )
+            for message in email_messages if message.recipients()
+        ]
+        if not emails:
+            return 0
+        OutgoingEmail.objects.bulk_create(emails)
+        from .tasks import deliver_queued_email
+
+        enqueue(deliver_queued_email)
+        return len(emails)
+
+
+def claim_emails(worker: str, limit: int):
+    """Берёт в аренду пачку писем (core.jobs.lease_rows):
+    письма упавшего воркера вернутся в работу после аренды."""
+    now = timezone.now()
+    token = lease_rows(
+        worker, limit,
+        OutgoingEmail.objects.filter(
+            status=OutgoingEmail.PENDING, send_after__lte=now
+        ).order_by('send_after'),
+        OutgoingEmail.objects.filter(
+            status=OutgoingEmail.SENDING, locked_until__lt=now
+        ).order_by('locked_until'),
+        status=OutgoingEmail.SENDING, attempts=F('attempts') + 1,
+    )
+    if token is None:
+        return []
+    return list(
+        OutgoingEmail.objects.filter(
+            locked_by=token, status=OutgoingEmail.SENDING
+        ).order_by('id')
+    )
+
+
+def retry_later(emails, error: str) -> None:
+    for email in emails:
+        leased = OutgoingEmail.objects.filter(
+            id=email.id, locked_by=email.locked_by
+        )
+        if email.attempts >= settings.EMAIL_MAX_ATTEMPTS:
+            leased.update(status=OutgoingEmail.FAILED, last_error=error)
+        else:
+            leased.update(
+                status=OutgoingEmail.PENDING,
+                send_after=timezone.now() + timedelta(
+                    seconds=backoff(email.attempts)
+                ),
+                locked_until=None,
+                last_error=error,
+            )
+
+
+def deliver_batch(worker: str = 'mail', batch_size: int = None) -> int:
+    """Отправляет пачку писем через одно соединение.
+    Письмо помечается отправленным только после того, как его
+    принял сервер, поэтому падение воркера не теряет писем
+    (в худшем случае письмо уйдёт повторно)."""
+    emails = claim_emails(worker, batch_size or settings.EMAIL_BATCH_SIZE)
+    if not emails:
+        return 0
+    connection = get_connection(settings.QUEUED_EMAIL_BACKEND)
+    sent, failed = [], []
+    try:
+        connection.open()
+    except Exception:
+        retry_later(emails, traceback.format_exc())
+        return 0
+    try:
+        for email in emails:
+            try:
+                connection.send_messages(
+                    [load_message(email.message, connection)]
+                )
+            except Exception:
+                failed.append((email, traceback.format_exc()))
+            else:
+                sent.append(email.id)
+    finally:
+        connection.close()
+    OutgoingEmail.objects.filter(id__in=sent).update(
+        status=OutgoingEmail.SENT, sent=timezone.now(), locked_until=None
+    )
+    for email, error in failed:
+        retry_later([email], error)
+    return len(sent)
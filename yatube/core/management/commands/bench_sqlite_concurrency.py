@@ -0,0 +1,121 @@
+import logging
+import multiprocessing
+import os
+import shutil
+import tempfile
+import time
+from collections import Counter
+
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+from django.db import OperationalError, connections
+from django.test import Client
+from django.urls import reverse
+from posts.models import Post, User
+
+from core.bench import bench_database
+
+# Прагмы SQLite по умолчанию: журнал отката, без ожидания блокировки.
+DEFAULT_PRAGMAS = {'journal_mode': 'DELETE', 'busy_timeout': 0}
+
+
+class Command(BaseCommand):
+    help = (
+        'Замеряет пропускную способность чтения страниц, пока писатели '
+        'создают посты и комментарии: SQLite по умолчанию против '
+        'профиля SQLITE_PRAGMAS. Работает на временной копии схемы.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--readers', type=int, default=4)
+        parser.add_argument('--writers', type=int, default=2)
+        parser.add_argument('--seconds', type=float, default=5.0)
+
+    def handle(self, *args, **options):
+        workdir = tempfile.mkdtemp()
+        try:
+            template = os.path.join(workdir, 'template.sqlite3')
+            with bench_database(template, SQLITE_PRAGMAS=DEFAULT_PRAGMAS):
+                call_command('migrate', verbosity=0)
+                self.populate()
+            # Ошибки блокировки считаются, а не пишутся в лог.
+            logging.getLogger('django.request').setLevel(logging.CRITICAL)
+            for number, (title, overrides) in enumerate((
+                ('по умолчанию', {'SQLITE_PRAGMAS': DEFAULT_PRAGMAS}),
+                ('SQLITE_PRAGMAS', {}),
+            )):
+                name = os.path.join(workdir, f'{number}.sqlite3')
+                shutil.copy(template, name)
+                with bench_database(name, **overrides):
+                    self.report(title, self.run(options))
+        finally:
+            shutil.rmtree(workdir)
+
+    def populate(self):
+        self.author = User.objects.create_user(username='bench_author')
+        self.post = Post.objects.create(author=self.author, text='Пост')
+
+    def run(self, options):
+        """Читатели и писатели — отдельные процессы, чтобы SQLite,
+        а не GIL, решал, кто ждёт."""
+        deadline = time.time() + options['seconds']
+        results = multiprocessing.Queue()
+        connections.close_all()
+        processes = [
+            multiprocessing.Process(
+                target=self.worker, args=(write, deadline, results)
+            )
+            for write in (
+                [False] * options['readers'] + [True] * options['writers']
+            )
+        ]
+        for process in processes:
+            process.start()
+        counts = Counter()
+        for _ in processes:
+            counts.update(results.get())
+        for process in processes:
+            process.join()
+        counts['seconds'] = options['seconds']
+        return counts
+
+    def worker(self, write: bool, deadline: float, results):
+        client = Client()
+        urls = (
+            reverse('posts:post_detail', args=(self.post.id,)),
+            reverse('posts:profile', args=(self.author.username,)),
+        )
+        counts = Counter()
+        number = 0
+        while time.time() < deadline:
+            number += 1
+            kind = 'write' if write else 'read'
+            try:
+                if write and not client.session.session_key:
+                    client.force_login(self.author)
+                self.request(client, write, number, urls)
+            except OperationalError:
+                kind = 'locked'
+            counts[kind] += 1
+        connections.close_all()
+        results.put(counts)
+
+    def request(self, client, write: bool, number: int, urls):
+        if not write:
+            client.get(urls[number % 2])
+        elif number % 2:
+            client.post(reverse('posts:post_create'),
+                        {'text': f'Пост {number}'})
+        else:
+            client.post(
+                reverse('posts:add_comment', args=(self.post.id,)),
+                {'text': f'Комментарий {number}'}
+            )
+
+    def report(self, title, counts):
+        seconds = counts['seconds']
+        self.stdout.write(
+            f'{title}: чтений {counts["read"] / seconds:.0f}/с, '
+            f'записей {counts["write"] / seconds:.0f}/с, '
+            f'ошибок блокировки {counts["locked"]}'
+        )
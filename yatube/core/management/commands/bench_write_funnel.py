@@ -0,0 +1,150 @@
+import logging
+import multiprocessing
+import os
+import shutil
+import tempfile
+import threading
+import time
+
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+from django.db import OperationalError, connections
+from django.test import Client
+from django.urls import reverse
+from posts.models import Post, User
+
+from core.bench import bench_database
+from core.writer import WriteTimeout
+
+
+class Command(BaseCommand):
+    help = (
+        'Замеряет запись комментариев и подписок писателями, разложенными '
+        'по процессам и потокам (--layouts 50x1,2x25: процессов x '
+        'потоков): каждый пишет сам против записи через поток-писатель '
+        'WRITE_FUNNEL. Работает на временной копии схемы.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--layouts', default='50x1,2x25')
+        parser.add_argument('--seconds', type=float, default=5.0)
+
+    def handle(self, *args, **options):
+        layouts = [
+            tuple(int(part) for part in layout.split('x'))
+            for layout in options['layouts'].split(',')
+        ]
+        workdir = tempfile.mkdtemp()
+        try:
+            template = os.path.join(workdir, 'template.sqlite3')
+            with bench_database(template, WRITE_FUNNEL=False):
+                call_command('migrate', verbosity=0)
+                self.populate(max(
+                    processes * threads for processes, threads in layouts
+                ))
+            logging.getLogger('django.request').setLevel(logging.CRITICAL)
+            for number, ((processes, threads), funnel) in enumerate(
+                (layout, funnel) for layout in layouts
+                for funnel in (False, True)
+            ):
+                name = os.path.join(workdir, f'{number}.sqlite3')
+                # Закрытие соединения переносит WAL в файл базы.
+                connections.close_all()
+                shutil.copy(template, name)
+                title = (
+                    f'{processes} x {threads}, '
+                    + ('WRITE_FUNNEL' if funnel else 'каждый пишет сам')
+                )
+                with bench_database(name, WRITE_FUNNEL=funnel):
+                    self.report(
+                        title, self.run(processes, threads, options['seconds'])
+                    )
+        finally:
+            shutil.rmtree(workdir)
+
+    def populate(self, writers: int):
+        self.author = User.objects.create_user(username='bench_author')
+        self.post = Post.objects.create(author=self.author, text='Пост')
+        User.objects.bulk_create(
+            User(username=f'writer_{number}') for number in range(writers)
+        )
+        self.users = list(User.objects.filter(username__startswith='writer_'))
+
+    def run(self, processes: int, threads: int, seconds: float):
+        """Писатели — отдельные процессы, как воркеры gunicorn,
+        по threads потоков в каждом."""
+        deadline = time.time() + seconds
+        results = multiprocessing.Queue()
+        connections.close_all()
+        workers = [
+            multiprocessing.Process(
+                target=self.process,
+                args=(self.users[number * threads:(number + 1) * threads],
+                      deadline, results)
+            )
+            for number in range(processes)
+        ]
+        for worker in workers:
+            worker.start()
+        latencies, errors = [], 0
+        for _ in workers:
+            process_latencies, process_errors = results.get()
+            latencies += process_latencies
+            errors += process_errors
+        for worker in workers:
+            worker.join()
+        return seconds, sorted(latencies), errors
+
+    def process(self, users, deadline: float, results):
+        latencies, errors = [], []
+        threads = [
+            threading.Thread(
+                target=self.writer, args=(user, deadline, latencies, errors)
+            )
+            for user in users
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        results.put((latencies, len(errors)))
+
+    def writer(self, user, deadline: float, latencies, errors):
+        client = Client()
+        client.force_login(user)
+        comment = reverse('posts:add_comment', args=(self.post.id,))
+        follow = reverse('posts:profile_follow', args=(self.author.username,))
+        unfollow = reverse(
+            'posts:profile_unfollow', args=(self.author.username,)
+        )
+        number = 0
+        while time.time() < deadline:
+            number += 1
+            started = time.monotonic()
+            try:
+                if number % 2:
+                    client.post(comment, {'text': f'Комментарий {number}'})
+                else:
+                    client.post(follow if number % 4 else unfollow)
+            except (OperationalError, WriteTimeout) as error:
+                errors.append(error)
+            else:
+                latencies.append(time.monotonic() - started)
+        connections.close_all()
+
+    def report(self, title, result):
+        seconds, latencies, errors = result
+        if not latencies:
+            self.stdout.write(
+                f'{title}: ни одной записи, ошибок {errors}'
+            )
+            return
+
+        def percentile(share):
+            return latencies[int(share * (len(latencies) - 1))] * 1000
+
+        self.stdout.write(
+            f'{title}: {len(latencies) / seconds:.0f} записей/с, '
+            f'задержка p50 {percentile(0.5):.0f} мс, '
+            f'p99 {percentile(0.99):.0f} мс, ошибок {errors}'
+        )
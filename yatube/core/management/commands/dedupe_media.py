@@ -0,0 +1,110 @@
+import os
+from collections import Counter
+
+from django.conf import settings
+from django.core.files import File
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count
+from posts.models import ArchivedPost, Post
+from sorl.thumbnail import delete as delete_thumbnails
+from sorl.thumbnail.conf import settings as thumbnail_settings
+from sorl.thumbnail.images import ImageFile
+
+from core.models import MediaBlob
+from core.storage import content_hash, hashed_name, name_digest
+
+
+class Command(BaseCommand):
+    help = (
+        'Переименовывает файлы MEDIA_ROOT по содержимому, удаляет дубликаты '
+        'и пересчитывает ссылки на них.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dry-run', action='store_true',
+            help='Только показать, что будет сделано.'
+        )
+
+    def iter_media_files(self, root):
+        """Обходит MEDIA_ROOT, пропуская каталог миниатюр sorl."""
+        thumbnail_dir = os.path.join(
+            root, thumbnail_settings.THUMBNAIL_PREFIX.strip('/')
+        )
+        for dirpath, dirnames, filenames in os.walk(root):
+            if os.path.abspath(dirpath) == os.path.abspath(thumbnail_dir):
+                dirnames[:] = []
+                continue
+            for filename in filenames:
+                path = os.path.join(dirpath, filename)
+                yield os.path.relpath(path, root).replace(os.sep, '/')
+
+    def handle(self, *args, **options):
+        dry_run = options['dry_run']
+        root = settings.MEDIA_ROOT
+        moved = removed = reclaimed = 0
+        for name in list(self.iter_media_files(root)):
+            path = os.path.join(root, name)
+            with open(path, 'rb') as source:
+                digest = content_hash(File(source))
+            # Файл уже назван по своему содержимому: повторный запуск
+            # его не трогает.
+            if name_digest(name) == digest:
+                continue
+            target = hashed_name(name, digest)
+            target_path = os.path.join(root, target)
+            duplicate = os.path.exists(target_path)
+            if duplicate:
+                removed += 1
+                reclaimed += os.path.getsize(path)
+            else:
+                moved += 1
+            self.stdout.write(
+                f'{name} -> {target}{" (дубликат)" if duplicate else ""}'
+            )
+            if dry_run:
+                continue
+            with transaction.atomic():
+                Post.objects.filter(image=name).update(image=target)
+                ArchivedPost.objects.filter(image=name).update(image=target)
+                if duplicate:
+                    os.remove(path)
+                else:
+                    os.makedirs(os.path.dirname(target_path), exist_ok=True)
+                    os.replace(path, target_path)
+            delete_thumbnails(
+                ImageFile(name, storage=default_storage), delete_file=False
+            )
+        if not dry_run:
+            self.recount_refs()
+        self.stdout.write(self.style.SUCCESS(
+            f'Перемещено: {moved}, удалено дубликатов: {removed}, '
+            f'освобождено байт: {reclaimed}'
+        ))
+
+    def recount_refs(self):
+        """Пересчитывает MediaBlob по фактическим ссылкам из постов,
+        в том числе архивных."""
+        counts = Counter()
+        for model in (Post, ArchivedPost):
+            rows = (
+                model.objects.exclude(image='').exclude(image__isnull=True)
+                .order_by().values_list('image').annotate(refs=Count('id'))
+            )
+            for name, refs in rows.iterator():
+                counts[name] += refs
+        with transaction.atomic():
+            MediaBlob.objects.all().delete()
+            MediaBlob.objects.bulk_create(
+                MediaBlob(
+                    name=name,
+                    refs=refs,
+                    size=(
+                        default_storage.size(name)
+                        if default_storage.exists(name) else 0
+                    ),
+                )
+                for name, refs in counts.items()
+            )
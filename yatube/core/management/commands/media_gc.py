@@ -0,0 +1,216 @@
+import os
+import time
+from collections import namedtuple
+from itertools import chain
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand
+from posts.models import ArchivedPost, Post
+from sorl.thumbnail import default
+from sorl.thumbnail.conf import settings as thumbnail_settings
+from sorl.thumbnail.helpers import deserialize
+from sorl.thumbnail.images import ImageFile
+from sorl.thumbnail.kvstores.base import add_prefix, del_prefix
+from sorl.thumbnail.models import KVStore
+
+from core.models import MediaBlob
+
+CHUNK_SIZE: int = 2000
+
+# Хранилищу ключей sorl от исходника нужен только его ключ.
+SourceKey = namedtuple('SourceKey', 'key')
+
+
+def referenced_images():
+    """Потоково отдаёт имена картинок, на которые ссылаются посты,
+    в том числе архивные."""
+    return chain.from_iterable(
+        model.objects.exclude(image='').exclude(image__isnull=True)
+        .order_by().values_list('image', flat=True)
+        .iterator(chunk_size=CHUNK_SIZE)
+        for model in (Post, ArchivedPost)
+    )
+
+
+def still_referenced(names) -> set:
+    """Имена из names, на которые сейчас ссылаются посты
+    или счётчики MediaBlob."""
+    alive = set(
+        MediaBlob.objects.filter(name__in=names, refs__gt=0)
+        .values_list('name', flat=True)
+    )
+    for model in (Post, ArchivedPost):
+        alive.update(
+            model.objects.filter(image__in=names)
+            .values_list('image', flat=True)
+        )
+    return alive
+
+
+def scan_files(root, skip=None):
+    """Лениво обходит каталог, отдавая (имя, размер, mtime).
+    Каталог skip вместе с содержимым пропускается."""
+    if not os.path.isdir(root):
+        return
+    stack = [root]
+    while stack:
+        with os.scandir(stack.pop()) as entries:
+            for entry in entries:
+                if entry.is_dir(follow_symlinks=False):
+                    if skip is None or entry.path != skip:
+                        stack.append(entry.path)
+                elif entry.is_file(follow_symlinks=False):
+                    stat = entry.stat()
+                    yield entry.path, stat.st_size, stat.st_mtime
+
+
+class Command(BaseCommand):
+    help = (
+        'Удаляет из MEDIA_ROOT картинки, на которые не ссылается ни один '
+        'пост, и миниатюры sorl удалённых или заменённых картинок.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dry-run', action='store_true',
+            help='Только посчитать, сколько места можно освободить.'
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=500,
+            help='Сколько файлов удалять за одну пачку.'
+        )
+        parser.add_argument(
+            '--sleep', type=float, default=0.5,
+            help='Пауза между пачками, секунд.'
+        )
+        parser.add_argument(
+            '--min-age', type=int, default=3600,
+            help='Не трогать файлы моложе этого возраста, секунд: '
+                 'их пост может быть ещё не сохранён.'
+        )
+
+    def handle(self, *args, **options):
+        self.dry_run = options['dry_run']
+        self.verbosity = options['verbosity']
+        self.batch_size = options['batch_size']
+        self.sleep = options['sleep']
+        self.deadline = time.time() - options['min_age']
+        root = os.path.abspath(settings.MEDIA_ROOT)
+        thumbnail_root = os.path.join(
+            root, thumbnail_settings.THUMBNAIL_PREFIX.strip('/')
+        )
+
+        referenced = set(referenced_images())
+        live_thumbnails, dead_sources = self.collect_thumbnails(referenced)
+
+        originals = self.collect(
+            scan_files(root, skip=thumbnail_root), root,
+            lambda name: name in referenced,
+        )
+        thumbnails = self.collect(
+            scan_files(thumbnail_root), root,
+            lambda name: name in live_thumbnails,
+        )
+        originals_count, originals_bytes = self.sweep(originals, release=True)
+        thumbnails_count, thumbnails_bytes = self.sweep(thumbnails)
+        if not self.dry_run:
+            self.forget_sources(dead_sources)
+
+        verb = 'Можно удалить' if self.dry_run else 'Удалено'
+        self.stdout.write(self.style.SUCCESS(
+            f'{verb}: картинок {originals_count} '
+            f'({originals_bytes} байт), миниатюр {thumbnails_count} '
+            f'({thumbnails_bytes} байт), '
+            f'всего {originals_bytes + thumbnails_bytes} байт.'
+        ))
+
+    def collect_thumbnails(self, referenced):
+        """По хранилищу ключей sorl определяет живые миниатюры.
+        Возвращает имена живых миниатюр и ключи исходников,
+        на которые больше никто не ссылается."""
+        live_sources = {
+            ImageFile(name, storage=default_storage).key
+            for name in referenced
+        }
+        live_keys = set()
+        dead_sources = []
+        thumbnail_lists = (
+            KVStore.objects
+            .filter(key__startswith=add_prefix('', 'thumbnails'))
+            .values_list('key', 'value').iterator(chunk_size=CHUNK_SIZE)
+        )
+        for key, value in thumbnail_lists:
+            source_key = del_prefix(key)
+            if source_key in live_sources:
+                live_keys.update(deserialize(value))
+            else:
+                dead_sources.append(source_key)
+
+        live_thumbnails = set()
+        images = (
+            KVStore.objects.filter(key__startswith=add_prefix('', 'image'))
+            .values_list('key', 'value').iterator(chunk_size=CHUNK_SIZE)
+        )
+        for key, value in images:
+            if del_prefix(key) in live_keys:
+                live_thumbnails.add(deserialize(value)['name'])
+        return live_thumbnails, dead_sources
+
+    def collect(self, files, root, is_live):
+        """Отбирает из потока файлов сироты старше min-age."""
+        for path, size, mtime in files:
+            name = os.path.relpath(path, root).replace(os.sep, '/')
+            if mtime <= self.deadline and not is_live(name):
+                yield path, name, size
+
+    def sweep(self, orphans, release=False):
+        """Удаляет сирот пачками с паузой между ними."""
+        count = reclaimed = 0
+        batch = []
+        for orphan in orphans:
+            batch.append(orphan)
+            if len(batch) >= self.batch_size:
+                batch = self.delete_batch(batch, release)
+                count, reclaimed = self.report(batch, count, reclaimed)
+                batch = []
+                if not self.dry_run:
+                    time.sleep(self.sleep)
+        if batch:
+            batch = self.delete_batch(batch, release)
+            count, reclaimed = self.report(batch, count, reclaimed)
+        return count, reclaimed
+
+    def report(self, batch, count, reclaimed):
+        if self.verbosity > 1:
+            for _, name, size in batch:
+                self.stdout.write(f'{name} ({size} байт)')
+        return count + len(batch), reclaimed + sum(s for _, _, s in batch)
+
+    def delete_batch(self, batch, release):
+        """Удаляет пачку и возвращает удалённые файлы. Список ссылок
+        снят в начале долгого обхода, поэтому картинки перед удалением
+        проверяются заново: пост мог за это время взять старый файл
+        с тем же содержимым."""
+        if self.dry_run:
+            return batch
+        if release:
+            alive = still_referenced([name for _, name, _ in batch])
+            batch = [item for item in batch if item[1] not in alive]
+        for path, _, _ in batch:
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+        if release:
+            MediaBlob.objects.filter(
+                name__in=[name for _, name, _ in batch]
+            ).delete()
+        return batch
+
+    def forget_sources(self, source_keys):
+        """Чистит записи sorl об исходниках, которых больше нет."""
+        for number, key in enumerate(source_keys, start=1):
+            default.kvstore.delete(SourceKey(key))
+            if number % self.batch_size == 0:
+                time.sleep(self.sleep)
@@ -0,0 +1,106 @@
+import os
+import signal
+import socket
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.utils.module_loading import autodiscover_modules
+
+from core.jobs import (claim, execute_job, finish_job, give_up,
+                       purge_finished)
+
+PURGE_INTERVAL: float = 600.0
+
+
+def run_in_thread(job):
+    """У каждого потока своё соединение с базой, закрываем его сами.
+    Результат задачи записывает главный поток."""
+    try:
+        return execute_job(job)
+    finally:
+        connection.close()
+
+
+class Command(BaseCommand):
+    help = (
+        'Выполняет фоновые задачи из очереди core.jobs '
+        'в пуле потоков.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--threads', type=int, default=4,
+            help='Сколько задач выполнять одновременно.'
+        )
+        parser.add_argument(
+            '--poll-interval', type=float, default=1.0,
+            help='Пауза, когда очередь пуста, секунд.'
+        )
+        parser.add_argument(
+            '--visibility', type=float,
+            default=settings.JOB_VISIBILITY_TIMEOUT,
+            help='Аренда задачи, секунд: после неё задачу упавшего '
+                 'воркера возьмёт другой.'
+        )
+        parser.add_argument(
+            '--once', action='store_true',
+            help='Выполнить готовые задачи и завершиться.'
+        )
+
+    def handle(self, *args, **options):
+        autodiscover_modules('tasks')
+        self.stopping = False
+        signal.signal(signal.SIGTERM, self.stop)
+        worker = f'{socket.gethostname()}:{os.getpid()}'
+        threads = options['threads']
+        self.done = self.failed = 0
+        last_purge = 0.0
+        running = {}
+        with ThreadPoolExecutor(threads) as pool:
+            while not self.stopping:
+                if time.monotonic() - last_purge > PURGE_INTERVAL:
+                    purge_finished()
+                    last_purge = time.monotonic()
+                # Берём задач не больше, чем свободных потоков: аренда
+                # начинается при взятии, и задача не должна тратить её
+                # в очереди пула.
+                jobs = []
+                if len(running) < threads:
+                    jobs = claim(
+                        worker, threads - len(running), options['visibility']
+                    )
+                for job in jobs:
+                    if give_up(job):
+                        self.failed += 1
+                    else:
+                        running[pool.submit(run_in_thread, job)] = job
+                if not running:
+                    if options['once']:
+                        break
+                    time.sleep(options['poll_interval'])
+                    continue
+                finished, _ = wait(
+                    running, timeout=0 if jobs else options['poll_interval'],
+                    return_when=FIRST_COMPLETED
+                )
+                self.collect(running, finished)
+                if finished and options['verbosity'] > 1:
+                    self.stdout.write(f'Задач выполнено: {self.done}, '
+                                      f'с ошибкой: {self.failed}')
+            self.collect(running, wait(running).done)
+        self.stdout.write(self.style.SUCCESS(
+            f'Выполнено задач: {self.done}, с ошибкой: {self.failed}.'
+        ))
+
+    def collect(self, running, finished):
+        for future in finished:
+            ok = finish_job(running.pop(future), future.result())
+            self.done += ok
+            self.failed += not ok
+
+    def stop(self, signum, frame):
+        """Дорабатывает взятые задачи и выходит."""
+        self.stopping = True
@@ -0,0 +1,43 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core.replica import replica_lag, sync_replica
+from core.routers import replica_configured
+
+
+class Command(BaseCommand):
+    help = (
+        'Обновляет реплику для чтения снимком основной базы. '
+        'Запускается по расписанию или с --loop.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--loop', action='store_true',
+            help='Не завершаться, обновлять реплику каждые --interval.'
+        )
+        parser.add_argument(
+            '--interval', type=float, default=5.0,
+            help='Пауза между снимками в режиме --loop, секунд.'
+        )
+
+    def handle(self, *args, **options):
+        if not replica_configured():
+            raise CommandError(
+                'Реплика не настроена: задайте путь в YATUBE_REPLICA_DB.'
+            )
+        while True:
+            lag = replica_lag()
+            started = time.monotonic()
+            sync_replica()
+            if options['verbosity'] > 1 or not options['loop']:
+                self.stdout.write(
+                    'Реплика обновлена за '
+                    f'{time.monotonic() - started:.3f} с, отставание '
+                    f'перед обновлением: '
+                    f'{"—" if lag is None else f"{lag:.1f} с"}'
+                )
+            if not options['loop']:
+                break
+            time.sleep(options['interval'])
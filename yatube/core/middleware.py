@@ -0,0 +1,43 @@
+import time
+
+from django.conf import settings
+
+from .identity import identity_scope
+from .routers import STICKY_COOKIE, replica_configured
+
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS', 'TRACE')
+
+
+class PrimaryStickinessMiddleware:
+    """После успешного изменяющего запроса ставит куку со временем
+    записи: read_replica читает основную базу, пока в реплику
+    не придёт снимок новее, но не дольше REPLICA_STICKY_SECONDS."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        response = self.get_response(request)
+        if (
+            request.method not in SAFE_METHODS
+            and response.status_code < 400
+            and replica_configured()
+        ):
+            response.set_cookie(
+                STICKY_COOKIE, f'{time.time():.3f}',
+                max_age=settings.REPLICA_STICKY_SECONDS,
+                httponly=True, samesite='Lax',
+            )
+        return response
+
+
+class IdentityMapMiddleware:
+    """Заводит реестр загруженных объектов (core.identity) на время
+    запроса, включая отрисовку шаблона, и очищает его после."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        with identity_scope():
+            return self.get_response(request)
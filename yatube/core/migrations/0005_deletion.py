@@ -0,0 +1,38 @@
+# Generated by Django 2.2.16 on 2026-10-19 03:12
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('contenttypes', '0002_remove_content_type_name'),
+        ('core', '0004_replica_heartbeat'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Deletion',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('object_id', models.PositiveIntegerField(verbose_name='id объекта')),
+                ('object_repr', models.CharField(max_length=200, verbose_name='Объект')),
+                ('status', models.CharField(choices=[('queued', 'В очереди'), ('running', 'Удаляется'), ('done', 'Удалено')], default='queued', max_length=10, verbose_name='Состояние')),
+                ('total', models.PositiveIntegerField(null=True, verbose_name='Всего записей')),
+                ('deleted', models.PositiveIntegerField(default=0, verbose_name='Удалено записей')),
+                ('step', models.CharField(blank=True, max_length=200, verbose_name='Текущий шаг')),
+                ('created', models.DateTimeField(auto_now_add=True, verbose_name='Создано')),
+                ('finished', models.DateTimeField(blank=True, null=True, verbose_name='Завершено')),
+                ('content_type', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='contenttypes.ContentType', verbose_name='Тип объекта')),
+            ],
+            options={
+                'verbose_name': 'удаление',
+                'verbose_name_plural': 'удаления',
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='deletion',
+            constraint=models.UniqueConstraint(fields=('content_type', 'object_id'), name='unique_deletion'),
+        ),
+    ]
@@ -1,3 +1,4 @@
+from django.contrib.contenttypes.models import ContentType
 from django.db import models
 
 
@@ -10,3 +11,173 @@ class CreatedModel(models.Model):
 
     class Meta:
         abstract = True
+
+
+class MediaBlob(models.Model):
+    """Файл в хранилище с адресацией по содержимому
+    и числом ссылающихся на него записей."""
+    name = models.CharField('Имя файла', max_length=255, unique=True)
+    size = models.PositiveIntegerField('Размер, байт', default=0)
+    refs = models.PositiveIntegerField('Число ссылок', default=0)
+
+    class Meta:
+        verbose_name = 'медиафайл'
+        verbose_name_plural = 'медиафайлы'
+
+    def __str__(self):
+        return f'{self.name} ({self.refs})'
+
+
+class Job(models.Model):
+    """Фоновая задача в очереди core.jobs."""
+    QUEUED = 'queued'
+    RUNNING = 'running'
+    DONE = 'done'
+    FAILED = 'failed'
+    STATUSES = (
+        (QUEUED, 'В очереди'),
+        (RUNNING, 'Выполняется'),
+        (DONE, 'Выполнена'),
+        (FAILED, 'Не выполнена'),
+    )
+
+    name = models.CharField('Задача', max_length=200)
+    payload = models.TextField('Аргументы, JSON', default='{}')
+    idempotency_key = models.CharField(
+        'Ключ идемпотентности',
+        max_length=200,
+        unique=True,
+        blank=True,
+        null=True
+    )
+    status = models.CharField(
+        'Состояние', max_length=10, choices=STATUSES, default=QUEUED
+    )
+    attempts = models.PositiveSmallIntegerField('Попыток', default=0)
+    max_attempts = models.PositiveSmallIntegerField(
+        'Всего попыток', default=5
+    )
+    run_after = models.DateTimeField('Выполнить после')
+    locked_until = models.DateTimeField('Занята до', null=True, blank=True)
+    locked_by = models.CharField('Воркер', max_length=100, blank=True)
+    last_error = models.TextField('Последняя ошибка', blank=True)
+    created = models.DateTimeField('Создана', auto_now_add=True)
+    started = models.DateTimeField('Начата', null=True, blank=True)
+    finished = models.DateTimeField('Завершена', null=True, blank=True)
+
+    class Meta:
+        verbose_name = 'задача'
+        verbose_name_plural = 'задачи'
+        indexes = [
+            # Очередь и просроченные аренды читаются по частичным
+            # индексам, выполненные задачи в них не попадают.
+            models.Index(
+                fields=('run_after',), name='job_ready',
+                condition=models.Q(status='queued')
+            ),
+            models.Index(
+                fields=('locked_until',), name='job_leased',
+                condition=models.Q(status='running')
+            ),
+            models.Index(fields=('status', 'finished'), name='job_finished'),
+        ]
+
+    def __str__(self):
+        return f'{self.name} #{self.id} ({self.status})'
+
+
+class OutgoingEmail(models.Model):
+    """Письмо в исходящей очереди core.mail. Лежит в базе,
+    пока настоящий почтовый бэкенд его не принял."""
+    PENDING = 'pending'
+    SENDING = 'sending'
+    SENT = 'sent'
+    FAILED = 'failed'
+    STATUSES = (
+        (PENDING, 'Ждёт отправки'),
+        (SENDING, 'Отправляется'),
+        (SENT, 'Отправлено'),
+        (FAILED, 'Не отправлено'),
+    )
+
+    message = models.TextField('Письмо, JSON')
+    recipients = models.TextField('Получатели')
+    status = models.CharField(
+        'Состояние', max_length=10, choices=STATUSES, default=PENDING
+    )
+    attempts = models.PositiveSmallIntegerField('Попыток', default=0)
+    send_after = models.DateTimeField('Отправить после')
+    locked_until = models.DateTimeField('Занято до', null=True, blank=True)
+    locked_by = models.CharField('Воркер', max_length=100, blank=True)
+    last_error = models.TextField('Последняя ошибка', blank=True)
+    created = models.DateTimeField('Создано', auto_now_add=True)
+    sent = models.DateTimeField('Отправлено', null=True, blank=True)
+
+    class Meta:
+        verbose_name = 'исходящее письмо'
+        verbose_name_plural = 'исходящие письма'
+        indexes = [
+            models.Index(
+                fields=('send_after',), name='email_pending',
+                condition=models.Q(status='pending')
+            ),
+            models.Index(
+                fields=('locked_until',), name='email_sending',
+                condition=models.Q(status='sending')
+            ),
+        ]
+
+    def __str__(self):
+        return f'{self.recipients} ({self.status})'
+
+
+class ReplicaHeartbeat(models.Model):
+    """Отметка времени, которую sync_replica пишет в основную базу
+    перед снимком. Её значение в реплике показывает отставание."""
+    updated = models.DateTimeField('Обновлено')
+
+    class Meta:
+        verbose_name = 'отметка реплики'
+        verbose_name_plural = 'отметки реплики'
+
+    def __str__(self):
+        return f'{self.updated:%Y-%m-%d %H:%M:%S}'
+
+
+class Deletion(models.Model):
+    """Фоновое удаление объекта вместе с зависимыми записями
+    небольшими транзакциями (core.deletion)."""
+    QUEUED = 'queued'
+    RUNNING = 'running'
+    DONE = 'done'
+    STATUSES = (
+        (QUEUED, 'В очереди'),
+        (RUNNING, 'Удаляется'),
+        (DONE, 'Удалено'),
+    )
+
+    content_type = models.ForeignKey(
+        ContentType, on_delete=models.CASCADE, verbose_name='Тип объекта'
+    )
+    object_id = models.PositiveIntegerField('id объекта')
+    object_repr = models.CharField('Объект', max_length=200)
+    status = models.CharField(
+        'Состояние', max_length=10, choices=STATUSES, default=QUEUED
+    )
+    total = models.PositiveIntegerField('Всего записей', null=True)
+    deleted = models.PositiveIntegerField('Удалено записей', default=0)
+    step = models.CharField('Текущий шаг', max_length=200, blank=True)
+    created = models.DateTimeField('Создано', auto_now_add=True)
+    finished = models.DateTimeField('Завершено', null=True, blank=True)
+
+    class Meta:
+        verbose_name = 'удаление'
+        verbose_name_plural = 'удаления'
+        constraints = [
+            models.UniqueConstraint(
+                fields=('content_type', 'object_id'), name='unique_deletion'
+            ),
+        ]
+
+    def __str__(self):
+        return f'{self.object_repr} ({self.status})'
@@ -0,0 +1,62 @@
+import os
+import sqlite3
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, DatabaseError, connections
+from django.utils import timezone
+
+from .models import ReplicaHeartbeat
+from .routers import REPLICA
+
+
+def copy_database(connection, path: str) -> None:
+    """Снимок базы через backup API SQLite во временный файл и
+    атомарная замена файла реплики. Читатели реплики не ждут:
+    открытые соединения дочитывают старый файл, а перед следующим
+    запросом core.db.check_connections переоткроет их на новый."""
+    connection.ensure_connection()
+    temp = f'{path}.{os.getpid()}.tmp'
+    target = sqlite3.connect(temp)
+    try:
+        connection.connection.backup(target)
+        # Реплику только читают; без WAL не остаётся файлов -wal
+        # и -shm, которые относились бы к прежнему файлу.
+        target.execute('PRAGMA journal_mode = DELETE')
+    finally:
+        target.close()
+    os.replace(temp, path)
+
+
+def sync_replica(path: str = None, using: str = DEFAULT_DB_ALIAS):
+    """Обновляет реплику снимком основной базы.
+    Возвращает время отметки, попавшей в снимок."""
+    path = path or settings.DATABASES[REPLICA]['NAME']
+    now = timezone.now()
+    ReplicaHeartbeat.objects.using(using).update_or_create(
+        pk=1, defaults={'updated': now}
+    )
+    copy_database(connections[using], path)
+    return now
+
+
+def replica_synced_at(using: str = REPLICA):
+    """Время отметки последнего снимка в реплике: все записи,
+    зафиксированные до него, в реплике уже есть. None, если
+    реплику ещё не синхронизировали."""
+    try:
+        return (
+            ReplicaHeartbeat.objects.using(using)
+            .values_list('updated', flat=True).first()
+        )
+    except DatabaseError:
+        # До первого снимка в файле реплики нет таблиц.
+        return None
+
+
+def replica_lag(using: str = REPLICA):
+    """Отставание реплики в секундах; None, если её ещё
+    не синхронизировали."""
+    updated = replica_synced_at(using)
+    if updated is None:
+        return None
+    return (timezone.now() - updated).total_seconds()
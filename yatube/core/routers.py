@@ -0,0 +1,73 @@
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import wraps
+
+from django.db import DEFAULT_DB_ALIAS, connections
+
+REPLICA = 'replica'
+STICKY_COOKIE = 'last_write'
+
+_replica_reads = ContextVar('replica_reads', default=False)
+
+
+def replica_configured() -> bool:
+    return REPLICA in connections.databases
+
+
+@contextmanager
+def replica_reads():
+    """Чтения внутри блока идут в реплику, если она настроена."""
+    token = _replica_reads.set(True)
+    try:
+        yield
+    finally:
+        _replica_reads.reset(token)
+
+
+def is_sticky(request) -> bool:
+    """Пользователь писал позже последнего снимка реплики: его чтения
+    идут в основную базу, чтобы он сразу увидел свои изменения.
+    Кука хранит время записи, а не срок, поэтому окно само
+    подстраивается под интервал и длительность sync_replica."""
+    try:
+        written = float(request.COOKIES.get(STICKY_COOKIE, 0))
+    except ValueError:
+        return False
+    if not written:
+        return False
+    from .replica import replica_synced_at
+
+    synced = replica_synced_at()
+    return synced is None or synced.timestamp() < written
+
+
+def read_replica(view):
+    """Декоратор представлений, которые только читают данные."""
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        if is_sticky(request):
+            return view(request, *args, **kwargs)
+        with replica_reads():
+            return view(request, *args, **kwargs)
+    return wrapper
+
+
+class PrimaryReplicaRouter:
+    """Запись всегда в основную базу. Чтение — в реплику, но только
+    в представлениях с read_replica: остальной код читает основную
+    базу и видит свои только что записанные данные."""
+
+    def db_for_read(self, model, **hints):
+        if _replica_reads.get() and replica_configured():
+            return REPLICA
+        return DEFAULT_DB_ALIAS
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True
+
+    def allow_migrate(self, db, app_label, **hints):
+        # Схема приходит в реплику вместе со снимком основной базы.
+        return db != REPLICA
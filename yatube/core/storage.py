@@ -0,0 +1,203 @@
+import gzip
+import hashlib
+import os
+import posixpath
+import re
+
+from django.conf import settings
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage
+from django.core.files import File
+from django.core.files.storage import FileSystemStorage
+from django.db.models import F
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+HASH_CHUNK_SIZE: int = 64 * 1024
+
+HASHED_NAME_RE = re.compile(r'(?:^|/)(?P<digest>[0-9a-f]{64})\.\w+$')
+MANIFEST_NAME_RE = re.compile(r'\.[0-9a-f]{12}\.\w+$')
+
+COMPRESSIBLE_EXTENSIONS = (
+    '.css', '.js', '.svg', '.ico', '.txt', '.html', '.json', '.xml', '.map',
+)
+PRECOMPRESSED_VARIANTS = (('br', '.br'), ('gzip', '.gz'))
+
+
+def content_hash(content) -> str:
+    """Считает sha256 содержимого файла, читая его по частям."""
+    digest = hashlib.sha256()
+    if hasattr(content, 'seek'):
+        content.seek(0)
+    for chunk in content.chunks(HASH_CHUNK_SIZE):
+        digest.update(chunk)
+    if hasattr(content, 'seek'):
+        content.seek(0)
+    return digest.hexdigest()
+
+
+def upload_dir(name: str) -> str:
+    """Каталог upload_to имени: у имени по содержимому без
+    подкаталогов ab/cd, иначе каталог файла."""
+    dirname = posixpath.dirname(name)
+    digest = name_digest(name)
+    if digest and dirname.split('/')[-2:] == [digest[:2], digest[2:4]]:
+        dirname = posixpath.dirname(posixpath.dirname(dirname))
+    return dirname
+
+
+def hashed_name(name: str, digest: str) -> str:
+    """Имя файла по содержимому: posts/ab/cd/abcd...ef.gif.
+    Каталог из upload_to сохраняется, расширение приводится
+    к нижнему регистру. Для имени, уже выданного по содержимому,
+    подкаталоги не вкладываются повторно."""
+    name = name.replace('\\', '/')
+    ext = posixpath.splitext(name)[1].lower()
+    return posixpath.join(
+        upload_dir(name), digest[:2], digest[2:4], digest + ext
+    )
+
+
+def name_digest(name: str):
+    """Возвращает sha256 из имени, выданного ContentHashStorage,
+    или None для обычных имён."""
+    match = HASHED_NAME_RE.search(name)
+    return match.group('digest') if match else None
+
+
+class ContentHashStorage(FileSystemStorage):
+    """Хранилище медиафайлов с адресацией по содержимому.
+    Одинаковые загрузки получают одно имя и один файл на диске,
+    поэтому миниатюры sorl (они строятся по имени исходника) тоже общие.
+    Число ссылок на файл хранится в core.models.MediaBlob; ссылку берёт
+    запись, сохранившая имя файла (posts.signals), а не сама загрузка.
+    Файл без ссылок media_gc удаляет."""
+
+    def save(self, name, content, max_length=None):
+        if name is None:
+            name = content.name
+        if not hasattr(content, 'chunks'):
+            content = File(content, name)
+        name = hashed_name(name, content_hash(content))
+        if not self.exists(name):
+            return super().save(name, content, max_length=max_length)
+        try:
+            # Файл переиспользуется: свежий mtime не даёт media_gc
+            # удалить его, пока пост с этим именем ещё не сохранён.
+            os.utime(self.path(name))
+        except FileNotFoundError:
+            name = super().save(name, content, max_length=max_length)
+        return name
+
+    def get_available_name(self, name, max_length=None):
+        # Имя уже уникально по содержимому: совпадение означает
+        # тот же файл, поэтому суффиксы не добавляем.
+        return name
+
+    def _save(self, name, content):
+        try:
+            return super()._save(name, content)
+        except FileExistsError:
+            # Параллельная загрузка того же содержимого успела раньше.
+            return name
+
+    def acquire(self, name: str, size: int = None) -> None:
+        """Увеличивает счётчик ссылок на файл. Считаются только
+        файлы, сохранённые этим хранилищем по содержимому."""
+        from .models import MediaBlob
+
+        if not name or name_digest(name) is None:
+            return
+        updated = MediaBlob.objects.filter(name=name).update(
+            refs=F('refs') + 1
+        )
+        if not updated:
+            if size is None:
+                size = self.size(name) if self.exists(name) else 0
+            MediaBlob.objects.get_or_create(
+                name=name, defaults={'size': size, 'refs': 1}
+            )
+
+    def release(self, name: str) -> None:
+        """Уменьшает счётчик ссылок. Когда ссылок не осталось,
+        удаляет файл вместе с его миниатюрами."""
+        from .models import MediaBlob
+
+        if not name:
+            return
+        MediaBlob.objects.filter(name=name, refs__gt=0).update(
+            refs=F('refs') - 1
+        )
+        deleted, _ = MediaBlob.objects.filter(name=name, refs__lte=0).delete()
+        if deleted:
+            self.purge(name)
+
+    def purge(self, name: str) -> None:
+        """Удаляет файл и все его миниатюры sorl."""
+        from sorl.thumbnail import delete
+        from sorl.thumbnail.images import ImageFile
+
+        delete(ImageFile(name, storage=self), delete_file=False)
+        self.delete(name)
+
+
+def compress(data: bytes):
+    """Сжимает данные всеми доступными кодеками.
+    Отдаёт (суффикс, сжатые данные) только если вариант меньше исходника;
+    brotli используется, если установлен пакет brotli."""
+    variants = [('.gz', gzip.compress(data, compresslevel=9, mtime=0))]
+    if brotli is not None:
+        variants.append(('.br', brotli.compress(data)))
+    return [
+        (suffix, compressed) for suffix, compressed in variants
+        if len(compressed) < len(data)
+    ]
+
+
+class CompressedManifestStaticFilesStorage(ManifestStaticFilesStorage):
+    """Статика с хэшем содержимого в имени и заранее сжатыми
+    копиями .gz и .br рядом с каждым текстовым файлом.
+    url() запоминает результат, поэтому {% static %} при рендере
+    не пересчитывает хэшированное имя."""
+
+    def __init__(self, *args, **kwargs):
+        self._url_cache = {}
+        super().__init__(*args, **kwargs)
+
+    def url(self, name, force=False):
+        key = (name, force, settings.DEBUG)
+        try:
+            return self._url_cache[key]
+        except KeyError:
+            url = self._url_cache[key] = super().url(name, force)
+            return url
+
+    def stored_name(self, name):
+        try:
+            return super().stored_name(name)
+        except ValueError:
+            # Файла нет в манифесте: collectstatic ещё не запускали.
+            # Отдаём нехэшированное имя, а не роняем рендер страницы.
+            return name
+
+    def post_process(self, paths, dry_run=False, **options):
+        yield from super().post_process(paths, dry_run, **options)
+        self._url_cache.clear()
+        if dry_run:
+            return
+        for hashed in set(self.hashed_files.values()):
+            if hashed.endswith(COMPRESSIBLE_EXTENSIONS):
+                self.write_compressed(hashed)
+
+    def write_compressed(self, name: str) -> None:
+        with self.open(name) as original:
+            data = original.read()
+        for suffix, compressed in compress(data):
+            if self.exists(name + suffix):
+                # Имя уже содержит хэш, значит копия актуальна.
+                continue
+            path = self.path(name + suffix)
+            with open(path, 'wb') as file:
+                file.write(compressed)
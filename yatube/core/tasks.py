@@ -0,0 +1,40 @@
+from django.conf import settings
+from django.db.models import Min
+from django.utils import timezone
+
+from .deletion import run_deletion
+from .jobs import enqueue, task
+from .mail import deliver_batch
+from .models import Deletion, OutgoingEmail
+
+
+@task
+def deliver_queued_email():
+    """Отправляет исходящие письма пачками, пока они есть.
+    Для писем, отложенных после ошибки, ставит задачу на их время."""
+    batch_size = settings.EMAIL_BATCH_SIZE
+    while deliver_batch(batch_size=batch_size) == batch_size:
+        pass
+    retry_at = OutgoingEmail.objects.filter(
+        status=OutgoingEmail.PENDING
+    ).aggregate(retry_at=Min('send_after'))['retry_at']
+    if retry_at is not None:
+        enqueue(
+            deliver_queued_email,
+            key=f'mail-retry:{retry_at.isoformat()}',
+            delay=max((retry_at - timezone.now()).total_seconds(), 0),
+        )
+
+
+@task
+def delete_in_batches(deletion_id: int):
+    """Фоновое удаление объекта; не успев за запуск,
+    задача ставит себя снова."""
+    if not run_deletion(deletion_id):
+        deleted = Deletion.objects.values_list('deleted', flat=True).get(
+            id=deletion_id
+        )
+        enqueue(
+            delete_in_batches, deletion_id,
+            key=f'deletion:{deletion_id}:{deleted}',
+        )
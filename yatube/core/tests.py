@@ -1,5 +1,70 @@
-from django.test import TestCase
+import gzip
+import os
+import shutil
+import socketserver
+import sqlite3
+import tempfile
+import threading
+import time
 from http import HTTPStatus
+from datetime import datetime, timedelta
+from datetime import timezone as dt_timezone
+from io import StringIO
+from unittest import mock
+
+from django.conf import settings
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.core import mail
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import IntegrityError, connection, connections, transaction
+from django.http import HttpResponse
+from django.test import (Client, RequestFactory, TestCase,
+                         TransactionTestCase, override_settings)
+from django.urls import reverse
+from django.utils import timezone
+from posts.models import Comment, Follow, Post, User
+
+from .backends.sqlite3.base import DatabaseWrapper
+from .db import check_connections
+from .identity import current_map
+from .jobs import (claim, create_job, enqueue, lease_left, purge_finished,
+                   run_job, task)
+from .mail import claim_emails, deliver_batch
+from .middleware import IdentityMapMiddleware
+from .models import Job, MediaBlob, OutgoingEmail
+from .replica import replica_lag, sync_replica
+from .routers import (REPLICA, STICKY_COOKIE, PrimaryReplicaRouter,
+                      read_replica, replica_reads)
+from .writer import WriteFunnel, WriteTimeout, write
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+SMALL_GIF = (
+    b'\x47\x49\x46\x38\x39\x61\x02\x00'
+    b'\x01\x00\x80\x00\x00\x00\x00\x00'
+    b'\xFF\xFF\xFF\x21\xF9\x04\x00\x00'
+    b'\x00\x00\x00\x2C\x00\x00\x00\x00'
+    b'\x02\x00\x01\x00\x00\x02\x02\x0C'
+    b'\x0A\x00\x3B'
+)
+
+CALLS = []
+LEASES = []
+
+
+@task(max_attempts=2)
+def record_call(value, fail=False):
+    CALLS.append(value)
+    if fail:
+        raise ValueError(value)
+
+
+@task
+def record_lease():
+    LEASES.append(lease_left())
 
 
 class ViewTestClass(TestCase):
@@ -20,3 +85,824 @@ class ViewTestClass(TestCase):
         self.assertEqual(response.status_code, HTTPStatus.NOT_FOUND)
 
         self.assertTemplateUsed(response, ('core/404.html'))
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class ContentHashStorageTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='media_user')
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def create_post(self, filename, content=SMALL_GIF):
+        return Post.objects.create(
+            author=self.user,
+            text='Пост с картинкой',
+            image=SimpleUploadedFile(
+                name=filename, content=content, content_type='image/gif'
+            ),
+        )
+
+    def test_duplicate_uploads_share_one_file(self):
+        """Одинаковые загрузки хранятся одним файлом со счётчиком ссылок."""
+        first = self.create_post('first.gif')
+        second = self.create_post('second.gif')
+        self.assertEqual(first.image.name, second.image.name)
+        self.assertTrue(first.image.name.startswith('posts/'))
+        self.assertEqual(MediaBlob.objects.get(name=first.image.name).refs, 2)
+
+    def test_file_removed_with_last_reference(self):
+        """Файл удаляется только вместе с последней ссылкой."""
+        first = self.create_post('first.gif')
+        second = self.create_post('second.gif')
+        path = os.path.join(TEMP_MEDIA_ROOT, first.image.name)
+        first.delete()
+        self.assertTrue(os.path.exists(path))
+        second.delete()
+        self.assertFalse(os.path.exists(path))
+        self.assertFalse(MediaBlob.objects.exists())
+
+    def test_replaced_image_is_released(self):
+        """Замена картинки отпускает ссылку на старый файл."""
+        post = self.create_post('old.gif')
+        old_name = post.image.name
+        post.image = SimpleUploadedFile(
+            name='new.gif', content=SMALL_GIF + b'\x00',
+            content_type='image/gif'
+        )
+        post.save()
+        self.assertNotEqual(post.image.name, old_name)
+        self.assertFalse(MediaBlob.objects.filter(name=old_name).exists())
+
+    def test_failed_post_save_takes_no_reference(self):
+        """Ссылку берёт только сохранённый пост."""
+        post = Post(
+            author=self.user,
+            text='Пост с картинкой',
+            image=SimpleUploadedFile(
+                name='lost.gif', content=SMALL_GIF, content_type='image/gif'
+            ),
+        )
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            post.text = None
+            post.save()
+        self.assertFalse(MediaBlob.objects.exists())
+
+    def test_resaved_image_keeps_one_reference(self):
+        """Повторная загрузка той же картинки не меняет счётчик."""
+        post = self.create_post('same.gif')
+        post.image = SimpleUploadedFile(
+            name='again.gif', content=SMALL_GIF, content_type='image/gif'
+        )
+        post.save()
+        post.text = 'Другой текст'
+        post.save()
+        self.assertEqual(MediaBlob.objects.get(name=post.image.name).refs, 1)
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class MediaGarbageCollectorTest(TestCase):
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def test_orphans_removed_and_referenced_kept(self):
+        """media_gc удаляет только файлы без ссылок из постов."""
+        user = User.objects.create_user(username='gc_user')
+        post = Post.objects.create(
+            author=user,
+            text='Пост с картинкой',
+            image=SimpleUploadedFile(
+                name='kept.gif', content=SMALL_GIF, content_type='image/gif'
+            ),
+        )
+        kept = os.path.join(TEMP_MEDIA_ROOT, post.image.name)
+        orphan = os.path.join(TEMP_MEDIA_ROOT, 'posts', 'orphan.gif')
+        with open(orphan, 'wb') as file:
+            file.write(SMALL_GIF)
+        out = StringIO()
+        call_command('media_gc', '--dry-run', '--min-age=0', stdout=out)
+        self.assertTrue(os.path.exists(orphan))
+        self.assertIn(f'({len(SMALL_GIF)} байт)', out.getvalue())
+        call_command('media_gc', '--min-age=0', '--sleep=0', stdout=out)
+        self.assertFalse(os.path.exists(orphan))
+        self.assertTrue(os.path.exists(kept))
+
+    def test_file_taken_during_sweep_is_kept(self):
+        """Картинку, которую пост взял после снятия списка ссылок,
+        обход не удаляет."""
+        user = User.objects.create_user(username='gc_race')
+        post = Post.objects.create(
+            author=user,
+            text='Пост с картинкой',
+            image=SimpleUploadedFile(
+                name='meme.gif', content=SMALL_GIF, content_type='image/gif'
+            ),
+        )
+        path = os.path.join(TEMP_MEDIA_ROOT, post.image.name)
+        with mock.patch(
+            'core.management.commands.media_gc.referenced_images',
+            return_value=[]
+        ):
+            call_command(
+                'media_gc', '--min-age=0', '--sleep=0', stdout=StringIO()
+            )
+        self.assertTrue(os.path.exists(path))
+
+    def test_reused_file_gets_fresh_mtime(self):
+        """Повторная загрузка старого файла обновляет его mtime,
+        и min-age защищает его от обхода."""
+        name = default_storage.save('posts/old.gif', ContentFile(SMALL_GIF))
+        path = default_storage.path(name)
+        os.utime(path, (0, 0))
+        self.assertEqual(
+            default_storage.save('posts/again.gif', ContentFile(SMALL_GIF)),
+            name
+        )
+        self.assertGreater(os.path.getmtime(path), time.time() - 60)
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class DedupeMediaTest(TestCase):
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def media_files(self):
+        return sorted(
+            os.path.relpath(os.path.join(dirpath, filename), TEMP_MEDIA_ROOT)
+            for dirpath, _, filenames in os.walk(TEMP_MEDIA_ROOT)
+            for filename in filenames
+        )
+
+    def test_rerun_changes_nothing(self):
+        """Старые имена переводятся на имена по содержимому один раз,
+        повторный запуск ничего не переносит и не вкладывает."""
+        user = User.objects.create_user(username='dedupe_user')
+        hashed = Post.objects.create(
+            author=user, text='Новый пост', image=SimpleUploadedFile(
+                name='new.gif', content=SMALL_GIF, content_type='image/gif'
+            ),
+        )
+        legacy = Post.objects.create(author=user, text='Старый пост')
+        os.makedirs(os.path.join(TEMP_MEDIA_ROOT, 'posts'), exist_ok=True)
+        for name in ('legacy.gif', 'copy.gif'):
+            with open(os.path.join(TEMP_MEDIA_ROOT, 'posts', name),
+                      'wb') as file:
+                file.write(SMALL_GIF)
+        Post.objects.filter(id=legacy.id).update(image='posts/legacy.gif')
+
+        out = StringIO()
+        call_command('dedupe_media', stdout=out)
+        self.assertIn('удалено дубликатов: 2', out.getvalue())
+        legacy.refresh_from_db()
+        self.assertEqual(legacy.image.name, hashed.image.name)
+        self.assertEqual(self.media_files(), [hashed.image.name])
+        self.assertEqual(MediaBlob.objects.get(name=hashed.image.name).refs, 2)
+
+        out = StringIO()
+        call_command('dedupe_media', stdout=out)
+        self.assertIn('Перемещено: 0, удалено дубликатов: 0', out.getvalue())
+        self.assertEqual(self.media_files(), [hashed.image.name])
+        legacy.refresh_from_db()
+        self.assertEqual(legacy.image.name, hashed.image.name)
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class ServeMediaTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        user = User.objects.create_user(username='serve_user')
+        cls.post = Post.objects.create(
+            author=user,
+            text='Пост с картинкой',
+            image=SimpleUploadedFile(
+                name='served.gif', content=SMALL_GIF,
+                content_type='image/gif'
+            ),
+        )
+        cls.url = cls.post.image.url
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def test_full_response_is_immutable(self):
+        """Файл с именем по содержимому кэшируется навсегда."""
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+        self.assertEqual(b''.join(response.streaming_content), SMALL_GIF)
+        self.assertIn('immutable', response['Cache-Control'])
+        self.assertEqual(response['Content-Type'], 'image/gif')
+
+    def test_if_none_match_returns_not_modified(self):
+        """Совпадающий ETag даёт 304 без тела."""
+        etag = self.client.get(self.url)['ETag']
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, HTTPStatus.NOT_MODIFIED)
+
+    def test_range_request(self):
+        """Range отдаёт только запрошенные байты."""
+        response = self.client.get(self.url, HTTP_RANGE='bytes=0-5')
+        self.assertEqual(response.status_code, HTTPStatus.PARTIAL_CONTENT)
+        self.assertEqual(b''.join(response.streaming_content), SMALL_GIF[:6])
+        self.assertEqual(
+            response['Content-Range'], f'bytes 0-5/{len(SMALL_GIF)}'
+        )
+        response = self.client.get(self.url, HTTP_RANGE='bytes=100-')
+        self.assertEqual(
+            response.status_code,
+            HTTPStatus.REQUESTED_RANGE_NOT_SATISFIABLE
+        )
+
+    @override_settings(MEDIA_SENDFILE_HEADER='X-Accel-Redirect')
+    def test_offload_to_proxy(self):
+        """При X-Accel-Redirect воркер не отдаёт тело файла."""
+        response = self.client.get(self.url)
+        self.assertEqual(
+            response['X-Accel-Redirect'],
+            '/protected-media/' + self.post.image.name
+        )
+        self.assertEqual(response.content, b'')
+
+    def test_path_outside_media_root(self):
+        response = self.client.get('/media/../manage.py')
+        self.assertEqual(response.status_code, HTTPStatus.NOT_FOUND)
+
+
+class CompressedStaticTest(TestCase):
+    CSS = b'body { color: red; }\n' * 100
+
+    @classmethod
+    def setUpClass(cls):
+        cls.source_dir = tempfile.mkdtemp()
+        cls.static_root = tempfile.mkdtemp()
+        os.makedirs(os.path.join(cls.source_dir, 'css'))
+        with open(os.path.join(cls.source_dir, 'css', 'site.css'), 'wb') as f:
+            f.write(cls.CSS)
+        cls.settings_override = override_settings(
+            STATICFILES_DIRS=(cls.source_dir,),
+            STATIC_ROOT=cls.static_root,
+        )
+        cls.settings_override.enable()
+        super().setUpClass()
+        call_command('collectstatic', interactive=False, verbosity=0)
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        cls.settings_override.disable()
+        shutil.rmtree(cls.source_dir, ignore_errors=True)
+        shutil.rmtree(cls.static_root, ignore_errors=True)
+
+    def test_hashed_name_with_compressed_copy(self):
+        """collectstatic кладёт рядом с хэшированным файлом копию .gz."""
+        url = staticfiles_storage.url('css/site.css')
+        self.assertRegex(url, r'/static/css/site\.[0-9a-f]{12}\.css$')
+        name = url[len(settings.STATIC_URL):]
+        self.assertTrue(staticfiles_storage.exists(name + '.gz'))
+
+    def test_precompressed_variant_served(self):
+        """По Accept-Encoding отдаётся сжатая копия с долгим кэшем."""
+        url = staticfiles_storage.url('css/site.css')
+        response = self.client.get(url, HTTP_ACCEPT_ENCODING='gzip')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertEqual(response['Vary'], 'Accept-Encoding')
+        self.assertIn('immutable', response['Cache-Control'])
+        body = b''.join(response.streaming_content)
+        self.assertEqual(gzip.decompress(body), self.CSS)
+        response = self.client.get(url, HTTP_ACCEPT_ENCODING='identity')
+        self.assertFalse(response.has_header('Content-Encoding'))
+        self.assertEqual(b''.join(response.streaming_content), self.CSS)
+
+
+@override_settings(JOB_RETRY_BACKOFF=10)
+class JobQueueTest(TestCase):
+    def setUp(self):
+        CALLS.clear()
+
+    def test_enqueue_on_commit_with_idempotency_key(self):
+        """Задача ставится после фиксации, ключ не даёт дубликатов."""
+        with mock.patch(
+            'core.jobs.transaction.on_commit', lambda func: func()
+        ):
+            for _ in range(2):
+                enqueue(record_call, 1, key='record:1')
+            enqueue(record_call, 2)
+        self.assertEqual(Job.objects.count(), 2)
+        with override_settings(JOB_QUEUE_EAGER=True):
+            enqueue(record_call, 3)
+        self.assertEqual(CALLS, [3])
+
+    def test_claim_and_run(self):
+        """Взятая задача выполняется один раз и помечается выполненной."""
+        job = create_job(record_call, [1])
+        jobs = claim('worker', 10)
+        self.assertEqual(jobs, [job])
+        self.assertEqual(claim('other', 10), [])
+        self.assertTrue(run_job(jobs[0]))
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.DONE)
+        self.assertEqual(CALLS, [1])
+
+    def test_retry_with_backoff_then_fail(self):
+        """Ошибка откладывает повтор, после max_attempts задача падает."""
+        job = create_job(record_call, [1], {'fail': True})
+        self.assertFalse(run_job(claim('worker', 1)[0]))
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.QUEUED)
+        self.assertGreater(job.run_after, timezone.now())
+        self.assertIn('ValueError', job.last_error)
+        self.assertEqual(claim('worker', 1), [])
+
+        Job.objects.filter(id=job.id).update(run_after=timezone.now())
+        self.assertFalse(run_job(claim('worker', 1)[0]))
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.FAILED)
+        self.assertEqual(CALLS, [1, 1])
+
+    def test_failed_job_is_requeued_by_key(self):
+        """Постановка с ключом упавшей задачи перезапускает её."""
+        job = create_job(record_call, [1], key='record:1')
+        Job.objects.filter(id=job.id).update(
+            status=Job.FAILED, attempts=5, finished=timezone.now()
+        )
+        self.assertEqual(create_job(record_call, [2], key='record:1'), job)
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), (Job.QUEUED, 0))
+        self.assertTrue(run_job(claim('worker', 1)[0]))
+        self.assertEqual(CALLS, [2])
+
+    def test_purge_finished_removes_failed(self):
+        old = timezone.now() - timedelta(days=30)
+        for status in (Job.DONE, Job.FAILED, Job.QUEUED):
+            Job.objects.filter(id=create_job(record_call, [1]).id).update(
+                status=status, finished=old
+            )
+        self.assertEqual(purge_finished(), 2)
+        self.assertEqual(
+            list(Job.objects.values_list('status', flat=True)), [Job.QUEUED]
+        )
+
+    def test_expired_lease_is_reclaimed(self):
+        """Задачу упавшего воркера после аренды берёт другой,
+        результат первого воркера уже не записывается."""
+        job = create_job(record_call, [1])
+        stale = claim('crashed', 1)[0]
+        Job.objects.filter(id=job.id).update(
+            locked_until=timezone.now() - timedelta(seconds=1)
+        )
+        fresh = claim('worker', 1)[0]
+        self.assertEqual(fresh.attempts, 2)
+        self.assertTrue(run_job(fresh))
+        Job.objects.filter(id=job.id).update(status=Job.RUNNING)
+        run_job(stale)
+        job.refresh_from_db()
+        self.assertEqual(job.locked_by, fresh.locked_by)
+
+    def test_task_sees_worker_lease(self):
+        """Задача знает аренду, которую ей выдал воркер."""
+        LEASES.clear()
+        create_job(record_lease)
+        self.assertTrue(run_job(claim('worker', 1, visibility=40)[0]))
+        self.assertTrue(30 < LEASES[0] <= 40)
+        self.assertEqual(lease_left(), settings.JOB_VISIBILITY_TIMEOUT)
+
+    def test_metrics_for_staff_only(self):
+        """Метрики очереди доступны только персоналу."""
+        create_job(record_call, [1])
+        url = reverse('job_queue_metrics')
+        self.assertEqual(Client().get(url).status_code, HTTPStatus.FOUND)
+        client = Client()
+        client.force_login(
+            User.objects.create_user(username='staff', is_staff=True)
+        )
+        metrics = client.get(url).json()
+        self.assertEqual(metrics['depth']['queued'], 1)
+        self.assertEqual(metrics['ready'], 1)
+
+
+class RunWorkerTest(TransactionTestCase):
+    """Потоки воркера ходят в базу своими соединениями, поэтому
+    тест без общей транзакции."""
+
+    def test_run_worker_command(self):
+        CALLS.clear()
+        for value in range(5):
+            create_job(record_call, [value])
+        out = StringIO()
+        call_command('run_worker', '--once', '--threads', '2', stdout=out)
+        self.assertEqual(sorted(CALLS), list(range(5)))
+        self.assertIn('Выполнено задач: 5', out.getvalue())
+        self.assertFalse(Job.objects.exclude(status=Job.DONE).exists())
+
+    def test_worker_claims_only_free_threads(self):
+        """Аренда не тратится в очереди пула: задач берётся не больше,
+        чем свободных потоков."""
+        for value in range(5):
+            create_job(record_call, [value])
+        with mock.patch(
+            'core.management.commands.run_worker.claim', wraps=claim
+        ) as spy:
+            call_command(
+                'run_worker', '--once', '--threads', '2', stdout=StringIO()
+            )
+        self.assertTrue(all(
+            call.args[1] <= 2 for call in spy.call_args_list
+        ))
+        self.assertFalse(Job.objects.exclude(status=Job.DONE).exists())
+
+
+class SMTPSinkHandler(socketserver.StreamRequestHandler):
+    """Минимальный SMTP-сервер для тестов: принимает всё и
+    запоминает письма и число соединений."""
+
+    def reply(self, line: str):
+        self.wfile.write(line.encode() + b'\r\n')
+
+    def handle(self):
+        self.server.connections += 1
+        self.reply('220 localhost')
+        for raw in self.rfile:
+            command = raw.decode().strip().upper()
+            if command.startswith(('EHLO', 'HELO')):
+                self.reply('250 localhost')
+            elif command == 'DATA':
+                self.reply('354 end with .')
+                lines = []
+                for line in self.rfile:
+                    if line == b'.\r\n':
+                        break
+                    lines.append(line)
+                self.server.messages.append(b''.join(lines))
+                self.reply('250 OK')
+            elif command == 'QUIT':
+                self.reply('221 bye')
+                break
+            else:
+                self.reply('250 OK')
+
+
+class SMTPSink(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self):
+        super().__init__(('127.0.0.1', 0), SMTPSinkHandler)
+        self.connections = 0
+        self.messages = []
+
+
+@override_settings(
+    EMAIL_BACKEND='core.mail.QueuedEmailBackend',
+    QUEUED_EMAIL_BACKEND='django.core.mail.backends.smtp.EmailBackend',
+    EMAIL_BATCH_SIZE=10,
+)
+class QueuedEmailTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.smtp = SMTPSink()
+        threading.Thread(target=cls.smtp.serve_forever, daemon=True).start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.smtp.shutdown()
+        cls.smtp.server_close()
+        super().tearDownClass()
+
+    def setUp(self):
+        self.smtp.connections = 0
+        self.smtp.messages.clear()
+        port = self.smtp.server_address[1]
+        smtp_settings = override_settings(EMAIL_HOST='127.0.0.1',
+                                          EMAIL_PORT=port)
+        smtp_settings.enable()
+        self.addCleanup(smtp_settings.disable)
+
+    def send(self, count: int):
+        for number in range(count):
+            mail.send_mail(
+                f'Письмо {number}', 'Текст', 'yatube@example.com',
+                [f'user{number}@example.com']
+            )
+
+    def test_request_only_enqueues(self):
+        """Письма ложатся в очередь, на сервер в запросе не ходим,
+        задача доставки ставится после фиксации транзакции."""
+        with mock.patch(
+            'core.jobs.transaction.on_commit', lambda func: func()
+        ):
+            self.send(2)
+        self.assertEqual(
+            OutgoingEmail.objects.filter(
+                status=OutgoingEmail.PENDING
+            ).count(), 2
+        )
+        self.assertEqual(self.smtp.connections, 0)
+        self.assertTrue(Job.objects.filter(
+            name='core.tasks.deliver_queued_email'
+        ).exists())
+
+    def test_batch_uses_one_connection(self):
+        """Пачка писем уходит через одно SMTP-соединение."""
+        self.send(3)
+        self.assertEqual(deliver_batch(), 3)
+        self.assertEqual(self.smtp.connections, 1)
+        self.assertEqual(len(self.smtp.messages), 3)
+        self.assertEqual(
+            OutgoingEmail.objects.filter(status=OutgoingEmail.SENT).count(),
+            3
+        )
+
+    def test_crashed_worker_emails_are_redelivered(self):
+        """Письма упавшего воркера отправляются после истечения аренды."""
+        self.send(1)
+        claim_emails('crashed', 10)
+        self.assertEqual(deliver_batch(), 0)
+        OutgoingEmail.objects.update(
+            locked_until=timezone.now() - timedelta(seconds=1)
+        )
+        self.assertEqual(deliver_batch(), 1)
+        self.assertEqual(len(self.smtp.messages), 1)
+
+    def test_unreachable_server_retries_later(self):
+        """Недоступный сервер откладывает письма, не теряя их."""
+        self.send(1)
+        with override_settings(EMAIL_PORT=1):
+            self.assertEqual(deliver_batch(), 0)
+        email = OutgoingEmail.objects.get()
+        self.assertEqual(email.status, OutgoingEmail.PENDING)
+        self.assertEqual(email.attempts, 1)
+        self.assertGreater(email.send_after, timezone.now())
+
+    def test_password_reset_is_queued(self):
+        """Сброс пароля не отправляет письмо в запросе."""
+        User.objects.create_user(
+            username='reset', email='reset@example.com', password='pass'
+        )
+        Client().post(
+            reverse('password_reset'), {'email': 'reset@example.com'}
+        )
+        email = OutgoingEmail.objects.get()
+        self.assertEqual(email.recipients, 'reset@example.com')
+        self.assertEqual(self.smtp.connections, 0)
+        deliver_batch()
+        self.assertIn(b'reset@example.com', self.smtp.messages[0])
+
+
+class SQLiteProfileTest(TestCase):
+    """Соединения с файлом базы: прагмы, BEGIN IMMEDIATE, проверка
+    persistent-соединений."""
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory, ignore_errors=True)
+        self.path = os.path.join(self.directory, 'profile.sqlite3')
+        settings_dict = dict(connection.settings_dict, NAME=self.path)
+        settings_dict['PRAGMAS'] = {'cache_size': -1024}
+        self.db = DatabaseWrapper(settings_dict, alias='profile')
+        self.addCleanup(self.db.close)
+
+    def pragma(self, name):
+        with self.db.cursor() as cursor:
+            cursor.execute(f'PRAGMA {name}')
+            return cursor.fetchone()[0]
+
+    def test_pragmas_applied_to_new_connection(self):
+        """SQLITE_PRAGMAS и PRAGMAS базы ставятся при подключении."""
+        self.assertEqual(self.pragma('journal_mode'), 'wal')
+        self.assertEqual(self.pragma('busy_timeout'), 5000)
+        self.assertEqual(self.pragma('synchronous'), 1)
+        self.assertEqual(self.pragma('cache_size'), -1024)
+
+    def test_atomic_begins_immediate(self):
+        """atomic() сразу берёт блокировку на запись: второй писатель
+        не может начать транзакцию, даже если первый ещё не писал."""
+        other = DatabaseWrapper(
+            dict(self.db.settings_dict, PRAGMAS={'busy_timeout': 0}),
+            alias='other',
+        )
+        self.addCleanup(other.close)
+        # Так начинает транзакцию transaction.atomic().
+        self.db.set_autocommit(
+            False, force_begin_transaction_with_broken_autocommit=True
+        )
+        with self.assertRaisesMessage(Exception, 'locked'):
+            other.cursor().execute('BEGIN IMMEDIATE')
+        self.db.rollback()
+        self.db.set_autocommit(True)
+
+    def test_replaced_database_file_closes_connection(self):
+        """Подменённый файл базы — соединение закрывается."""
+        self.db.ensure_connection()
+        with mock.patch('core.db.connections.all', return_value=[self.db]):
+            check_connections()
+            self.assertIsNotNone(self.db.connection)
+            replacement = self.path + '.new'
+            open(replacement, 'wb').close()
+            os.replace(replacement, self.path)
+            check_connections()
+        self.assertIsNone(self.db.connection)
+
+
+class ReplicaRouterTest(TestCase):
+    """Чтения read_replica идут в реплику, записи и недавние
+    писатели — в основную базу."""
+
+    def setUp(self):
+        self.router = PrimaryReplicaRouter()
+        self.replica = mock.patch.dict(connections.databases, {REPLICA: {}})
+
+    def test_reads_use_replica_only_when_configured(self):
+        with replica_reads():
+            self.assertEqual(self.router.db_for_read(Post), 'default')
+            with self.replica:
+                self.assertEqual(self.router.db_for_read(Post), REPLICA)
+                self.assertEqual(self.router.db_for_write(Post), 'default')
+        with self.replica:
+            self.assertEqual(self.router.db_for_read(Post), 'default')
+            self.assertFalse(
+                self.router.allow_migrate(REPLICA, 'posts', model_name='post')
+            )
+
+    def test_write_makes_reads_stick_to_primary(self):
+        """После записи пользователь какое-то время читает основную
+        базу и видит свой пост."""
+        user = User.objects.create_user(username='writer')
+        client = Client()
+        client.force_login(user)
+
+        @read_replica
+        def view(request):
+            return self.router.db_for_read(Post)
+
+        with self.replica:
+            client.post(reverse('posts:post_create'), {'text': 'Новый'})
+            cookie = client.cookies[STICKY_COOKIE]
+            self.assertEqual(
+                cookie['max-age'], settings.REPLICA_STICKY_SECONDS
+            )
+            factory = RequestFactory()
+            request = factory.get('/')
+            self.assertEqual(view(request), REPLICA)
+            request.COOKIES[STICKY_COOKIE] = cookie.value
+            written = datetime.fromtimestamp(
+                float(cookie.value), tz=dt_timezone.utc
+            )
+            synced = mock.patch('core.replica.replica_synced_at')
+            with synced as synced_at:
+                # Реплику ещё не синхронизировали или снимок старше записи.
+                synced_at.return_value = None
+                self.assertEqual(view(request), 'default')
+                synced_at.return_value = written - timedelta(seconds=30)
+                self.assertEqual(view(request), 'default')
+                synced_at.return_value = written + timedelta(seconds=1)
+                self.assertEqual(view(request), REPLICA)
+
+    def test_no_sticky_cookie_without_replica(self):
+        user = User.objects.create_user(username='writer')
+        client = Client()
+        client.force_login(user)
+        client.post(reverse('posts:post_create'), {'text': 'Новый'})
+        self.assertNotIn(STICKY_COOKIE, client.cookies)
+
+
+class SyncReplicaTest(TransactionTestCase):
+    """Снимок backup API нельзя снять с соединения внутри незавершённой
+    транзакции записи, поэтому тест без общей транзакции."""
+
+    def test_sync_replica_copies_database_and_measures_lag(self):
+        user = User.objects.create_user(username='author')
+        Post.objects.create(author=user, text='В реплику')
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory, ignore_errors=True)
+        path = os.path.join(directory, 'replica.sqlite3')
+        self.assertIsNone(replica_lag('default'))
+        synced = sync_replica(path)
+        replica = sqlite3.connect(path)
+        self.addCleanup(replica.close)
+        self.assertEqual(
+            replica.execute('SELECT text FROM posts_post').fetchall(),
+            [('В реплику',)]
+        )
+        self.assertEqual(
+            replica.execute('PRAGMA journal_mode').fetchone()[0], 'delete'
+        )
+        self.assertEqual(
+            replica.execute(
+                'SELECT count(*) FROM core_replicaheartbeat'
+            ).fetchone()[0], 1
+        )
+        with mock.patch('core.replica.timezone.now',
+                        return_value=synced + timedelta(seconds=3)):
+            self.assertEqual(replica_lag('default'), 3)
+
+
+@override_settings(WRITE_FUNNEL=True)
+class WriteFunnelTest(TransactionTestCase):
+    """Поток-писатель ходит в базу своим соединением, поэтому
+    тест без общей транзакции."""
+
+    def setUp(self):
+        self.funnel = WriteFunnel()
+        self.author = User.objects.create_user(username='author')
+        self.release = threading.Event()
+        self.addCleanup(self.release.set)
+
+    def create_post(self, text):
+        if text == 'ошибка':
+            raise ValueError(text)
+        return Post.objects.create(author=self.author, text=text).text
+
+    def block(self):
+        """Занимает поток-писатель, пока не будет release."""
+        started = threading.Event()
+        self.funnel.submit(lambda: (started.set(), self.release.wait()))
+        started.wait()
+
+    def test_queued_writes_run_as_one_batch(self):
+        self.block()
+        with mock.patch.object(self.funnel, 'execute',
+                               wraps=self.funnel.execute) as execute:
+            futures = [
+                self.funnel.submit(self.create_post, f'Пост {number}')
+                for number in range(10)
+            ]
+            self.release.set()
+            results = [future.result(5) for future in futures]
+        self.assertEqual(results, [f'Пост {number}' for number in range(10)])
+        self.assertEqual(execute.call_count, 1)
+        self.assertEqual(len(execute.call_args[0][0]), 10)
+
+    def test_failed_write_does_not_roll_back_batch(self):
+        self.block()
+        futures = [
+            self.funnel.submit(self.create_post, text)
+            for text in ('первый', 'ошибка', 'второй')
+        ]
+        self.release.set()
+        self.assertEqual(futures[0].result(5), 'первый')
+        with self.assertRaises(ValueError):
+            futures[1].result(5)
+        self.assertEqual(futures[2].result(5), 'второй')
+        self.assertEqual(
+            sorted(Post.objects.values_list('text', flat=True)),
+            ['второй', 'первый']
+        )
+
+    def test_write_not_started_in_time_is_cancelled(self):
+        self.block()
+        with self.assertRaises(WriteTimeout):
+            self.funnel.call(self.create_post, 'поздно', timeout=0.05)
+        self.release.set()
+        self.assertEqual(self.funnel.call(self.create_post, 'вовремя'),
+                         'вовремя')
+        self.assertFalse(Post.objects.filter(text='поздно').exists())
+
+    def test_write_inside_transaction_runs_in_place(self):
+        with transaction.atomic():
+            thread = write(lambda: threading.current_thread())
+        self.assertIs(thread, threading.current_thread())
+        self.assertIsNot(write(lambda: threading.current_thread()),
+                         threading.current_thread())
+
+    def test_views_write_through_funnel(self):
+        follower = User.objects.create_user(username='follower')
+        post = Post.objects.create(author=self.author, text='Пост')
+        client = Client()
+        client.force_login(follower)
+        client.post(
+            reverse('posts:add_comment', args=(post.id,)), {'text': 'Да'}
+        )
+        client.post(reverse('posts:profile_follow', args=('author',)))
+        self.assertTrue(Comment.objects.filter(post=post, text='Да').exists())
+        self.assertTrue(
+            Follow.objects.filter(user=follower, author=self.author).exists()
+        )
+
+
+class IdentityMapMiddlewareTest(TestCase):
+    def test_map_lives_for_one_request(self):
+        seen = []
+
+        def view(request):
+            seen.append(current_map())
+            return HttpResponse()
+
+        middleware = IdentityMapMiddleware(view)
+        request = RequestFactory().get('/')
+        middleware(request)
+        middleware(request)
+        self.assertIsNotNone(seen[0])
+        self.assertIsNot(seen[0], seen[1])
+        self.assertIsNone(current_map())
@@ -1,4 +1,29 @@
+import mimetypes
+import os
+import re
+
+from django.conf import settings
+from django.contrib.admin.views.decorators import staff_member_required
+from django.core.exceptions import SuspiciousFileOperation
+from django.http import (FileResponse, Http404, HttpResponse,
+                         HttpResponseNotModified, JsonResponse,
+                         StreamingHttpResponse)
 from django.shortcuts import render
+from django.utils._os import safe_join
+from django.utils.http import http_date, parse_etags
+from django.views.decorators.http import require_safe
+
+from .jobs import queue_metrics
+from .replica import replica_lag
+from .routers import replica_configured
+from .storage import MANIFEST_NAME_RE, PRECOMPRESSED_VARIANTS, name_digest
+
+RANGE_RE = re.compile(r'^bytes=(?P<start>\d*)-(?P<end>\d*)$')
+THUMBNAIL_NAME_RE = re.compile(
+    r'^cache/(?:[0-9a-f]{2}/){2}[0-9a-f]{32}\.\w+$'
+)
+STREAM_CHUNK_SIZE: int = 64 * 1024
+IMMUTABLE_MAX_AGE: int = 365 * 24 * 60 * 60
 
 
 def page_not_found(request, exception):
@@ -15,3 +40,225 @@ def server_error(request):
 
 def permission_denied(request, exception):
     return render(request, 'core/403.html', status=403)
+
+
+def is_immutable(path: str) -> bool:
+    """Файл с именем по содержимому никогда не меняется.
+    Миниатюры sorl называются по ключу исходника и параметров,
+    поэтому для таких исходников тоже неизменны."""
+    return bool(name_digest(path) or THUMBNAIL_NAME_RE.match(path))
+
+
+def parse_range(header: str, size: int):
+    """Разбирает одиночный диапазон из заголовка Range.
+    Возвращает (start, end) включительно, None если заголовок
+    не поддерживается, и False если диапазон невыполним."""
+    match = RANGE_RE.match(header.strip())
+    if not match or not (match.group('start') or match.group('end')):
+        return None
+    start, end = match.group('start'), match.group('end')
+    if not start:
+        length = int(end)
+        if not length:
+            return False
+        return max(size - length, 0), size - 1
+    start = int(start)
+    end = min(int(end), size - 1) if end else size - 1
+    if start >= size or start > end:
+        return False
+    return start, end
+
+
+def file_range(path: str, start: int, length: int):
+    """Читает кусок файла порциями."""
+    with open(path, 'rb') as file:
+        file.seek(start)
+        while length > 0:
+            chunk = file.read(min(STREAM_CHUNK_SIZE, length))
+            if not chunk:
+                break
+            length -= len(chunk)
+            yield chunk
+
+
+def with_headers(response, headers):
+    for header, value in headers.items():
+        response[header] = value
+    return response
+
+
+def offload(response, path: str, full_path: str):
+    """Отдаёт файл силами фронтового прокси, если он настроен.
+    nginx получает внутренний адрес в X-Accel-Redirect,
+    Apache и lighttpd — путь в X-Sendfile."""
+    header = getattr(settings, 'MEDIA_SENDFILE_HEADER', None)
+    if header == 'X-Accel-Redirect':
+        response[header] = settings.MEDIA_ACCEL_REDIRECT_URL + path
+    elif header:
+        response[header] = full_path
+    return bool(header)
+
+
+def resolve_file(root: str, path: str):
+    """Путь и os.stat файла внутри root или Http404."""
+    try:
+        full_path = safe_join(root, path)
+        stat = os.stat(full_path)
+    except (SuspiciousFileOperation, FileNotFoundError, NotADirectoryError):
+        raise Http404
+    if not os.path.isfile(full_path):
+        raise Http404
+    return full_path, stat
+
+
+def file_headers(etag: str, stat, immutable: bool, max_age: int):
+    """Заголовки валидации и кэширования для отдаваемого файла."""
+    if immutable:
+        cache_control = f'public, max-age={IMMUTABLE_MAX_AGE}, immutable'
+    else:
+        cache_control = f'public, max-age={max_age}'
+    return {
+        'ETag': etag,
+        'Cache-Control': cache_control,
+        'Last-Modified': http_date(stat.st_mtime),
+        'Accept-Ranges': 'bytes',
+    }
+
+
+def not_modified(request, etag: str) -> bool:
+    if_none_match = request.META.get('HTTP_IF_NONE_MATCH')
+    return bool(if_none_match) and (
+        etag in parse_etags(if_none_match) or if_none_match.strip() == '*'
+    )
+
+
+def file_response(request, full_path: str, size: int, etag: str,
+                  content_type: str):
+    """Отдаёт файл целиком или запрошенный диапазон."""
+    byte_range = None
+    range_header = request.META.get('HTTP_RANGE')
+    if_range = request.META.get('HTTP_IF_RANGE')
+    if range_header and (not if_range or if_range.strip() == etag):
+        byte_range = parse_range(range_header, size)
+    if byte_range is False:
+        response = HttpResponse(status=416)
+        response['Content-Range'] = f'bytes */{size}'
+        return response
+    if not byte_range:
+        response = FileResponse(
+            open(full_path, 'rb'), content_type=content_type
+        )
+        response['Content-Length'] = str(size)
+        return response
+    start, end = byte_range
+    response = StreamingHttpResponse(
+        file_range(full_path, start, end - start + 1),
+        status=206,
+        content_type=content_type,
+    )
+    response['Content-Range'] = f'bytes {start}-{end}/{size}'
+    response['Content-Length'] = str(end - start + 1)
+    return response
+
+
+@require_safe
+def serve_media(request, path: str):
+    """Отдаёт загруженные файлы.
+    Поддерживает If-None-Match и одиночные диапазоны Range,
+    для неизменных имён ставит долгий immutable-кэш.
+    Если настроен MEDIA_SENDFILE_HEADER, тело отдаёт прокси,
+    а воркер возвращает только заголовки."""
+    full_path, stat = resolve_file(settings.MEDIA_ROOT, path)
+    digest = name_digest(path)
+    etag = f'"{digest}"' if digest else (
+        f'"{stat.st_size:x}-{stat.st_mtime_ns:x}"'
+    )
+    headers = file_headers(
+        etag, stat, is_immutable(path), settings.MEDIA_CACHE_MAX_AGE
+    )
+    if not_modified(request, etag):
+        return with_headers(HttpResponseNotModified(), headers)
+
+    content_type, encoding = mimetypes.guess_type(full_path)
+    content_type = content_type or 'application/octet-stream'
+    response = HttpResponse(content_type=content_type)
+    if offload(response, path, full_path):
+        return with_headers(response, headers)
+
+    response = file_response(
+        request, full_path, stat.st_size, etag, content_type
+    )
+    if encoding:
+        response['Content-Encoding'] = encoding
+    return with_headers(response, headers)
+
+
+def accepted_variants(accept_encoding: str):
+    """Заранее сжатые варианты, которые принимает клиент,
+    в порядке предпочтения: сначала br, потом gzip."""
+    accepted = set()
+    for part in accept_encoding.split(','):
+        coding, _, params = part.strip().partition(';')
+        quality = params.strip()
+        if quality.startswith('q='):
+            try:
+                if float(quality[2:]) == 0:
+                    continue
+            except ValueError:
+                continue
+        accepted.add(coding.strip().lower())
+    return [
+        (coding, suffix) for coding, suffix in PRECOMPRESSED_VARIANTS
+        if coding in accepted or '*' in accepted
+    ]
+
+
+@require_safe
+def serve_static(request, path: str):
+    """Отдаёт собранную collectstatic статику из STATIC_ROOT.
+    Если клиент принимает br или gzip и рядом лежит сжатая копия,
+    отдаёт её без сжатия на лету. Хэшированные имена кэшируются
+    навсегда."""
+    content_type, _ = mimetypes.guess_type(path)
+    content_type = content_type or 'application/octet-stream'
+    accept_encoding = request.META.get('HTTP_ACCEPT_ENCODING', '')
+    variants = accepted_variants(accept_encoding) + [(None, '')]
+    for coding, suffix in variants:
+        try:
+            full_path, stat = resolve_file(
+                settings.STATIC_ROOT, path + suffix
+            )
+        except Http404:
+            if coding is None:
+                raise
+            continue
+        break
+    etag = f'"{stat.st_size:x}-{stat.st_mtime_ns:x}{suffix}"'
+    headers = file_headers(
+        etag, stat, bool(MANIFEST_NAME_RE.search(path)),
+        settings.STATIC_CACHE_MAX_AGE
+    )
+    headers['Vary'] = 'Accept-Encoding'
+    if not_modified(request, etag):
+        return with_headers(HttpResponseNotModified(), headers)
+    response = file_response(
+        request, full_path, stat.st_size, etag, content_type
+    )
+    if coding:
+        response['Content-Encoding'] = coding
+    return with_headers(response, headers)
+
+
+@staff_member_required
+def job_queue_metrics(request):
+    """Глубина и задержки очереди фоновых задач для мониторинга."""
+    return JsonResponse(queue_metrics())
+
+
+@staff_member_required
+def replica_metrics(request):
+    """Отставание реплики для чтения в секундах."""
+    return JsonResponse({
+        'configured': replica_configured(),
+        'lag': replica_lag() if replica_configured() else None,
+    })
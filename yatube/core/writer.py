@@ -0,0 +1,131 @@
+import queue
+import threading
+from concurrent.futures import Future
+from concurrent.futures import TimeoutError as FutureTimeout
+from functools import wraps
+
+from django.conf import settings
+from django.db import close_old_connections, connection, transaction
+from django.shortcuts import render
+
+BATCH_SIZE: int = 100
+
+
+class WriteTimeout(Exception):
+    """Запись не начала выполняться за WRITE_FUNNEL_TIMEOUT секунд
+    и отменена."""
+
+
+class WriteFunnel:
+    """Один поток-писатель на процесс. Мелкие записи из запросов
+    встают в очередь, и поток выполняет всё накопившееся одной
+    транзакцией: потоки процесса не борются за блокировку записи
+    SQLite, а на пачку приходится один коммит. Каждая запись — в своей
+    точке сохранения, ошибка одной не откатывает остальные.
+    Процессы друг другу писателя не передают: выигрыш есть только
+    у многопоточных воркеров (см. WRITE_FUNNEL в settings)."""
+
+    def __init__(self, batch_size: int = BATCH_SIZE):
+        self.batch_size = batch_size
+        self.queue = queue.SimpleQueue()
+        self.lock = threading.Lock()
+        self.thread = None
+
+    def start(self) -> None:
+        with self.lock:
+            # После fork поток родителя в дочернем процессе не живёт.
+            if self.thread is None or not self.thread.is_alive():
+                self.thread = threading.Thread(
+                    target=self.run, name='write-funnel', daemon=True
+                )
+                self.thread.start()
+
+    def submit(self, func, *args, **kwargs) -> Future:
+        future = Future()
+        self.queue.put((future, func, args, kwargs))
+        self.start()
+        return future
+
+    def call(self, func, *args, timeout: float = None, **kwargs):
+        """Выполняет func через поток-писатель и возвращает результат.
+        Если запись не началась за timeout, она отменяется
+        и вызывается WriteTimeout; начатая запись дожидается
+        своей пачки."""
+        if timeout is None:
+            timeout = settings.WRITE_FUNNEL_TIMEOUT
+        future = self.submit(func, *args, **kwargs)
+        try:
+            return future.result(timeout)
+        except FutureTimeout:
+            if future.cancel():
+                raise WriteTimeout(f'Запись не началась за {timeout} с')
+            return future.result()
+
+    def run(self) -> None:
+        while True:
+            batch = [self.queue.get()]
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self.queue.get_nowait())
+                except queue.Empty:
+                    break
+            self.execute(batch)
+
+    def execute(self, batch) -> None:
+        batch = [
+            item for item in batch if item[0].set_running_or_notify_cancel()
+        ]
+        if not batch:
+            return
+        # Запросов в этом потоке нет, за возрастом соединения
+        # следим сами.
+        close_old_connections()
+        results = []
+        try:
+            with transaction.atomic():
+                for future, func, args, kwargs in batch:
+                    try:
+                        with transaction.atomic():
+                            results.append((future, func(*args, **kwargs)))
+                    except Exception as error:
+                        results.append((future, error))
+        except Exception as error:
+            for future, *_ in batch:
+                future.set_exception(error)
+            return
+        for future, result in results:
+            if isinstance(result, Exception):
+                future.set_exception(result)
+            else:
+                future.set_result(result)
+
+
+funnel = WriteFunnel()
+
+
+def write(func, *args, **kwargs):
+    """Выполняет небольшую запись через поток-писатель, если включён
+    WRITE_FUNNEL, иначе сразу. Внутри транзакции запись тоже идёт
+    сразу: поток-писатель ждал бы блокировку, которую держит
+    вызывающий, а вызывающий — его."""
+    if not settings.WRITE_FUNNEL or connection.in_atomic_block:
+        return func(*args, **kwargs)
+    return funnel.call(func, *args, **kwargs)
+
+
+def write_view(view):
+    """Декоратор представлений, которые пишут через write():
+    при WriteTimeout пользователь получает страницу «повторите позже»
+    с кодом 503 и Retry-After, а не ошибку 500."""
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        try:
+            return view(request, *args, **kwargs)
+        except WriteTimeout:
+            response = render(
+                request, 'core/503.html', {'path': request.path},
+                status=503
+            )
+            response['Retry-After'] = str(settings.WRITE_FUNNEL_TIMEOUT)
+            return response
+    return wrapper
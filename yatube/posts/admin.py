@@ -1,18 +1,80 @@
+from core.admin import BackgroundDeletionMixin
 from django.contrib import admin
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.expressions import RawSQL
 
-from .models import Comment, Follow, Group, Post
+from .deletion import soft_delete_post
+from .models import (ArchivedPost, Comment, Follow, Group, GroupFollow,
+                     Post, PostFingerprint, Tag)
+from .search import fts_enabled, match_expression, matching_ids_sql
 
 
 @admin.register(Post)
-class PostAdmin(admin.ModelAdmin):
+class PostAdmin(BackgroundDeletionMixin, admin.ModelAdmin):
     """Настройки отображения данных таблицы POST(все посты)."""
     list_display = ('pk', 'text', 'pub_date', 'author', 'group', 'image')
     search_fields = ('text',)
     list_filter = ('pub_date',)
     list_editable = ('group',)
     empty_value_display = '-пусто-'
+    soft_delete = staticmethod(soft_delete_post)
+
+    def get_search_results(self, request, queryset, search_term):
+        """Ищет по полнотекстовому индексу вместо LIKE '%...%'."""
+        expression = match_expression(search_term)
+        if not expression or not fts_enabled():
+            return super().get_search_results(
+                request, queryset, search_term
+            )
+        return queryset.filter(
+            pk__in=RawSQL(matching_ids_sql(), [expression])
+        ), False
+
+
+@admin.register(PostFingerprint)
+class DuplicateClusterAdmin(admin.ModelAdmin):
+    """Кластеры почти одинаковых постов, самые крупные первыми."""
+    list_display = ('cluster', 'cluster_size', 'post', 'post_author')
+    list_select_related = ('post__author',)
+    search_fields = ('=cluster',)
+    readonly_fields = ('post', 'simhash', 'cluster')
+
+    def get_queryset(self, request):
+        sizes = (
+            PostFingerprint.objects.filter(cluster=OuterRef('cluster'))
+            .order_by().values('cluster').annotate(size=Count('post'))
+            .values('size')
+        )
+        return super().get_queryset(request).annotate(
+            cluster_size=Subquery(sizes)
+        ).filter(cluster_size__gt=1)
+
+    def get_ordering(self, request):
+        return ('-cluster_size', 'cluster', 'post')
+
+    def has_add_permission(self, request):
+        return False
+
+    def cluster_size(self, obj):
+        return obj.cluster_size
+    cluster_size.short_description = 'Постов в кластере'
+    cluster_size.admin_order_field = 'cluster_size'
+
+    def post_author(self, obj):
+        return obj.post.author
+    post_author.short_description = 'Автор'
 
 
 admin.site.register(Group)
 admin.site.register(Comment)
 admin.site.register(Follow)
+admin.site.register(GroupFollow)
+admin.site.register(Tag)
+
+
+@admin.register(ArchivedPost)
+class ArchivedPostAdmin(admin.ModelAdmin):
+    list_display = ('pk', 'text', 'pub_date', 'author', 'archived')
+    list_select_related = ('author',)
+    search_fields = ('text',)
+    raw_id_fields = ('author',)
@@ -1,7 +1,13 @@
 from django.apps import AppConfig
+from django.db.models.signals import post_migrate
 
 
 class PostsConfig(AppConfig):
     """Приложение для управления постами."""
     name = 'posts'
     verbose_name: str = "Посты"
+
+    def ready(self):
+        from . import signals
+
+        post_migrate.connect(signals.restore_search_index, sender=self)
@@ -0,0 +1,144 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from .models import (ArchivedComment, ArchivedMention, ArchivedPost,
+                     ArchivedRevision, Comment, Mention, Post, PostRevision,
+                     PostTag)
+from .signals import acquire_image
+
+BATCH_SIZE: int = 200
+
+# Таблицы, размер которых показывает archive_posts --stats.
+HOT_TABLES = ('posts_post', 'posts_comment', 'posts_postrevision')
+ARCHIVE_TABLES = (
+    'posts_archivedpost', 'posts_archivedcomment', 'posts_archivedrevision',
+)
+
+
+def archive_cutoff(days: int = None):
+    """Посты, опубликованные раньше этого момента, уходят в архив."""
+    if days is None:
+        days = settings.POST_ARCHIVE_DAYS
+    return timezone.now() - timedelta(days=days)
+
+
+def archive_batch(cutoff, batch_size: int = BATCH_SIZE) -> int:
+    """Переносит в архив пачку самых старых опубликованных постов
+    одной короткой транзакцией. Вместе с постом переносятся
+    комментарии, история правок, теги, упоминания и SimHash.
+    Посты с неразосланными упоминаниями ждут рассылки.
+    Возвращает число перенесённых постов."""
+    with transaction.atomic():
+        posts = list(
+            Post.objects.published()
+            .filter(is_deleted=False, pub_date__lt=cutoff)
+            .exclude(mentions__notified=False)
+            .select_related('fingerprint')
+            .order_by('pub_date')[:batch_size]
+        )
+        if not posts:
+            return 0
+        ids = [post.id for post in posts]
+        ArchivedPost.objects.bulk_create(
+            archived_post(post) for post in posts
+        )
+        comment_ids = archive_comments(ids)
+        archive_history(ids, comment_ids)
+        # Удаление поста отпускает ссылку на картинку
+        # (posts.signals), архивная запись берёт свою.
+        for post in posts:
+            acquire_image(post.image.storage, post.image.name)
+        Post.objects.filter(id__in=ids).delete()
+    return len(posts)
+
+
+def archived_post(post) -> ArchivedPost:
+    fingerprint = getattr(post, 'fingerprint', None)
+    return ArchivedPost(
+        id=post.id,
+        text=post.text,
+        author_id=post.author_id,
+        group_id=post.group_id,
+        image=post.image.name,
+        pub_date=post.pub_date,
+        views=post.views,
+        simhash=fingerprint and fingerprint.simhash,
+        cluster=fingerprint and fingerprint.cluster,
+    )
+
+
+def archive_comments(post_ids) -> set:
+    """Копирует неудалённые комментарии постов, возвращает их id."""
+    comments = [
+        ArchivedComment(**comment)
+        for comment in Comment.objects.filter(
+            post_id__in=post_ids, is_deleted=False
+        ).values('id', 'post_id', 'author_id', 'text', 'pub_date')
+    ]
+    ArchivedComment.objects.bulk_create(comments)
+    return {comment.id for comment in comments}
+
+
+def archive_history(post_ids, comment_ids) -> None:
+    """Копирует версии, теги и упоминания постов. Упоминания
+    из удалённых комментариев в архив не попадают."""
+    ArchivedRevision.objects.bulk_create(
+        ArchivedRevision(**revision)
+        for revision in PostRevision.objects.filter(
+            post_id__in=post_ids
+        ).values('post_id', 'number', 'is_snapshot', 'data', 'created')
+    )
+    ArchivedPost.tags.through.objects.bulk_create(
+        ArchivedPost.tags.through(archivedpost_id=post_id, tag_id=tag_id)
+        for post_id, tag_id in PostTag.objects.filter(
+            post_id__in=post_ids
+        ).values_list('post_id', 'tag_id')
+    )
+    ArchivedMention.objects.bulk_create(
+        ArchivedMention(**mention)
+        for mention in Mention.objects.filter(post_id__in=post_ids).values(
+            'user_id', 'post_id', 'comment_id', 'created', 'notified'
+        )
+        if mention['comment_id'] is None
+        or mention['comment_id'] in comment_ids
+    )
+
+
+class ArchiveChain:
+    """Лента постов автора для Paginator: сначала горячие посты,
+    за ними архивные. В архив уходят самые старые посты, поэтому
+    порядок по -pub_date при склейке сохраняется."""
+    ordered = True
+
+    def __init__(self, hot, archived):
+        self.hot = hot
+        self.archived = archived
+        self._counts = None
+
+    def counts(self):
+        if self._counts is None:
+            self._counts = (self.hot.count(), self.archived.count())
+        return self._counts
+
+    def count(self) -> int:
+        return sum(self.counts())
+
+    def __len__(self):
+        return self.count()
+
+    def __getitem__(self, index):
+        if not isinstance(index, slice):
+            return self[index:index + 1][0]
+        start, stop, _ = index.indices(self.count())
+        hot_count, _ = self.counts()
+        items = []
+        if start < hot_count:
+            items += list(self.hot[start:min(stop, hot_count)])
+        if stop > hot_count:
+            items += list(
+                self.archived[max(start - hot_count, 0):stop - hot_count]
+            )
+        return items
@@ -0,0 +1,118 @@
+import atexit
+import logging
+import threading
+import time
+from collections import Counter
+
+from core.writer import write
+from django.conf import settings
+from django.db.models import Case, F, IntegerField, Value, When
+
+from .models import Post
+
+UPDATE_CHUNK_SIZE: int = 500
+
+logger = logging.getLogger(__name__)
+
+
+def apply_increments(increments) -> int:
+    """Прибавляет счётчики одним UPDATE ... CASE на порцию постов.
+    Возвращает число выполненных запросов."""
+    items = list(increments.items())
+    statements = 0
+    for start in range(0, len(items), UPDATE_CHUNK_SIZE):
+        chunk = items[start:start + UPDATE_CHUNK_SIZE]
+        Post.objects.filter(pk__in=[post_id for post_id, _ in chunk]).update(
+            views=F('views') + Case(
+                *[When(pk=post_id, then=Value(count))
+                  for post_id, count in chunk],
+                default=Value(0),
+                output_field=IntegerField(),
+            )
+        )
+        statements += 1
+    return statements
+
+
+class ViewCounterBuffer:
+    """Копит просмотры постов в памяти процесса и сбрасывает их
+    в базу пачкой раз в flush_interval секунд или по достижении
+    flush_size просмотров, вместо UPDATE на каждый запрос.
+    Сброс по интервалу проверяется только при очередном просмотре:
+    если просмотров больше нет, остаток лежит в памяти до следующего
+    просмотра любого поста или до штатной остановки процесса
+    (flush_at_exit)."""
+
+    def __init__(self, flush_interval: float, flush_size: int):
+        self.flush_interval = flush_interval
+        self.flush_size = flush_size
+        self.pending = Counter()
+        self.hits = 0
+        self.last_flush = time.monotonic()
+        self.lock = threading.Lock()
+        self.flush_lock = threading.Lock()
+
+    def hit(self, post_id: int) -> None:
+        with self.lock:
+            self.pending[post_id] += 1
+            self.hits += 1
+            due = (
+                self.hits >= self.flush_size
+                or time.monotonic() - self.last_flush >= self.flush_interval
+            )
+        if due:
+            try:
+                self.flush()
+            except Exception:
+                # Просмотры уже вернулись в буфер; страница поста
+                # не должна падать из-за занятой базы.
+                logger.warning('Не удалось записать просмотры', exc_info=True)
+
+    def buffered(self, post_id: int) -> int:
+        """Просмотры поста, ещё не записанные в базу."""
+        return self.pending.get(post_id, 0)
+
+    def flush(self, funnel: bool = True) -> int:
+        """Записывает накопленное. Если запись не удалась,
+        просмотры возвращаются в буфер до следующей попытки.
+        funnel=False пишет в текущем потоке, минуя core.writer."""
+        if not self.flush_lock.acquire(blocking=False):
+            return 0
+        try:
+            with self.lock:
+                increments, self.pending = self.pending, Counter()
+                self.hits = 0
+                self.last_flush = time.monotonic()
+            if not increments:
+                return 0
+            try:
+                if funnel:
+                    return write(apply_increments, increments)
+                return apply_increments(increments)
+            except Exception:
+                with self.lock:
+                    self.pending.update(increments)
+                    self.hits += sum(increments.values())
+                raise
+        finally:
+            self.flush_lock.release()
+
+    def discard(self) -> None:
+        """Забывает накопленные просмотры, не записывая их."""
+        with self.lock:
+            self.pending = Counter()
+            self.hits = 0
+
+
+view_counter = ViewCounterBuffer(
+    flush_interval=settings.VIEW_COUNTER_FLUSH_INTERVAL,
+    flush_size=settings.VIEW_COUNTER_FLUSH_SIZE,
+)
+
+
+def flush_at_exit() -> None:
+    """Записывает остаток просмотров при штатной остановке процесса.
+    Вызывается из yatube.wsgi, то есть только в процессах сервера:
+    тесты и команды manage.py WSGI-приложение не загружают."""
+    # При остановке процесса поток-писатель уже может не работать.
+    atexit.register(view_counter.flush, funnel=False)
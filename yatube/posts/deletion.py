@@ -0,0 +1,25 @@
+from core.deletion import schedule_deletion
+from django.db import transaction
+
+from .models import Comment, Post
+
+HIDDEN = {'is_deleted': True, 'is_published': False, 'publish_at': None}
+
+
+def soft_delete_post(post):
+    """Сразу снимает пост с публикации (и из очереди запланированных),
+    удаление поста с комментариями и прочим идёт в фоне."""
+    with transaction.atomic():
+        Post.objects.filter(pk=post.pk).update(**HIDDEN)
+        return schedule_deletion(post)
+
+
+def soft_delete_user(user):
+    """Блокирует пользователя и одним UPDATE на таблицу прячет его
+    посты и комментарии; сами записи удаляются в фоне пачками."""
+    with transaction.atomic():
+        user.is_active = False
+        user.save(update_fields=['is_active'])
+        Post.objects.filter(author=user).update(**HIDDEN)
+        Comment.objects.filter(author=user).update(is_deleted=True)
+        return schedule_deletion(user)
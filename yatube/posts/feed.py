@@ -0,0 +1,72 @@
+import heapq
+from itertools import islice
+
+from django.db.models import Q
+
+from .models import Follow, GroupFollow, Post
+
+
+def unique_keys(keys):
+    """Пропускает повторы: пост из группы подписанного автора
+    приходит из обоих источников."""
+    seen = set()
+    for key in keys:
+        if key[1] not in seen:
+            seen.add(key[1])
+            yield key
+
+
+class MergedFeed:
+    """Лента из нескольких источников постов, слитых по (pub_date, id).
+    Каждое условие — отдельный запрос по своему индексу; сливаются
+    и очищаются от повторов только ключи (pub_date, id), а сами
+    посты страницы читаются одним запросом. Большого OR-запроса нет.
+    Поддерживает count() и срезы, поэтому подходит для Paginator."""
+
+    ordered = True
+
+    def __init__(self, queryset, *conditions):
+        self.queryset = queryset
+        self.sources = [
+            queryset.filter(condition).order_by('-pub_date', '-id')
+            for condition in conditions
+        ]
+
+    def count(self) -> int:
+        ids = [source.order_by().values('id') for source in self.sources]
+        return ids[0].union(*ids[1:]).count()
+
+    def __len__(self):
+        return self.count()
+
+    def __getitem__(self, index):
+        if isinstance(index, int):
+            try:
+                return self[index:index + 1][0]
+            except IndexError:
+                raise IndexError('Индекс за пределами ленты')
+        start, stop = index.start or 0, index.stop
+        if stop is None:
+            raise ValueError('Для ленты нужен срез с концом')
+        # Первые stop уникальных постов всегда лежат среди первых stop
+        # постов хотя бы одного источника.
+        streams = [
+            source.values_list('pub_date', 'id')[:stop]
+            for source in self.sources
+        ]
+        merged = heapq.merge(*streams, reverse=True)
+        ids = [
+            post_id for _, post_id in islice(unique_keys(merged), start, stop)
+        ]
+        posts = self.queryset.in_bulk(ids)
+        return [posts[post_id] for post_id in ids]
+
+
+def subscription_feed(user):
+    """Посты авторов и групп, на которые подписан пользователь."""
+    # IN (подзапрос), а не JOIN: повторные подписки не дублируют посты.
+    return MergedFeed(
+        Post.objects.published().select_related('author', 'group'),
+        Q(author__in=Follow.objects.filter(user=user).values('author')),
+        Q(group__in=GroupFollow.objects.filter(user=user).values('group')),
+    )
@@ -1,4 +1,5 @@
 from django import forms
+from django.utils import timezone
 
 from .models import Comment, Post
 
@@ -20,6 +21,25 @@ class PostForm(forms.ModelForm):
         }
 
 
+class ScheduleForm(forms.Form):
+    """ Форма отложенной публикации поста."""
+    publish_at = forms.DateTimeField(
+        label='Время публикации',
+        required=False,
+        input_formats=['%Y-%m-%dT%H:%M', '%Y-%m-%d %H:%M'],
+        widget=forms.DateTimeInput(
+            attrs={'type': 'datetime-local'}, format='%Y-%m-%dT%H:%M'
+        ),
+        help_text='Оставьте пустым, чтобы опубликовать сразу'
+    )
+
+    def clean_publish_at(self):
+        publish_at = self.cleaned_data['publish_at']
+        if publish_at is not None and publish_at <= timezone.now():
+            raise forms.ValidationError('Укажите время в будущем')
+        return publish_at
+
+
 class CommentForm(forms.ModelForm):
     """ Форма для создания и редактирования постов."""
     class Meta:
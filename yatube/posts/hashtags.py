@@ -0,0 +1,57 @@
+import re
+
+from .models import PostTag, Tag
+
+HASHTAG_RE = re.compile(r'(?<![\w&#])#(\w{1,100})', re.UNICODE)
+
+
+def extract_hashtags(text: str) -> set:
+    """Возвращает множество тегов из текста в нижнем регистре."""
+    return {tag.lower() for tag in HASHTAG_RE.findall(text or '')}
+
+
+def get_or_create_tags(names) -> dict:
+    """Теги по именам двумя-тремя запросами на любое их число."""
+    names = set(names)
+    if not names:
+        return {}
+    tags = {tag.name: tag for tag in Tag.objects.filter(name__in=names)}
+    missing = names - tags.keys()
+    if missing:
+        Tag.objects.bulk_create(
+            [Tag(name=name) for name in missing], ignore_conflicts=True
+        )
+        tags.update(
+            (tag.name, tag) for tag in Tag.objects.filter(name__in=missing)
+        )
+    return tags
+
+
+def index_hashtags(posts, replace: bool = True) -> int:
+    """Записывает теги постов в обратный индекс.
+    При replace=True убирает теги, которых больше нет в тексте.
+    Возвращает число добавленных связей."""
+    posts = list(posts)
+    post_names = {post.id: extract_hashtags(post.text) for post in posts}
+    tags = get_or_create_tags(set().union(*post_names.values()))
+    existing = set()
+    if replace:
+        stale = []
+        links = PostTag.objects.filter(post__in=post_names).values_list(
+            'id', 'post_id', 'tag__name'
+        )
+        for link_id, post_id, name in links:
+            if name in post_names[post_id]:
+                existing.add((post_id, name))
+            else:
+                stale.append(link_id)
+        if stale:
+            PostTag.objects.filter(id__in=stale).delete()
+    new_links = [
+        PostTag(tag=tags[name], post=post, pub_date=post.pub_date)
+        for post in posts
+        for name in post_names[post.id]
+        if (post.id, name) not in existing
+    ]
+    PostTag.objects.bulk_create(new_links, ignore_conflicts=True)
+    return len(new_links)
@@ -0,0 +1,105 @@
+import hashlib
+
+from core.identity import current_map
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS
+from django.http import Http404
+
+from .models import Group, User
+
+# Уникальные поля, по которым объекты ищут в представлениях.
+NATURAL_KEYS = {User: ('username',), Group: ('slug',)}
+LOOKUP_CACHE_TIMEOUT: int = 15 * 60
+# Несуществующие имена кэшируются ненадолго: перебор случайных
+# адресов не доходит до базы, а новая группа видна после сохранения.
+MISSING_CACHE_TIMEOUT: int = 60
+MISSING = 'missing'
+
+
+def cache_key(model, field: str, value) -> str:
+    digest = hashlib.md5(str(value).encode()).hexdigest()
+    return f'posts:lookup:{model._meta.label_lower}:{field}:{digest}'
+
+
+def forget_lookups(model, field: str, *values) -> None:
+    cache.delete_many([
+        cache_key(model, field, value) for value in values
+        if value is not None
+    ])
+
+
+def get_cached(model, **lookup):
+    """model.objects.get() по одному уникальному полю. Сначала реестр
+    запроса, затем общий кэш (в том числе отрицательный: «такого нет»),
+    и только потом основная база. Кэш сбрасывается при сохранении
+    и удалении объекта (posts.signals)."""
+    (field, value), = lookup.items()
+    identity = current_map()
+    if identity is not None:
+        instance = identity.get(model, field, value)
+        if instance is not None:
+            return instance
+    key = cache_key(model, field, value)
+    instance = cache.get(key)
+    if instance == MISSING:
+        raise model.DoesNotExist
+    if instance is None:
+        try:
+            # Кэш заполняется только из основной базы: отставшая
+            # реплика закэшировала бы «такого нет» для только что
+            # созданного объекта или старое имя после переименования.
+            instance = model.objects.using(DEFAULT_DB_ALIAS).get(**lookup)
+        except model.DoesNotExist:
+            cache.set(key, MISSING, MISSING_CACHE_TIMEOUT)
+            raise
+        cache.set(key, instance, LOOKUP_CACHE_TIMEOUT)
+    if identity is not None:
+        identity.add(instance, NATURAL_KEYS.get(model, ()))
+    return instance
+
+
+def get_user_or_404(username: str):
+    try:
+        return get_cached(User, username=username)
+    except User.DoesNotExist:
+        raise Http404('Нет такого пользователя')
+
+
+def get_group_or_404(slug: str):
+    try:
+        return get_cached(Group, slug=slug)
+    except Group.DoesNotExist:
+        raise Http404('Нет такой группы')
+
+
+def load_related(objects, field: str):
+    """Подставляет объектам связанные по внешнему ключу field:
+    уже известные берутся из реестра запроса, остальные читаются
+    одним запросом. Одинаковые авторы строк страницы — один экземпляр."""
+    objects = list(objects)
+    if not objects:
+        return objects
+    foreign_key = objects[0]._meta.get_field(field)
+    model = foreign_key.related_model
+    identity = current_map()
+    known, missing = {}, set()
+    for obj in objects:
+        value = getattr(obj, foreign_key.attname)
+        if value is None or value in known:
+            continue
+        instance = (
+            identity.get(model, 'pk', value) if identity is not None else None
+        )
+        if instance is not None:
+            known[value] = instance
+        else:
+            missing.add(value)
+    for instance in model.objects.filter(pk__in=missing):
+        if identity is not None:
+            identity.add(instance, NATURAL_KEYS.get(model, ()))
+        known[instance.pk] = instance
+    for obj in objects:
+        value = getattr(obj, foreign_key.attname)
+        if value in known:
+            setattr(obj, field, known[value])
+    return objects
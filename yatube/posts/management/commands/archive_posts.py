@@ -0,0 +1,73 @@
+import time
+
+from core.db import table_stats
+from django.core.management.base import BaseCommand
+
+from posts.archive import (ARCHIVE_TABLES, BATCH_SIZE, HOT_TABLES,
+                           archive_batch, archive_cutoff)
+
+
+class Command(BaseCommand):
+    help = (
+        'Переносит опубликованные посты старше POST_ARCHIVE_DAYS дней '
+        'вместе с комментариями в архивные таблицы небольшими пачками.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--older-than', type=int, default=None,
+            help='Возраст поста в днях, по умолчанию POST_ARCHIVE_DAYS.'
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=BATCH_SIZE,
+            help='Сколько постов переносить одной транзакцией.'
+        )
+        parser.add_argument(
+            '--sleep', type=float, default=0.5,
+            help='Пауза между пачками, секунд: даёт пройти записям '
+                 'пользователей.'
+        )
+        parser.add_argument(
+            '--limit', type=int, default=None,
+            help='Перенести не больше стольких постов за запуск.'
+        )
+        parser.add_argument(
+            '--stats', action='store_true',
+            help='Показать размер таблиц и глубину индексов до и после.'
+        )
+
+    def handle(self, *args, **options):
+        cutoff = archive_cutoff(options['older_than'])
+        limit = options['limit']
+        if options['stats']:
+            before = table_stats(HOT_TABLES + ARCHIVE_TABLES)
+        archived = 0
+        while limit is None or archived < limit:
+            batch_size = options['batch_size']
+            if limit is not None:
+                batch_size = min(batch_size, limit - archived)
+            moved = archive_batch(cutoff, batch_size)
+            archived += moved
+            if options['verbosity'] > 1 and moved:
+                self.stdout.write(f'Перенесено: {archived}')
+            if moved < batch_size:
+                break
+            time.sleep(options['sleep'])
+        self.stdout.write(self.style.SUCCESS(
+            f'Перенесено в архив постов: {archived}'
+        ))
+        if options['stats']:
+            self.report(before, table_stats(HOT_TABLES + ARCHIVE_TABLES))
+
+    def report(self, before, after):
+        """Страницы, байты и глубина B-дерева каждой таблицы и индекса.
+        Место удалённых строк SQLite отдаёт в список свободных страниц,
+        файл уменьшит только VACUUM."""
+        for name in sorted(set(before) | set(after)):
+            pages, size, depth = before.get(name, (0, 0, 0))
+            new_pages, new_size, new_depth = after.get(name, (0, 0, 0))
+            self.stdout.write(
+                f'{name}: страниц {pages} -> {new_pages}, '
+                f'байт {size} -> {new_size}, '
+                f'глубина {depth} -> {new_depth}'
+            )
@@ -0,0 +1,37 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from posts.models import Post
+from posts.simhash import fingerprint_post
+
+
+class Command(BaseCommand):
+    help = 'Считает SimHash для постов, у которых его ещё нет.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--chunk-size', type=int, default=1000,
+            help='Сколько постов обрабатывать между паузами.'
+        )
+        parser.add_argument(
+            '--sleep', type=float, default=0.0,
+            help='Пауза между порциями, секунд.'
+        )
+
+    def handle(self, *args, **options):
+        last_id = processed = 0
+        while True:
+            chunk = list(
+                Post.objects.filter(id__gt=last_id, fingerprint__isnull=True)
+                .order_by('id').only('id', 'text')[:options['chunk_size']]
+            )
+            if not chunk:
+                break
+            for post in chunk:
+                fingerprint_post(post)
+            processed += len(chunk)
+            last_id = chunk[-1].id
+            self.stdout.write(f'Обработано постов: {processed}')
+            time.sleep(options['sleep'])
+        self.stdout.write(self.style.SUCCESS('Отпечатки посчитаны.'))
@@ -0,0 +1,41 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from posts.hashtags import index_hashtags
+from posts.models import Post
+
+
+class Command(BaseCommand):
+    help = 'Разбирает #теги уже существующих постов порциями.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--chunk-size', type=int, default=2000,
+            help='Сколько постов обрабатывать за одну транзакцию.'
+        )
+        parser.add_argument(
+            '--sleep', type=float, default=0.0,
+            help='Пауза между порциями, секунд.'
+        )
+
+    def handle(self, *args, **options):
+        chunk_size = options['chunk_size']
+        last_id = processed = linked = 0
+        while True:
+            chunk = list(
+                Post.objects.filter(id__gt=last_id).order_by('id')
+                .only('id', 'text', 'pub_date')[:chunk_size]
+            )
+            if not chunk:
+                break
+            with transaction.atomic():
+                linked += index_hashtags(chunk)
+            processed += len(chunk)
+            last_id = chunk[-1].id
+            self.stdout.write(
+                f'Постов: {processed}, новых связей с тегами: {linked}'
+            )
+            time.sleep(options['sleep'])
+        self.stdout.write(self.style.SUCCESS('Теги разобраны.'))
@@ -0,0 +1,114 @@
+import random
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.db.models import Q
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from posts.feed import subscription_feed
+from posts.models import Follow, Group, GroupFollow, Post, User
+from posts.utils import POST_NUMB
+
+BATCH_SIZE: int = 500
+
+
+class Command(BaseCommand):
+    help = (
+        'Замеряет ленту подписок читателя, подписанного на сотни '
+        'авторов и групп: слияние источников против одного OR-запроса. '
+        'Работает в транзакции, которая откатывается.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--authors', type=int, default=300)
+        parser.add_argument('--groups', type=int, default=300)
+        parser.add_argument('--posts', type=int, default=50000)
+        parser.add_argument('--pages', type=int, nargs='+',
+                            default=[1, 10, 100])
+        parser.add_argument('--repeat', type=int, default=5)
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            reader = self.populate(options)
+            feed = subscription_feed(reader)
+            or_query = Post.objects.published().select_related(
+                'author', 'group'
+            ).filter(
+                Q(author__following__user=reader)
+                | Q(group__followers__user=reader)
+            ).distinct().order_by('-pub_date', '-id')
+            for title, posts in (('слияние', feed), ('OR-запрос', or_query)):
+                self.report(title, 'count', lambda: posts.count(), options)
+                for page in options['pages']:
+                    start = (page - 1) * POST_NUMB
+                    self.report(
+                        title, f'страница {page}',
+                        lambda: list(posts[start:start + POST_NUMB]),
+                        options,
+                    )
+            transaction.set_rollback(True)
+
+    def populate(self, options):
+        prefix = 'bench_feed'
+        User.objects.bulk_create(
+            (
+                User(username=f'{prefix}_{i}')
+                for i in range(options['authors'] * 2)
+            ),
+            batch_size=BATCH_SIZE,
+        )
+        users = list(User.objects.filter(username__startswith=prefix))
+        reader = User.objects.create(username=f'{prefix}_reader')
+        Group.objects.bulk_create(
+            (
+                Group(title=f'Группа {i}', slug=f'{prefix}-{i}',
+                      description='')
+                for i in range(options['groups'] * 2)
+            ),
+            batch_size=BATCH_SIZE,
+        )
+        groups = list(Group.objects.filter(slug__startswith=prefix))
+        Follow.objects.bulk_create(
+            (
+                Follow(user=reader, author=author)
+                for author in random.sample(users, options['authors'])
+            ),
+            batch_size=BATCH_SIZE,
+        )
+        GroupFollow.objects.bulk_create(
+            (
+                GroupFollow(user=reader, group=group)
+                for group in random.sample(groups, options['groups'])
+            ),
+            batch_size=BATCH_SIZE,
+        )
+        now = timezone.now()
+        Post.objects.bulk_create(
+            (
+                Post(
+                    author=random.choice(users),
+                    group=random.choice(groups + [None]),
+                    text=f'Пост {i}',
+                    pub_date=now - timedelta(minutes=i),
+                )
+                for i in range(options['posts'])
+            ),
+            batch_size=BATCH_SIZE,
+        )
+        return reader
+
+    def report(self, title, what, func, options):
+        timings = []
+        for _ in range(options['repeat']):
+            with CaptureQueriesContext(connection) as queries:
+                started = time.perf_counter()
+                func()
+                timings.append(time.perf_counter() - started)
+        median = sorted(timings)[len(timings) // 2]
+        self.stdout.write(
+            f'{title}, {what}: медиана {median * 1000:.1f} мс, '
+            f'запросов {len(queries.captured_queries)}'
+        )
@@ -0,0 +1,73 @@
+import random
+import time
+import zlib
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models.functions import Length
+
+from posts.models import Post, User
+from posts.revisions import COMPRESS_LEVEL, revision_text
+
+
+class Command(BaseCommand):
+    help = (
+        'Замеряет рост хранилища истории правок на длинном посте: '
+        'байт на правку против полной и сжатой полной копии, '
+        'и худшее время восстановления версии. '
+        'Работает в транзакции, которая откатывается.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--lines', type=int, default=500)
+        parser.add_argument('--edits', type=int, default=100)
+        parser.add_argument(
+            '--changed-lines', type=int, default=3,
+            help='Сколько строк меняет одна правка.'
+        )
+
+    def handle(self, *args, **options):
+        random.seed(0)
+        lines = [self.line(i) for i in range(options['lines'])]
+        full = compressed = 0
+        with transaction.atomic():
+            author = User.objects.create(username='bench_post_revisions')
+            post = Post.objects.create(author=author, text='\n'.join(lines))
+            for _ in range(options['edits']):
+                for _ in range(options['changed_lines']):
+                    lines[random.randrange(len(lines))] = self.line(
+                        random.randrange(10 ** 6)
+                    )
+                post.text = '\n'.join(lines)
+                post.save()
+                encoded = post.text.encode()
+                full += len(encoded)
+                compressed += len(zlib.compress(encoded, COMPRESS_LEVEL))
+            sizes = list(
+                post.revisions.filter(number__gt=1)
+                .annotate(size=Length('data'))
+                .values_list('is_snapshot', 'size')
+            )
+            worst = 0.0
+            for number in range(1, options['edits'] + 2):
+                started = time.perf_counter()
+                revision_text(post, number)
+                worst = max(worst, time.perf_counter() - started)
+            transaction.set_rollback(True)
+
+        edits = options['edits']
+        deltas = [size for snapshot, size in sizes if not snapshot]
+        self.stdout.write(
+            f'Пост: {len(encoded)} байт, правок: {edits}.\n'
+            f'Полная копия: {full / edits:.0f} байт на правку, '
+            f'сжатая копия: {compressed / edits:.0f}, '
+            f'история: {sum(size for _, size in sizes) / edits:.0f} '
+            f'(разница в среднем {sum(deltas) / max(len(deltas), 1):.0f}).\n'
+            f'Худшее восстановление версии: {worst * 1000:.1f} мс.'
+        )
+
+    def line(self, seed: int) -> str:
+        return f'Строка {seed}: ' + ' '.join(
+            random.choice(('пост', 'группа', 'автор', 'текст', 'правка'))
+            for _ in range(8)
+        )
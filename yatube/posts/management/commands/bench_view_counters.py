@@ -0,0 +1,70 @@
+import random
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.db.models import F
+from django.test.utils import CaptureQueriesContext
+
+from posts.counters import ViewCounterBuffer
+from posts.models import Post, User
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнивает UPDATE на каждый просмотр с буферизованными '
+        'счётчиками: число запросов на запись и время. '
+        'Работает в транзакции, которая откатывается.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--hits', type=int, default=10000)
+        parser.add_argument('--posts', type=int, default=200)
+        parser.add_argument('--flush-size', type=int, default=500)
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            author = User.objects.create(username='bench_view_counters')
+            Post.objects.bulk_create(
+                Post(author=author, text=f'Пост {i}')
+                for i in range(options['posts'])
+            )
+            post_ids = list(author.posts.values_list('id', flat=True))
+            hits = [random.choice(post_ids) for _ in range(options['hits'])]
+
+            naive = self.measure(lambda: [
+                Post.objects.filter(pk=post_id).update(views=F('views') + 1)
+                for post_id in hits
+            ])
+            buffer = ViewCounterBuffer(
+                flush_interval=float('inf'),
+                flush_size=options['flush_size'],
+            )
+
+            def buffered():
+                for post_id in hits:
+                    buffer.hit(post_id)
+                buffer.flush()
+
+            batched = self.measure(buffered)
+            transaction.set_rollback(True)
+
+        for title, (writes, seconds) in (
+            ('UPDATE на просмотр', naive), ('буфер', batched)
+        ):
+            self.stdout.write(
+                f'{title}: запросов на запись {writes} '
+                f'({writes / len(hits):.4f} на просмотр), '
+                f'{seconds * 1000:.1f} мс'
+            )
+
+    def measure(self, func):
+        with CaptureQueriesContext(connection) as queries:
+            started = time.perf_counter()
+            func()
+            seconds = time.perf_counter() - started
+        writes = sum(
+            1 for query in queries.captured_queries
+            if query['sql'].startswith('UPDATE')
+        )
+        return writes, seconds
@@ -0,0 +1,43 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from posts.recommendations import (TOP_N, compute_recommendations,
+                                   recompute_stale)
+
+
+class Command(BaseCommand):
+    help = (
+        'Считает рекомендации «Кого почитать» по графу подписок. '
+        'По умолчанию только для пользователей, чьи подписки менялись.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--all', action='store_true',
+            help='Пересчитать рекомендации всех пользователей.'
+        )
+        parser.add_argument(
+            '--workers', type=int, default=1,
+            help='Сколько процессов считают шарды пользователей.'
+        )
+        parser.add_argument(
+            '--top', type=int, default=TOP_N,
+            help='Сколько рекомендаций хранить на пользователя.'
+        )
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        if options['all']:
+            saved = compute_recommendations(
+                workers=options['workers'], top_n=options['top']
+            )
+            message = f'Сохранено рекомендаций: {saved}'
+        else:
+            users = recompute_stale(
+                workers=options['workers'], top_n=options['top']
+            )
+            message = f'Пересчитано пользователей: {users}'
+        self.stdout.write(self.style.SUCCESS(
+            f'{message} за {time.monotonic() - started:.2f} с.'
+        ))
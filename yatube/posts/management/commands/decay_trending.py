@@ -0,0 +1,33 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from posts.trending import decay_since_last
+
+
+class Command(BaseCommand):
+    help = (
+        'Уменьшает счета популярности по времени и удаляет выдохшиеся. '
+        'Запускается по расписанию или с --loop.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--interval', type=float, default=300.0,
+            help='Пауза между запусками в режиме --loop; при самом '
+                 'первом затухании считается прошедшим временем.'
+        )
+        parser.add_argument(
+            '--loop', action='store_true',
+            help='Не завершаться, затухать каждые --interval секунд.'
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            factor, removed = decay_since_last(options['interval'])
+            self.stdout.write(
+                f'Затухание x{factor:.4f}, удалено записей: {removed}'
+            )
+            if not options['loop']:
+                break
+            time.sleep(options['interval'])
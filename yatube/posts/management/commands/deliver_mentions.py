@@ -0,0 +1,36 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from posts.mentions import deliver_mentions
+
+
+class Command(BaseCommand):
+    help = (
+        'Рассылает уведомления об @упоминаниях пачками. '
+        'С --loop работает как фоновый воркер.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=500,
+            help='Сколько упоминаний обрабатывать за раз.'
+        )
+        parser.add_argument(
+            '--loop', action='store_true',
+            help='Не завершаться, опрашивать очередь с паузой.'
+        )
+        parser.add_argument(
+            '--interval', type=float, default=5.0,
+            help='Пауза между опросами пустой очереди, секунд.'
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            delivered = deliver_mentions(options['batch_size'])
+            if delivered:
+                self.stdout.write(f'Обработано упоминаний: {delivered}')
+                continue
+            if not options['loop']:
+                break
+            time.sleep(options['interval'])
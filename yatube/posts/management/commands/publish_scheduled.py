@@ -0,0 +1,44 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from posts.scheduling import BATCH_SIZE, next_due_time, publish_due
+
+
+class Command(BaseCommand):
+    help = (
+        'Публикует запланированные посты, время которых наступило. '
+        'Запускается по расписанию или с --loop.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=BATCH_SIZE,
+            help='Сколько постов публиковать одной транзакцией.'
+        )
+        parser.add_argument(
+            '--loop', action='store_true',
+            help='Не завершаться, ждать следующих постов.'
+        )
+        parser.add_argument(
+            '--interval', type=float, default=30.0,
+            help='Самая долгая пауза между проверками в режиме --loop, '
+                 'секунд.'
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            published = publish_due(batch_size=options['batch_size'])
+            if published or options['verbosity'] > 1:
+                self.stdout.write(f'Опубликовано постов: {published}')
+            if not options['loop']:
+                break
+            time.sleep(self.pause(options['interval']))
+
+    def pause(self, interval: float) -> float:
+        """Спит до ближайшего поста в очереди, но не дольше interval."""
+        due = next_due_time()
+        if due is None:
+            return interval
+        return min(max((due - timezone.now()).total_seconds(), 0), interval)
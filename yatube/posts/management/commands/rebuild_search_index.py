@@ -0,0 +1,33 @@
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+
+from posts.search import FTS_TABLE, ensure_search_index, fts_enabled
+
+
+class Command(BaseCommand):
+    help = (
+        'Пересобирает полнотекстовый индекс постов одной транзакцией. '
+        'Читатели до её завершения видят прежний индекс, записи в '
+        'posts_post ждут её окончания.'
+    )
+
+    def handle(self, *args, **options):
+        if not fts_enabled():
+            self.stderr.write('Полнотекстовый индекс есть только у SQLite.')
+            return
+        ensure_search_index()
+        # Индекс с внешним содержимым нельзя пересобирать порциями:
+        # триггер правки или удаления поста, ещё не попавшего в индекс,
+        # выполнил бы 'delete' несуществующей записи и испортил индекс.
+        with transaction.atomic(), connection.cursor() as cursor:
+            cursor.execute(
+                f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')"
+            )
+            cursor.execute(
+                f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('optimize')"
+            )
+            cursor.execute('SELECT COUNT(*) FROM posts_post')
+            indexed = cursor.fetchone()[0]
+        self.stdout.write(self.style.SUCCESS(
+            f'Индекс пересобран, постов: {indexed}.'
+        ))
@@ -0,0 +1,108 @@
+import re
+from collections import defaultdict
+
+from core.jobs import lease_rows
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.db.models import Q
+from django.urls import reverse
+from django.utils import timezone
+
+from .models import Mention, User
+
+MENTION_RE = re.compile(r'(?<![\w@])@([\w.@+-]{1,150})', re.UNICODE)
+
+
+def extract_mentions(text: str) -> set:
+    """Имена пользователей из @упоминаний; точка в конце фразы
+    именем не считается."""
+    return {name.rstrip('.') for name in MENTION_RE.findall(text or '')}
+
+
+def record_mentions(text: str, author_id: int, post_id: int,
+                    comment=None) -> int:
+    """Сохраняет упоминания из текста.
+    Пользователи ищутся одним запросом username__in, строки
+    добавляются одним bulk_create; уже упомянутые в этом посте
+    или комментарии повторно не записываются."""
+    names = extract_mentions(text)
+    if not names:
+        return 0
+    user_ids = set(
+        User.objects.filter(username__in=names)
+        .exclude(id=author_id).values_list('id', flat=True)
+    )
+    if not user_ids:
+        return 0
+    already = Mention.objects.filter(
+        post_id=post_id, comment=comment, user_id__in=user_ids
+    ).values_list('user_id', flat=True)
+    new_mentions = [
+        Mention(user_id=user_id, post_id=post_id, comment=comment)
+        for user_id in user_ids - set(already)
+    ]
+    Mention.objects.bulk_create(new_mentions)
+    return len(new_mentions)
+
+
+def mention_message(user, mentions) -> EmailMessage:
+    lines = [f'{user.username}, вас упомянули на Yatube:', '']
+    for mention in mentions:
+        place = 'в комментарии к посту' if mention.comment_id else 'в посте'
+        url = reverse(
+            'posts:post_detail', kwargs={'post_id': mention.post_id}
+        )
+        lines.append(f'{place} {mention.post_id}: {url}')
+    return EmailMessage(
+        subject='Вас упомянули на Yatube',
+        body='\n'.join(lines),
+        from_email=settings.DEFAULT_FROM_EMAIL,
+        to=[user.email],
+    )
+
+
+def claim_mentions(worker: str, limit: int):
+    """Берёт в аренду пачку неотправленных упоминаний
+    (core.jobs.lease_rows): строку получает только один рассыльщик,
+    а строки упавшего вернутся после аренды."""
+    now = timezone.now()
+    token = lease_rows(
+        worker, limit,
+        Mention.objects.filter(
+            Q(locked_until__isnull=True) | Q(locked_until__lt=now),
+            notified=False, post__is_published=True,
+        ).order_by('id'),
+    )
+    if token is None:
+        return []
+    return list(
+        Mention.objects.filter(locked_by=token, notified=False)
+        .select_related('user').order_by('id')
+    )
+
+
+def deliver_mentions(batch_size: int = 500, worker: str = 'mentions') -> int:
+    """Рассылает пачку неотправленных уведомлений.
+    Упоминания одного пользователя собираются в одно письмо,
+    вся пачка уходит через одно соединение с почтовым сервером.
+    Пачка берётся в аренду, поэтому параллельные задачи и команда
+    deliver_mentions не отправляют одно уведомление дважды.
+    Возвращает число обработанных упоминаний."""
+    pending = claim_mentions(worker, batch_size)
+    if not pending:
+        return 0
+    by_user = defaultdict(list)
+    for mention in pending:
+        by_user[mention.user].append(mention)
+    messages = [
+        mention_message(user, mentions)
+        for user, mentions in by_user.items() if user.email
+    ]
+    if messages:
+        with get_connection() as connection:
+            connection.send_messages(messages)
+    Mention.objects.filter(
+        id__in=[mention.id for mention in pending],
+        locked_by=pending[0].locked_by,
+    ).update(notified=True, locked_until=None)
+    return len(pending)
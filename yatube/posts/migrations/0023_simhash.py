@@ -0,0 +1,42 @@
+# Generated by Django 2.2.16 on 2026-10-19 02:38
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0022_mention'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PostFingerprint',
+            fields=[
+                ('post', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='fingerprint', serialize=False, to='posts.Post', verbose_name='Пост')),
+                ('simhash', models.BigIntegerField(verbose_name='SimHash')),
+                ('cluster', models.IntegerField(db_index=True, verbose_name='Кластер')),
+            ],
+            options={
+                'verbose_name': 'отпечаток поста',
+                'verbose_name_plural': 'кластеры похожих постов',
+            },
+        ),
+        migrations.CreateModel(
+            name='SimhashBucket',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('bucket', models.IntegerField(verbose_name='Корзина')),
+                ('post', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='simhash_buckets', to='posts.Post', verbose_name='Пост')),
+            ],
+            options={
+                'verbose_name': 'корзина LSH',
+                'verbose_name_plural': 'корзины LSH',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='simhashbucket',
+            index=models.Index(fields=['bucket', '-post'], name='simhash_bucket'),
+        ),
+    ]
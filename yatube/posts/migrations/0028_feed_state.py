@@ -0,0 +1,28 @@
+# Generated by Django 2.2.16 on 2026-10-19 02:46
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auth', '0011_update_proxy_permissions'),
+        ('posts', '0027_group_follow'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FeedState',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='feed_state', serialize=False, to=settings.AUTH_USER_MODEL, verbose_name='Пользователь')),
+                ('last_seen', models.DateTimeField(null=True, verbose_name='Последний просмотр')),
+                ('unread', models.PositiveIntegerField(default=0, verbose_name='Новых постов')),
+            ],
+            options={
+                'verbose_name': 'состояние ленты',
+                'verbose_name_plural': 'состояния лент',
+            },
+        ),
+    ]
@@ -0,0 +1,66 @@
+# Generated by Django 2.2.16 on 2026-10-19 03:31
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('posts', '0032_archive'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='archivedpost',
+            name='cluster',
+            field=models.IntegerField(blank=True, null=True, verbose_name='Кластер'),
+        ),
+        migrations.AddField(
+            model_name='archivedpost',
+            name='simhash',
+            field=models.BigIntegerField(blank=True, null=True, verbose_name='SimHash'),
+        ),
+        migrations.AddField(
+            model_name='archivedpost',
+            name='tags',
+            field=models.ManyToManyField(blank=True, related_name='archived_posts', to='posts.Tag', verbose_name='Теги'),
+        ),
+        migrations.CreateModel(
+            name='ArchivedRevision',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('number', models.PositiveIntegerField(verbose_name='Номер версии')),
+                ('is_snapshot', models.BooleanField(default=False, verbose_name='Полная копия')),
+                ('data', models.BinaryField(verbose_name='Данные')),
+                ('created', models.DateTimeField(verbose_name='Дата')),
+                ('post', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='revisions', to='posts.ArchivedPost', verbose_name='Пост')),
+            ],
+            options={
+                'verbose_name': 'версия архивного поста',
+                'verbose_name_plural': 'версии архивных постов',
+                'ordering': ('post', '-number'),
+            },
+        ),
+        migrations.CreateModel(
+            name='ArchivedMention',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created', models.DateTimeField(verbose_name='Дата упоминания')),
+                ('notified', models.BooleanField(default=False, verbose_name='Уведомление отправлено')),
+                ('comment', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='mentions', to='posts.ArchivedComment', verbose_name='Комментарий')),
+                ('post', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='mentions', to='posts.ArchivedPost', verbose_name='Пост')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='archived_mentions', to=settings.AUTH_USER_MODEL, verbose_name='Упомянутый пользователь')),
+            ],
+            options={
+                'verbose_name': 'упоминание в архиве',
+                'verbose_name_plural': 'упоминания в архиве',
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='archivedrevision',
+            constraint=models.UniqueConstraint(fields=('post', 'number'), name='unique_archived_revision'),
+        ),
+    ]
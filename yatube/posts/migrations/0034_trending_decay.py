@@ -0,0 +1,24 @@
+# Generated by Django 2.2.16 on 2026-10-19 03:38
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0033_archive_history'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TrendingDecay',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('decayed', models.DateTimeField(verbose_name='Затухание')),
+            ],
+            options={
+                'verbose_name': 'затухание популярности',
+                'verbose_name_plural': 'затухания популярности',
+            },
+        ),
+    ]
@@ -0,0 +1,19 @@
+from django.db import migrations
+
+
+def drop_fingerprints(apps, schema_editor):
+    """Корзины старой разбивки не находят дубликатов по новой:
+    отпечатки заново считает backfill_fingerprints."""
+    apps.get_model('posts', 'SimhashBucket').objects.all().delete()
+    apps.get_model('posts', 'PostFingerprint').objects.all().delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0034_trending_decay'),
+    ]
+
+    operations = [
+        migrations.RunPython(drop_fingerprints, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 2.2.16 on 2026-10-19 03:53
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0035_simhash_bands'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='mention',
+            name='locked_by',
+            field=models.CharField(blank=True, max_length=100, verbose_name='Рассыльщик'),
+        ),
+        migrations.AddField(
+            model_name='mention',
+            name='locked_until',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='Занято до'),
+        ),
+    ]
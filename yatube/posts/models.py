@@ -20,6 +20,12 @@ class Group(models.Model):
         verbose_name_plural = 'Группы'
 
 
+class PostQuerySet(models.QuerySet):
+    def published(self):
+        """Посты, видимые читателям: без запланированных на будущее."""
+        return self.filter(is_published=True)
+
+
 class Post(CreatedModel):
     text = models.TextField(
         'Текст поста',
@@ -48,11 +54,41 @@ class Post(CreatedModel):
         null=True,
         help_text='Можно добавить картинку'
     )
+    views = models.PositiveIntegerField('Просмотры', default=0)
+    publish_at = models.DateTimeField(
+        'Время публикации',
+        blank=True,
+        null=True,
+        help_text='Оставьте пустым, чтобы опубликовать сразу'
+    )
+    is_published = models.BooleanField('Опубликован', default=True)
+    # Удалённый пост сразу снимается с публикации, а сам он
+    # и его зависимые записи удаляются в фоне (core.deletion).
+    is_deleted = models.BooleanField('Удалён', default=False)
+
+    objects = PostQuerySet.as_manager()
 
     class Meta():
         ordering = ['-pub_date', ]
         verbose_name = 'пост'
         verbose_name_plural = 'посты'
+        indexes = [
+            models.Index(
+                fields=('is_published', '-pub_date'), name='post_published'
+            ),
+            # Очередь запланированных постов: в индекс попадают
+            # только неопубликованные, он остаётся крошечным.
+            models.Index(
+                fields=('publish_at',), name='post_publish_queue',
+                condition=models.Q(is_published=False)
+            ),
+            models.Index(
+                fields=('author', '-pub_date'), name='post_author_feed'
+            ),
+            models.Index(
+                fields=('group', '-pub_date'), name='post_group_feed'
+            ),
+        ]
 
     def __str__(self):
         return self.text[:SYMB_NUMB]
@@ -77,6 +113,7 @@ class Comment(CreatedModel):
         'Текст комментария',
         help_text='Введите текст комментария'
     )
+    is_deleted = models.BooleanField('Удалён', default=False)
 
     class Meta:
         ordering = ('-pub_date',)
@@ -104,3 +141,466 @@ class Follow(models.Model):
 
     def __str__(self):
         return f'{self.user} -> {self.author}'
+
+
+class GroupFollow(models.Model):
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='group_follows',
+        verbose_name='Подписчик'
+    )
+    group = models.ForeignKey(
+        Group,
+        on_delete=models.CASCADE,
+        related_name='followers',
+        verbose_name='Группа'
+    )
+
+    class Meta:
+        verbose_name = 'подписка на группу'
+        verbose_name_plural = 'подписки на группы'
+        constraints = [
+            models.UniqueConstraint(
+                fields=('user', 'group'), name='unique_group_follow'
+            ),
+        ]
+
+    def __str__(self):
+        return f'{self.user} -> {self.group}'
+
+
+class Tag(models.Model):
+    name = models.CharField('Тег', max_length=100, unique=True)
+
+    class Meta:
+        verbose_name = 'тег'
+        verbose_name_plural = 'теги'
+
+    def __str__(self):
+        return f'#{self.name}'
+
+
+class PostTag(models.Model):
+    """Обратный индекс тег -> пост.
+    Дата поста продублирована, чтобы лента тега читалась
+    по индексу (tag, -pub_date) без соединения с постами."""
+    tag = models.ForeignKey(
+        Tag,
+        on_delete=models.CASCADE,
+        related_name='post_tags',
+        verbose_name='Тег'
+    )
+    post = models.ForeignKey(
+        Post,
+        on_delete=models.CASCADE,
+        related_name='post_tags',
+        verbose_name='Пост'
+    )
+    pub_date = models.DateTimeField('Дата поста')
+
+    class Meta:
+        verbose_name = 'тег поста'
+        verbose_name_plural = 'теги постов'
+        constraints = [
+            models.UniqueConstraint(
+                fields=('tag', 'post'), name='unique_post_tag'
+            ),
+        ]
+        indexes = [
+            models.Index(
+                fields=('tag', '-pub_date', '-post'), name='post_tag_feed'
+            ),
+        ]
+
+    def __str__(self):
+        return f'{self.tag} -> {self.post_id}'
+
+
+class Mention(models.Model):
+    """Упоминание @пользователя в посте или комментарии.
+    Уведомления рассылает фоновая команда deliver_mentions."""
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='mentions',
+        verbose_name='Упомянутый пользователь'
+    )
+    post = models.ForeignKey(
+        Post,
+        on_delete=models.CASCADE,
+        related_name='mentions',
+        verbose_name='Пост'
+    )
+    comment = models.ForeignKey(
+        Comment,
+        on_delete=models.CASCADE,
+        related_name='mentions',
+        blank=True,
+        null=True,
+        verbose_name='Комментарий'
+    )
+    created = models.DateTimeField('Дата упоминания', auto_now_add=True)
+    notified = models.BooleanField('Уведомление отправлено', default=False)
+    locked_until = models.DateTimeField('Занято до', null=True, blank=True)
+    locked_by = models.CharField('Рассыльщик', max_length=100, blank=True)
+
+    class Meta:
+        verbose_name = 'упоминание'
+        verbose_name_plural = 'упоминания'
+        indexes = [
+            models.Index(
+                fields=('id',), name='mention_pending',
+                condition=models.Q(notified=False)
+            ),
+        ]
+
+    def __str__(self):
+        return f'@{self.user} в {self.post_id}'
+
+
+class PostFingerprint(models.Model):
+    """SimHash текста поста и кластер почти одинаковых постов.
+    cluster — id самого раннего поста кластера."""
+    post = models.OneToOneField(
+        Post,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='fingerprint',
+        verbose_name='Пост'
+    )
+    simhash = models.BigIntegerField('SimHash')
+    cluster = models.IntegerField('Кластер', db_index=True)
+
+    class Meta:
+        verbose_name = 'отпечаток поста'
+        verbose_name_plural = 'кластеры похожих постов'
+
+    def __str__(self):
+        return f'{self.post_id} ~ {self.cluster}'
+
+
+class SimhashBucket(models.Model):
+    """Корзина LSH: одна из полос SimHash поста.
+    Посты с общей корзиной — кандидаты в почти дубликаты."""
+    post = models.ForeignKey(
+        Post,
+        on_delete=models.CASCADE,
+        related_name='simhash_buckets',
+        verbose_name='Пост'
+    )
+    bucket = models.IntegerField('Корзина')
+
+    class Meta:
+        verbose_name = 'корзина LSH'
+        verbose_name_plural = 'корзины LSH'
+        indexes = [
+            models.Index(fields=('bucket', '-post'), name='simhash_bucket'),
+        ]
+
+
+class TrendingPost(models.Model):
+    """Счёт популярности поста с учётом затухания.
+    Пополняется событиями (комментарии, подписки) и периодически
+    уменьшается командой decay_trending, поэтому таблица маленькая,
+    а страница популярного — чтение верхушки индекса."""
+    post = models.OneToOneField(
+        Post,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='trending',
+        verbose_name='Пост'
+    )
+    group = models.ForeignKey(
+        Group,
+        on_delete=models.CASCADE,
+        related_name='trending_posts',
+        blank=True,
+        null=True,
+        verbose_name='Группа'
+    )
+    score = models.FloatField('Счёт', default=0)
+
+    class Meta:
+        verbose_name = 'популярный пост'
+        verbose_name_plural = 'популярные посты'
+        indexes = [
+            models.Index(fields=('-score',), name='trending_post_score'),
+            models.Index(
+                fields=('group', '-score'), name='trending_group_score'
+            ),
+        ]
+
+    def __str__(self):
+        return f'{self.post_id}: {self.score:.2f}'
+
+
+class TrendingGroup(models.Model):
+    """Счёт популярности группы: сумма событий по её постам."""
+    group = models.OneToOneField(
+        Group,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='trending',
+        verbose_name='Группа'
+    )
+    score = models.FloatField('Счёт', default=0, db_index=True)
+
+    class Meta:
+        verbose_name = 'популярная группа'
+        verbose_name_plural = 'популярные группы'
+
+    def __str__(self):
+        return f'{self.group_id}: {self.score:.2f}'
+
+
+class TrendingDecay(models.Model):
+    """Время последнего затухания счетов: по нему decay_trending
+    считает, сколько прошло на самом деле."""
+    decayed = models.DateTimeField('Затухание')
+
+    class Meta:
+        verbose_name = 'затухание популярности'
+        verbose_name_plural = 'затухания популярности'
+
+    def __str__(self):
+        return f'{self.decayed:%Y-%m-%d %H:%M:%S}'
+
+
+class FollowRecommendation(models.Model):
+    """Кого почитать: авторы, на которых подписаны те, на кого
+    подписан пользователь. Считается пакетно командой
+    compute_recommendations, страницы только читают таблицу."""
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='recommendations',
+        verbose_name='Пользователь'
+    )
+    author = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='recommended_to',
+        verbose_name='Автор'
+    )
+    score = models.PositiveIntegerField('Общих подписок')
+
+    class Meta:
+        verbose_name = 'рекомендация'
+        verbose_name_plural = 'рекомендации'
+        constraints = [
+            models.UniqueConstraint(
+                fields=('user', 'author'), name='unique_recommendation'
+            ),
+        ]
+        indexes = [
+            models.Index(
+                fields=('user', '-score'), name='recommendation_top'
+            ),
+        ]
+
+    def __str__(self):
+        return f'{self.user} -> {self.author} ({self.score})'
+
+
+class StaleRecommendation(models.Model):
+    """Пользователь, чьи подписки изменились после расчёта рекомендаций."""
+    user = models.OneToOneField(
+        User,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='+',
+        verbose_name='Пользователь'
+    )
+    changed = models.DateTimeField('Изменено', auto_now=True)
+
+    class Meta:
+        verbose_name = 'устаревшие рекомендации'
+        verbose_name_plural = 'устаревшие рекомендации'
+
+
+class FeedState(models.Model):
+    """Отметка последнего просмотра ленты подписок и число
+    новых постов в ней. Счётчик растёт при публикации поста
+    у всех подписчиков автора и группы, обнуляется в follow_index."""
+    user = models.OneToOneField(
+        User,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='feed_state',
+        verbose_name='Пользователь'
+    )
+    last_seen = models.DateTimeField('Последний просмотр', null=True)
+    unread = models.PositiveIntegerField('Новых постов', default=0)
+
+    class Meta:
+        verbose_name = 'состояние ленты'
+        verbose_name_plural = 'состояния лент'
+
+    def __str__(self):
+        return f'{self.user}: {self.unread}'
+
+
+class PostRevision(models.Model):
+    """Версия текста поста. Каждая SNAPSHOT_INTERVAL-я версия хранится
+    целиком, остальные — сжатой разницей с предыдущей (posts.revisions).
+    Текущий текст по-прежнему лежит в Post.text."""
+    post = models.ForeignKey(
+        Post,
+        on_delete=models.CASCADE,
+        related_name='revisions',
+        verbose_name='Пост'
+    )
+    number = models.PositiveIntegerField('Номер версии')
+    is_snapshot = models.BooleanField('Полная копия', default=False)
+    data = models.BinaryField('Данные')
+    created = models.DateTimeField('Дата', auto_now_add=True)
+
+    class Meta:
+        ordering = ('post', '-number')
+        verbose_name = 'версия поста'
+        verbose_name_plural = 'версии постов'
+        constraints = [
+            models.UniqueConstraint(
+                fields=('post', 'number'), name='unique_post_revision'
+            ),
+        ]
+
+    def __str__(self):
+        return f'{self.post_id} v{self.number}'
+
+
+class ArchivedPost(models.Model):
+    """Старый пост, перенесённый из горячей таблицы Post командой
+    archive_posts (posts.archive). id совпадает с id исходного поста,
+    поэтому ссылки на пост продолжают работать."""
+    id = models.IntegerField(primary_key=True)
+    text = models.TextField('Текст поста')
+    author = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='archived_posts',
+        verbose_name='Автор'
+    )
+    group = models.ForeignKey(
+        Group,
+        on_delete=models.SET_NULL,
+        related_name='archived_posts',
+        blank=True,
+        null=True,
+        verbose_name='Группа'
+    )
+    image = models.ImageField(
+        'Картинка', upload_to='posts/', blank=True, null=True
+    )
+    pub_date = models.DateTimeField('Дата создания')
+    views = models.PositiveIntegerField('Просмотры', default=0)
+    tags = models.ManyToManyField(
+        Tag, related_name='archived_posts', blank=True, verbose_name='Теги'
+    )
+    # Отпечаток из PostFingerprint; корзины LSH по нему не хранятся,
+    # новые посты сравниваются только с горячими.
+    simhash = models.BigIntegerField('SimHash', null=True, blank=True)
+    cluster = models.IntegerField('Кластер', null=True, blank=True)
+    archived = models.DateTimeField('Перенесён в архив', auto_now_add=True)
+
+    class Meta:
+        ordering = ('-pub_date',)
+        verbose_name = 'архивный пост'
+        verbose_name_plural = 'архивные посты'
+        indexes = [
+            models.Index(
+                fields=('author', '-pub_date'), name='archived_author_feed'
+            ),
+        ]
+
+    def __str__(self):
+        return self.text[:SYMB_NUMB]
+
+
+class ArchivedComment(models.Model):
+    """Комментарий архивного поста."""
+    id = models.IntegerField(primary_key=True)
+    post = models.ForeignKey(
+        ArchivedPost,
+        on_delete=models.CASCADE,
+        related_name='comments',
+        verbose_name='Пост'
+    )
+    author = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='archived_comments',
+        verbose_name='Автор'
+    )
+    text = models.TextField('Текст комментария')
+    pub_date = models.DateTimeField('Дата создания')
+
+    class Meta:
+        ordering = ('-pub_date',)
+        verbose_name = 'архивный комментарий'
+        verbose_name_plural = 'архивные комментарии'
+
+    def __str__(self):
+        return self.text[:SYMB_NUMB]
+
+
+class ArchivedRevision(models.Model):
+    """Версия текста архивного поста, копия PostRevision.
+    related_name тот же, поэтому posts.revisions читает её так же."""
+    post = models.ForeignKey(
+        ArchivedPost,
+        on_delete=models.CASCADE,
+        related_name='revisions',
+        verbose_name='Пост'
+    )
+    number = models.PositiveIntegerField('Номер версии')
+    is_snapshot = models.BooleanField('Полная копия', default=False)
+    data = models.BinaryField('Данные')
+    created = models.DateTimeField('Дата')
+
+    class Meta:
+        ordering = ('post', '-number')
+        verbose_name = 'версия архивного поста'
+        verbose_name_plural = 'версии архивных постов'
+        constraints = [
+            models.UniqueConstraint(
+                fields=('post', 'number'), name='unique_archived_revision'
+            ),
+        ]
+
+    def __str__(self):
+        return f'{self.post_id} v{self.number}'
+
+
+class ArchivedMention(models.Model):
+    """Упоминание в архивном посте или его комментарии."""
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='archived_mentions',
+        verbose_name='Упомянутый пользователь'
+    )
+    post = models.ForeignKey(
+        ArchivedPost,
+        on_delete=models.CASCADE,
+        related_name='mentions',
+        verbose_name='Пост'
+    )
+    comment = models.ForeignKey(
+        ArchivedComment,
+        on_delete=models.CASCADE,
+        related_name='mentions',
+        blank=True,
+        null=True,
+        verbose_name='Комментарий'
+    )
+    created = models.DateTimeField('Дата упоминания')
+    notified = models.BooleanField('Уведомление отправлено', default=False)
+
+    class Meta:
+        verbose_name = 'упоминание в архиве'
+        verbose_name_plural = 'упоминания в архиве'
+
+    def __str__(self):
+        return f'@{self.user} в {self.post_id}'
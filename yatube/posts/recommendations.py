@@ -0,0 +1,179 @@
+import heapq
+from array import array
+from bisect import bisect_left
+from collections import Counter
+from multiprocessing import Pool
+
+from django.db import connections, transaction
+from django.utils import timezone
+
+from .models import Follow, FollowRecommendation, StaleRecommendation
+
+TOP_N: int = 10
+SHARD_SIZE: int = 1000
+
+
+class FollowGraph:
+    """Граф подписок в сжатом построчном виде (CSR) на массивах array:
+    подписки пользователя users[i] лежат в
+    targets[offsets[i]:offsets[i + 1]] отсортированными id авторов."""
+
+    def __init__(self, users, offsets, targets):
+        self.users = users
+        self.offsets = offsets
+        self.targets = targets
+
+    @classmethod
+    def load(cls):
+        users, offsets, targets = array('q'), array('q', [0]), array('q')
+        edges = (
+            Follow.objects.order_by('user_id', 'author_id')
+            .values_list('user_id', 'author_id').distinct()
+            .iterator(chunk_size=10000)
+        )
+        for user_id, author_id in edges:
+            if not users or users[-1] != user_id:
+                if users:
+                    offsets.append(len(targets))
+                users.append(user_id)
+            targets.append(author_id)
+        if users:
+            offsets.append(len(targets))
+        return cls(users, offsets, targets)
+
+    def following(self, user_id: int):
+        index = bisect_left(self.users, user_id)
+        if index == len(self.users) or self.users[index] != user_id:
+            return self.targets[0:0]
+        return self.targets[self.offsets[index]:self.offsets[index + 1]]
+
+    def recommend(self, user_id: int, top_n: int = TOP_N):
+        """Друзья друзей: авторы, на которых подписаны авторы
+        пользователя, по числу таких общих подписок."""
+        direct = self.following(user_id)
+        seen = set(direct)
+        seen.add(user_id)
+        counts = Counter()
+        for author_id in direct:
+            counts.update(self.following(author_id))
+        for author_id in seen:
+            counts.pop(author_id, None)
+        return heapq.nlargest(
+            top_n, counts.items(), key=lambda item: (item[1], -item[0])
+        )
+
+
+_graph = None
+
+
+def _init_worker(graph):
+    global _graph
+    _graph = graph
+
+
+def _recommend_shard(args):
+    user_ids, top_n = args
+    return [
+        (user_id, _graph.recommend(user_id, top_n)) for user_id in user_ids
+    ]
+
+
+def shards(user_ids, size: int):
+    for start in range(0, len(user_ids), size):
+        yield user_ids[start:start + size]
+
+
+def save_recommendations(results) -> int:
+    """Заменяет рекомендации пользователей шарда одной транзакцией."""
+    rows = [
+        FollowRecommendation(user_id=user_id, author_id=author_id,
+                             score=score)
+        for user_id, recommended in results
+        for author_id, score in recommended
+    ]
+    with transaction.atomic():
+        FollowRecommendation.objects.filter(
+            user_id__in=[user_id for user_id, _ in results]
+        ).delete()
+        FollowRecommendation.objects.bulk_create(rows)
+    return len(rows)
+
+
+def compute_recommendations(user_ids=None, workers: int = 1,
+                            top_n: int = TOP_N) -> int:
+    """Пересчитывает рекомендации пользователей user_ids
+    (по умолчанию всех, у кого есть подписки; рекомендации тех,
+    кто больше ни на кого не подписан, удаляются).
+    Граф строится один раз, шарды пользователей считаются
+    в workers процессах, запись идёт из главного процесса."""
+    graph = FollowGraph.load()
+    full = user_ids is None
+    if full:
+        user_ids = list(graph.users)
+    tasks = [(shard, top_n) for shard in shards(sorted(user_ids), SHARD_SIZE)]
+    saved = 0
+    if workers > 1 and len(tasks) > 1:
+        # Дочерние процессы не должны унаследовать открытые соединения.
+        connections.close_all()
+        with Pool(workers, initializer=_init_worker,
+                  initargs=(graph,)) as pool:
+            for results in pool.imap_unordered(_recommend_shard, tasks):
+                saved += save_recommendations(results)
+    else:
+        _init_worker(graph)
+        for task in tasks:
+            saved += save_recommendations(_recommend_shard(task))
+    if full:
+        FollowRecommendation.objects.exclude(
+            user_id__in=Follow.objects.values('user_id')
+        ).delete()
+    return saved
+
+
+def mark_stale(user_id: int) -> None:
+    """Подписки user_id изменились: устарели его рекомендации и
+    рекомендации его подписчиков, для которых он — друг."""
+    user_ids = {user_id}
+    user_ids.update(
+        Follow.objects.filter(author_id=user_id)
+        .values_list('user_id', flat=True)
+    )
+    now = timezone.now()
+    with transaction.atomic():
+        StaleRecommendation.objects.filter(
+            user_id__in=user_ids
+        ).update(changed=now)
+        StaleRecommendation.objects.bulk_create(
+            (StaleRecommendation(user_id=stale_id, changed=now)
+             for stale_id in user_ids),
+            batch_size=SHARD_SIZE, ignore_conflicts=True
+        )
+
+
+def recompute_stale(workers: int = 1, top_n: int = TOP_N) -> int:
+    """Пересчитывает только пользователей, чьи подписки менялись.
+    Отметки, поставленные во время расчёта, остаются до следующего."""
+    stale = list(StaleRecommendation.objects.values_list('user_id', 'changed'))
+    if not stale:
+        return 0
+    compute_recommendations(
+        [user_id for user_id, _ in stale], workers=workers, top_n=top_n
+    )
+    for user_id, changed in stale:
+        StaleRecommendation.objects.filter(
+            user_id=user_id, changed=changed
+        ).delete()
+    return len(stale)
+
+
+def recommendations_for(user, limit: int = TOP_N):
+    """Готовые рекомендации для страницы: одно чтение по индексу.
+    Авторов, на которых подписались после расчёта, не показываем."""
+    if not user.is_authenticated:
+        return []
+    return [
+        entry.author for entry in
+        FollowRecommendation.objects.filter(user=user)
+        .exclude(author__following__user=user)
+        .select_related('author').order_by('-score', 'author_id')[:limit]
+    ]
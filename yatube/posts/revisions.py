@@ -0,0 +1,110 @@
+import json
+import zlib
+from difflib import SequenceMatcher
+
+from django.db import transaction
+from django.db.models import Max
+
+from .models import Post, PostRevision
+
+# Каждая SNAPSHOT_INTERVAL-я версия хранится целиком, поэтому для
+# восстановления любой версии нужно не больше SNAPSHOT_INTERVAL - 1 разниц.
+SNAPSHOT_INTERVAL: int = 10
+COMPRESS_LEVEL: int = 9
+
+
+def is_snapshot_number(number: int) -> bool:
+    return (number - 1) % SNAPSHOT_INTERVAL == 0
+
+
+def make_delta(old: str, new: str) -> list:
+    """Разница по строкам: [начало, конец] — строки из старой версии,
+    строка — новый текст."""
+    old_lines = old.splitlines(keepends=True)
+    new_lines = new.splitlines(keepends=True)
+    matcher = SequenceMatcher(None, old_lines, new_lines, autojunk=False)
+    delta = []
+    for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+        if tag == 'equal':
+            delta.append([i1, i2])
+        elif tag in ('replace', 'insert'):
+            delta.append(''.join(new_lines[j1:j2]))
+    return delta
+
+
+def apply_delta(old: str, delta: list) -> str:
+    old_lines = old.splitlines(keepends=True)
+    return ''.join(
+        ''.join(old_lines[op[0]:op[1]]) if isinstance(op, list) else op
+        for op in delta
+    )
+
+
+def encode(value) -> bytes:
+    return zlib.compress(
+        json.dumps(value, ensure_ascii=False, separators=(',', ':'))
+        .encode(),
+        COMPRESS_LEVEL,
+    )
+
+
+def decode(data):
+    return json.loads(zlib.decompress(bytes(data)).decode())
+
+
+def record_revision(post, old_text=None) -> None:
+    """Сохраняет новую версию текста поста после правки.
+    Пока пост не правили, его история — сам Post.text, поэтому
+    при создании (old_text is None) версия не пишется. При первой
+    правке первой версией становится old_text — текст до правки."""
+    if old_text is None or old_text == post.text:
+        return
+    with transaction.atomic():
+        # Параллельные правки одного поста пишут версии по очереди:
+        # в SQLite транзакция начинается с BEGIN IMMEDIATE
+        # (core.backends.sqlite3), в других базах блокируется пост.
+        list(Post.objects.select_for_update().filter(pk=post.pk)
+             .values_list('pk'))
+        last = post.revisions.aggregate(last=Max('number'))['last'] or 0
+        previous = None
+        if not last:
+            PostRevision.objects.create(
+                post=post, number=1, is_snapshot=True, data=encode(old_text)
+            )
+            previous, last = old_text, 1
+        number = last + 1
+        snapshot = is_snapshot_number(number)
+        if not snapshot and previous is None:
+            # old_text мог устареть, если пост успели поправить
+            # параллельно: разница считается от последней версии.
+            previous = revision_text(post, last)
+            snapshot = previous is None
+        if previous == post.text:
+            return
+        data = encode(
+            post.text if snapshot else make_delta(previous, post.text)
+        )
+        PostRevision.objects.create(
+            post=post, number=number, is_snapshot=snapshot, data=data
+        )
+
+
+def revision_text(post, number: int):
+    """Восстанавливает текст версии number от ближайшей полной копии:
+    два запроса и не больше SNAPSHOT_INTERVAL - 1 разниц."""
+    snapshot = (
+        post.revisions.filter(number__lte=number, is_snapshot=True)
+        .order_by('-number').values_list('number', flat=True).first()
+    )
+    if snapshot is None:
+        return None
+    chain = list(
+        post.revisions.filter(number__gte=snapshot, number__lte=number)
+        .order_by('number').values_list('number', 'data')
+    )
+    if not chain or chain[-1][0] != number:
+        return None
+    text = decode(chain[0][1])
+    for _, data in chain[1:]:
+        text = apply_delta(text, decode(data))
+    return text
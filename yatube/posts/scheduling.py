@@ -0,0 +1,65 @@
+from core.jobs import enqueue
+from django.db import transaction
+from django.db.models import F, OuterRef, Subquery
+from django.utils import timezone
+
+from .models import Mention, Post, PostTag
+from .tasks import deliver_mentions, fan_out_posts
+
+BATCH_SIZE: int = 200
+
+
+def due_posts(now=None):
+    """Очередь к публикации: читается по частичному индексу
+    post_publish_queue."""
+    return Post.objects.filter(
+        is_published=False, publish_at__lte=now or timezone.now()
+    ).order_by('publish_at', 'id')
+
+
+def next_due_time():
+    return (
+        Post.objects.filter(is_published=False, publish_at__isnull=False)
+        .order_by('publish_at').values_list('publish_at', flat=True).first()
+    )
+
+
+def publish_batch(now=None, batch_size: int = BATCH_SIZE) -> int:
+    """Публикует пачку наступивших постов одной транзакцией.
+    UPDATE с условием is_published=False делает публикацию
+    идемпотентной: после перезапуска или при втором диспетчере
+    пост не публикуется дважды. Дата поста становится временем
+    из расписания. Подписчики получают новые посты одной
+    фоновой задачей fan-out на пачку. Упоминания в постах записаны
+    при создании, но рассылаются только опубликованные: для них
+    ставится задача рассылки."""
+    with transaction.atomic():
+        ids = list(
+            due_posts(now).select_for_update()
+            .values_list('id', flat=True)[:batch_size]
+        )
+        if not ids:
+            return 0
+        Post.objects.filter(id__in=ids, is_published=False).update(
+            is_published=True, pub_date=F('publish_at')
+        )
+        PostTag.objects.filter(post_id__in=ids).update(
+            pub_date=Subquery(
+                Post.objects.filter(pk=OuterRef('post_id'))
+                .values('pub_date')[:1]
+            )
+        )
+        enqueue(fan_out_posts, ids)
+        if Mention.objects.filter(post_id__in=ids, notified=False).exists():
+            enqueue(deliver_mentions)
+    return len(ids)
+
+
+def publish_due(now=None, batch_size: int = BATCH_SIZE) -> int:
+    """Публикует все наступившие посты пачками."""
+    total = 0
+    while True:
+        published = publish_batch(now, batch_size)
+        total += published
+        if published < batch_size:
+            return total
@@ -0,0 +1,139 @@
+import re
+
+from django.db import connection
+from django.utils.html import escape
+from django.utils.safestring import mark_safe
+
+from .models import Post
+from .utils import POST_NUMB, CursorPage, dump_cursor, load_cursor
+
+FTS_TABLE = 'posts_post_fts'
+CURSOR_SALT = 'posts.search'
+SNIPPET_TOKENS: int = 24
+# Управляющие символы не встречаются в тексте поста, поэтому ими
+# удобно помечать совпадения до экранирования HTML.
+MARK_OPEN, MARK_CLOSE = '\x02', '\x03'
+
+WORD_RE = re.compile(r'\w+', re.UNICODE)
+
+CREATE_INDEX_SQL = (
+    f"CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5("
+    "text, content='posts_post', content_rowid='id', "
+    "tokenize='unicode61 remove_diacritics 2')",
+)
+# Триггеры держат индекс в синхронизации с posts_post, включая bulk_create
+# и QuerySet.update. SQLite удаляет их при пересоздании таблицы
+# миграциями, поэтому они восстанавливаются в post_migrate.
+CREATE_TRIGGERS_SQL = (
+    f"CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ai AFTER INSERT ON posts_post "
+    f"BEGIN INSERT INTO {FTS_TABLE}(rowid, text) "
+    "VALUES (new.id, new.text); END",
+    f"CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ad AFTER DELETE ON posts_post "
+    f"BEGIN INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, text) "
+    "VALUES ('delete', old.id, old.text); END",
+    f"CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_au "
+    "AFTER UPDATE OF text ON posts_post "
+    f"BEGIN INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, text) "
+    "VALUES ('delete', old.id, old.text); "
+    f"INSERT INTO {FTS_TABLE}(rowid, text) VALUES (new.id, new.text); END",
+)
+
+
+def fts_enabled(using=connection) -> bool:
+    return using.vendor == 'sqlite'
+
+
+def ensure_search_index(using=connection) -> None:
+    """Создаёт индекс и триггеры, если их нет."""
+    if not fts_enabled(using):
+        return
+    with using.cursor() as cursor:
+        for sql in CREATE_INDEX_SQL + CREATE_TRIGGERS_SQL:
+            cursor.execute(sql)
+
+
+def match_expression(query: str) -> str:
+    """Превращает ввод пользователя в безопасный запрос FTS5:
+    каждое слово — фраза в кавычках, все слова обязательны,
+    последнее ищется по префиксу."""
+    words = WORD_RE.findall(query)
+    if not words:
+        return ''
+    terms = ['"%s"' % word for word in words]
+    terms[-1] += '*'
+    return ' '.join(terms)
+
+
+def highlight(snippet: str) -> str:
+    return mark_safe(
+        escape(snippet)
+        .replace(MARK_OPEN, '<mark>')
+        .replace(MARK_CLOSE, '</mark>')
+    )
+
+
+def matching_ids_sql():
+    """Подзапрос id постов, подходящих под MATCH, для админки."""
+    return f'SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s'
+
+
+def search_posts(query: str, cursor=None, limit: int = POST_NUMB):
+    """Ищет посты по тексту, лучшие совпадения первыми.
+    Возвращает CursorPage, у постов заполнен snippet с подсветкой."""
+    expression = match_expression(query)
+    if not expression:
+        return CursorPage([])
+    if not fts_enabled():
+        return search_posts_fallback(query, cursor, limit)
+    after = load_cursor(cursor, CURSOR_SALT)
+    sql = (
+        f'SELECT rowid, rank, snippet({FTS_TABLE}, 0, %s, %s, %s, %s) '
+        f'FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s'
+    )
+    params = [MARK_OPEN, MARK_CLOSE, '…', SNIPPET_TOKENS, expression]
+    if after:
+        sql += ' AND (rank > %s OR (rank = %s AND rowid > %s))'
+        params += [after[0], after[0], after[1]]
+    sql += ' ORDER BY rank, rowid LIMIT %s'
+    params.append(limit + 1)
+    with connection.cursor() as db_cursor:
+        db_cursor.execute(sql, params)
+        rows = db_cursor.fetchall()
+
+    has_next = len(rows) > limit
+    rows = rows[:limit]
+    posts = Post.objects.published().select_related(
+        'author', 'group'
+    ).in_bulk(
+        [row[0] for row in rows]
+    )
+    object_list = []
+    for post_id, _, snippet in rows:
+        post = posts.get(post_id)
+        if post is not None:
+            post.snippet = highlight(snippet)
+            object_list.append(post)
+    next_cursor = None
+    if has_next:
+        next_cursor = dump_cursor([rows[-1][1], rows[-1][0]], CURSOR_SALT)
+    return CursorPage(object_list, next_cursor)
+
+
+def search_posts_fallback(query: str, cursor, limit: int):
+    """Поиск без FTS5 для других СУБД: подстрока, новые первыми."""
+    posts = Post.objects.published().select_related(
+        'author', 'group'
+    ).filter(
+        text__icontains=query
+    ).order_by('-id')
+    after = load_cursor(cursor, CURSOR_SALT)
+    if after:
+        posts = posts.filter(id__lt=after)
+    object_list = list(posts[:limit + 1])
+    next_cursor = None
+    if len(object_list) > limit:
+        object_list = object_list[:limit]
+        next_cursor = dump_cursor(object_list[-1].id, CURSOR_SALT)
+    for post in object_list:
+        post.snippet = post.text
+    return CursorPage(object_list, next_cursor)
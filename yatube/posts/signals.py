@@ -0,0 +1,179 @@
+from core.jobs import enqueue
+from django.db import connections
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from .hashtags import index_hashtags
+from .lookups import NATURAL_KEYS, forget_lookups
+from .mentions import record_mentions
+from .models import ArchivedPost, Comment, Follow, Group, Post, User
+from .recommendations import mark_stale
+from .revisions import record_revision
+from .simhash import fingerprint_post
+from .trending import record_comment, record_follow
+from .tasks import deliver_mentions, fan_out_posts
+
+
+def release_image(storage, name: str) -> None:
+    """Отпускает ссылку на картинку, если хранилище их считает."""
+    release = getattr(storage, 'release', None)
+    if name and release is not None:
+        release(name)
+
+
+def acquire_image(storage, name: str) -> None:
+    """Берёт ссылку на картинку, если хранилище их считает."""
+    acquire = getattr(storage, 'acquire', None)
+    if name and acquire is not None:
+        acquire(name)
+
+
+@receiver(pre_save, sender=Post)
+def remember_old_version(sender, instance, **kwargs):
+    """Запоминает прежние картинку и текст поста перед сохранением."""
+    instance._old_image = instance._old_text = None
+    update_fields = kwargs.get('update_fields')
+    fields = [
+        field for field in ('image', 'text')
+        if update_fields is None or field in update_fields
+    ]
+    instance._image_saved = 'image' in fields
+    if instance.pk is None or not fields:
+        return
+    old = Post.objects.filter(pk=instance.pk).values(*fields).first()
+    if old is None:
+        return
+    instance._old_image = old.get('image')
+    instance._old_text = old.get('text')
+
+
+@receiver(post_save, sender=Post)
+def move_image_reference(sender, instance, **kwargs):
+    """Ссылку на картинку берёт сохранённая запись поста, а не
+    загрузка файла: если пост не сохранится, ссылка не утечёт.
+    При замене картинки в post_edit старый файл отпускается."""
+    if not getattr(instance, '_image_saved', False):
+        return
+    instance._image_saved = False
+    old_name, instance._old_image = instance._old_image, None
+    if old_name == instance.image.name:
+        return
+    acquire_image(instance.image.storage, instance.image.name)
+    release_image(instance.image.storage, old_name)
+
+
+@receiver(post_delete, sender=Post)
+@receiver(post_delete, sender=ArchivedPost)
+def release_deleted_image(sender, instance, **kwargs):
+    """При удалении поста или архивного поста, в том числе
+    каскадом от User, отпускает его картинку."""
+    release_image(instance.image.storage, instance.image.name)
+
+
+@receiver(pre_save, sender=User)
+@receiver(pre_save, sender=Group)
+def remember_natural_keys(sender, instance, update_fields=None, **kwargs):
+    """Запоминает прежние username или slug: после переименования
+    кэш по старому имени должен отдавать 404."""
+    fields = [
+        field for field in NATURAL_KEYS[sender]
+        if update_fields is None or field in update_fields
+    ]
+    instance._old_natural_keys = {}
+    if instance.pk is None or not fields:
+        return
+    instance._old_natural_keys = (
+        sender.objects.filter(pk=instance.pk).values(*fields).first() or {}
+    )
+
+
+@receiver(post_save, sender=User)
+@receiver(post_save, sender=Group)
+@receiver(post_delete, sender=User)
+@receiver(post_delete, sender=Group)
+def forget_cached_lookups(sender, instance, **kwargs):
+    """Сбрасывает кэш posts.lookups по текущему и прежнему имени.
+    Новое имя могло быть закэшировано как несуществующее."""
+    old = getattr(instance, '_old_natural_keys', {})
+    for field in NATURAL_KEYS[sender]:
+        forget_lookups(
+            sender, field, getattr(instance, field), old.get(field)
+        )
+
+
+def restore_search_index(sender, using, **kwargs):
+    """Миграции SQLite пересоздают posts_post и теряют триггеры
+    полнотекстового индекса; после migrate возвращаем их."""
+    from .search import ensure_search_index
+
+    ensure_search_index(connections[using])
+
+
+@receiver(post_save, sender=Post)
+def update_hashtags(sender, instance, created, update_fields=None, **kwargs):
+    """Разбирает #теги поста в обратный индекс при сохранении."""
+    if update_fields is not None and 'text' not in update_fields:
+        return
+    index_hashtags([instance], replace=not created)
+
+
+@receiver(post_save, sender=Post)
+def update_fingerprint(sender, instance, update_fields=None, **kwargs):
+    """Пересчитывает SimHash поста при изменении текста."""
+    if update_fields is not None and 'text' not in update_fields:
+        return
+    fingerprint_post(instance)
+
+
+@receiver(post_save, sender=Post)
+def save_revision(sender, instance, update_fields=None, **kwargs):
+    """Сохраняет версию текста для истории правок."""
+    if update_fields is not None and 'text' not in update_fields:
+        return
+    record_revision(instance, getattr(instance, '_old_text', None))
+
+
+@receiver(post_save, sender=Post)
+def post_mentions(sender, instance, update_fields=None, **kwargs):
+    """Записывает @упоминания из текста поста."""
+    if update_fields is not None and 'text' not in update_fields:
+        return
+    if record_mentions(instance.text, instance.author_id, instance.id):
+        enqueue(deliver_mentions)
+
+
+@receiver(post_save, sender=Post)
+def unread_fan_out(sender, instance, created, **kwargs):
+    """Новый пост увеличивает счётчики в лентах подписчиков.
+    Запланированные посты раздаёт posts.scheduling при публикации."""
+    if created and instance.is_published:
+        enqueue(fan_out_posts, [instance.id], key=f'fan-out:{instance.id}')
+
+
+@receiver(post_save, sender=Comment)
+def comment_mentions(sender, instance, created, **kwargs):
+    """Записывает @упоминания из текста нового комментария."""
+    if created and record_mentions(
+        instance.text, instance.author_id, instance.post_id, instance
+    ):
+        enqueue(deliver_mentions)
+
+
+@receiver(post_save, sender=Comment)
+def trending_comment(sender, instance, created, **kwargs):
+    if created:
+        record_comment(instance)
+
+
+@receiver(post_save, sender=Follow)
+def trending_follow(sender, instance, created, **kwargs):
+    if created:
+        record_follow(instance)
+
+
+@receiver(post_save, sender=Follow)
+@receiver(post_delete, sender=Follow)
+def stale_recommendations(sender, instance, **kwargs):
+    """Подписки изменились: рекомендации пересчитает
+    compute_recommendations."""
+    mark_stale(instance.user_id)
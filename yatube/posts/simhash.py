@@ -0,0 +1,112 @@
+import hashlib
+import re
+from collections import Counter
+
+from django.db import transaction
+
+from .models import PostFingerprint, SimhashBucket
+
+HASH_BITS: int = 64
+BANDS: int = 8
+BAND_BITS: int = HASH_BITS // BANDS
+# При 8 полосах по 8 бит посты с расстоянием Хэмминга до 7 бит
+# обязательно совпадают хотя бы в одной полосе. Замена или добавление
+# одного слова в посте из 30-40 слов сдвигает SimHash в среднем
+# на 5 бит и почти всегда не больше чем на 7.
+MAX_DISTANCE: int = BANDS - 1
+# Признаки — отдельные слова: шингл из трёх слов меняется при правке
+# любого из них, и одно слово сдвигало отпечаток втрое сильнее.
+SHINGLE_SIZE: int = 1
+MAX_CANDIDATES: int = 200
+
+WORD_RE = re.compile(r'\w+', re.UNICODE)
+
+
+def shingles(text: str):
+    words = WORD_RE.findall(text.lower())
+    if len(words) < SHINGLE_SIZE:
+        return words
+    return [
+        ' '.join(words[i:i + SHINGLE_SIZE])
+        for i in range(len(words) - SHINGLE_SIZE + 1)
+    ]
+
+
+def simhash(text: str) -> int:
+    """64-битный SimHash по шинглам из SHINGLE_SIZE слов."""
+    weights = [0] * HASH_BITS
+    for shingle, count in Counter(shingles(text)).items():
+        value = int.from_bytes(
+            hashlib.blake2b(shingle.encode(), digest_size=8).digest(), 'big'
+        )
+        for bit in range(HASH_BITS):
+            weights[bit] += count if value >> bit & 1 else -count
+    return sum(1 << bit for bit, weight in enumerate(weights) if weight > 0)
+
+
+def to_signed(value: int) -> int:
+    """SQLite хранит только знаковые 64-битные целые."""
+    if value >= 1 << (HASH_BITS - 1):
+        return value - (1 << HASH_BITS)
+    return value
+
+
+def to_unsigned(value: int) -> int:
+    return value & ((1 << HASH_BITS) - 1)
+
+
+def buckets(value: int):
+    """Номера корзин: номер полосы в старших битах, полоса в младших."""
+    mask = (1 << BAND_BITS) - 1
+    return [
+        band << BAND_BITS | (value >> band * BAND_BITS) & mask
+        for band in range(BANDS)
+    ]
+
+
+def distance(first: int, second: int) -> int:
+    return bin(to_unsigned(first) ^ to_unsigned(second)).count('1')
+
+
+def near_duplicates(value: int, exclude=None):
+    """Отпечатки постов, отличающихся от value не больше чем
+    на MAX_DISTANCE бит. Стоит одного запроса по индексу корзин
+    и одного по первичному ключу отпечатков."""
+    candidates = SimhashBucket.objects.filter(bucket__in=buckets(value))
+    if exclude is not None:
+        candidates = candidates.exclude(post_id=exclude)
+    post_ids = set(
+        candidates.order_by('-post').values_list('post_id', flat=True)
+        [:MAX_CANDIDATES]
+    )
+    return [
+        fingerprint
+        for fingerprint in PostFingerprint.objects.filter(post__in=post_ids)
+        if distance(fingerprint.simhash, value) <= MAX_DISTANCE
+    ]
+
+
+@transaction.atomic
+def fingerprint_post(post) -> PostFingerprint:
+    """Считает отпечаток поста, раскладывает его по корзинам
+    и относит пост к кластеру ближайших дубликатов."""
+    value = simhash(post.text)
+    duplicates = near_duplicates(value, exclude=post.id)
+    cluster = min(
+        [fingerprint.cluster for fingerprint in duplicates] + [post.id]
+    )
+    fingerprint = PostFingerprint(
+        post_id=post.id, simhash=to_signed(value), cluster=cluster
+    )
+    # Один UPDATE при правке поста вместо SELECT и точки сохранения
+    # update_or_create; транзакция уже держит блокировку записи.
+    if not PostFingerprint.objects.filter(post_id=post.id).update(
+        simhash=fingerprint.simhash, cluster=cluster
+    ):
+        fingerprint.save(force_insert=True)
+    SimhashBucket.objects.filter(post_id=post.id).delete()
+    SimhashBucket.objects.bulk_create(
+        SimhashBucket(post_id=post.id, bucket=bucket)
+        for bucket in buckets(value)
+    )
+    return fingerprint
@@ -0,0 +1,35 @@
+from core.jobs import task
+from django.core.files.storage import default_storage
+from sorl.thumbnail import get_thumbnail
+
+from . import mentions, unread
+from .models import Post
+
+# Размеры миниатюр из шаблонов posts/post_detail.html и includes/article.html.
+THUMBNAILS = (
+    ('960x339', {'crop': 'center', 'upscale': True}),
+)
+
+
+@task
+def fan_out_posts(post_ids):
+    """Увеличивает счётчики новых постов у подписчиков."""
+    unread.fan_out(Post.objects.filter(id__in=post_ids).only(
+        'id', 'author', 'group'
+    ))
+
+
+@task
+def warm_thumbnails(name: str):
+    """Заранее строит миниатюры картинки, чтобы их не создавал
+    первый запрос страницы с постом."""
+    if not default_storage.exists(name):
+        return
+    for geometry, options in THUMBNAILS:
+        get_thumbnail(name, geometry, **options)
+
+
+@task
+def deliver_mentions():
+    while mentions.deliver_mentions():
+        pass
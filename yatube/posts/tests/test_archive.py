@@ -0,0 +1,219 @@
+import os
+import shutil
+import tempfile
+from datetime import timedelta
+from io import StringIO
+
+from core.db import table_stats
+from core.models import MediaBlob
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from ..archive import ArchiveChain, archive_batch, archive_cutoff
+from ..deletion import soft_delete_user
+from ..models import (ArchivedComment, ArchivedPost, Comment, Mention, Post,
+                      PostFingerprint, User)
+from ..revisions import revision_text
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+SMALL_GIF = (
+    b'\x47\x49\x46\x38\x39\x61\x02\x00'
+    b'\x01\x00\x80\x00\x00\x00\x00\x00'
+    b'\xFF\xFF\xFF\x21\xF9\x04\x00\x00'
+    b'\x00\x00\x00\x2C\x00\x00\x00\x00'
+    b'\x02\x00\x01\x00\x00\x02\x02\x0C'
+    b'\x0A\x00\x3B'
+)
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT, POST_ARCHIVE_DAYS=30)
+class ArchiveTest(TestCase):
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        cache.clear()
+        self.author = User.objects.create_user(username='veteran')
+        self.reader = User.objects.create_user(username='reader')
+        now = timezone.now()
+        self.old_posts = []
+        for number in range(5):
+            post = Post.objects.create(
+                author=self.author, text=f'Старый пост {number}'
+            )
+            Comment.objects.create(post=post, author=self.reader, text='Да')
+            Post.objects.filter(id=post.id).update(
+                pub_date=now - timedelta(days=100 - number), views=number
+            )
+            self.old_posts.append(post)
+        self.new_post = Post.objects.create(
+            author=self.author, text='Свежий пост'
+        )
+        self.client = Client()
+
+    def test_batch_moves_oldest_posts_with_comments(self):
+        cutoff = archive_cutoff()
+        self.assertEqual(archive_batch(cutoff, batch_size=2), 2)
+        self.assertEqual(
+            list(ArchivedPost.objects.order_by('id').values_list(
+                'id', flat=True
+            )),
+            [post.id for post in self.old_posts[:2]]
+        )
+        self.assertEqual(ArchivedComment.objects.count(), 2)
+        self.assertFalse(
+            Post.objects.filter(id=self.old_posts[0].id).exists()
+        )
+        self.assertEqual(archive_batch(cutoff, batch_size=10), 3)
+        self.assertEqual(archive_batch(cutoff, batch_size=10), 0)
+        self.assertEqual(list(Post.objects.all()), [self.new_post])
+        self.assertEqual(ArchivedPost.objects.get(
+            id=self.old_posts[4].id).views, 4)
+
+    def test_command_archives_in_chunks(self):
+        out = StringIO()
+        call_command(
+            'archive_posts', batch_size=2, sleep=0, stats=True, stdout=out
+        )
+        self.assertIn('Перенесено в архив постов: 5', out.getvalue())
+        self.assertIn('posts_post:', out.getvalue())
+        self.assertEqual(ArchivedPost.objects.count(), 5)
+        self.assertEqual(ArchivedComment.objects.count(), 5)
+
+    def test_command_respects_limit(self):
+        call_command(
+            'archive_posts', batch_size=2, sleep=0, limit=3,
+            stdout=StringIO()
+        )
+        self.assertEqual(ArchivedPost.objects.count(), 3)
+
+    def test_post_detail_falls_back_to_archive(self):
+        archive_batch(archive_cutoff())
+        response = self.client.get(
+            reverse('posts:post_detail', args=(self.old_posts[0].id,))
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.context['archived'])
+        self.assertEqual(response.context['post'].text, 'Старый пост 0')
+        self.assertEqual(response.context['posts_count'], 6)
+        self.assertEqual(len(response.context['comments']), 1)
+        self.assertNotContains(response, 'редактировать запись')
+        response = self.client.get(
+            reverse('posts:post_detail', args=(10 ** 6,))
+        )
+        self.assertEqual(response.status_code, 404)
+
+    def test_history_tags_mentions_and_fingerprint_are_kept(self):
+        post = self.old_posts[0]
+        post.refresh_from_db()
+        post.text = 'Правка про #котиков для @reader'
+        post.save()
+        fingerprint = PostFingerprint.objects.get(post=post)
+        Mention.objects.update(notified=True)
+        archive_batch(archive_cutoff())
+        archived = ArchivedPost.objects.get(id=post.id)
+        self.assertEqual(revision_text(archived, 1), 'Старый пост 0')
+        self.assertEqual(revision_text(archived, 2), post.text)
+        self.assertEqual(
+            [tag.name for tag in archived.tags.all()], ['котиков']
+        )
+        self.assertEqual(
+            list(archived.mentions.values_list('user__username', 'notified')),
+            [('reader', True)]
+        )
+        self.assertEqual(
+            (archived.simhash, archived.cluster),
+            (fingerprint.simhash, fingerprint.cluster)
+        )
+        response = self.client.get(
+            reverse('posts:post_history', args=(post.id,))
+        )
+        self.assertEqual(len(response.context['revisions']), 2)
+
+    def test_pending_mentions_wait_for_delivery(self):
+        post = self.old_posts[0]
+        post.refresh_from_db()
+        post.text = 'Привет, @reader'
+        post.save()
+        archive_batch(archive_cutoff())
+        self.assertTrue(Post.objects.filter(id=post.id).exists())
+        self.assertEqual(ArchivedPost.objects.count(), 4)
+
+    def test_archive_hidden_only_for_deleted_author(self):
+        archive_batch(archive_cutoff())
+        url = reverse('posts:profile', args=(self.author.username,))
+        detail = reverse('posts:post_detail', args=(self.old_posts[0].id,))
+        self.author.is_active = False
+        self.author.save()
+        self.assertEqual(self.client.get(url).context['posts_count'], 6)
+        self.assertEqual(self.client.get(detail).status_code, 200)
+        soft_delete_user(self.author)
+        self.assertEqual(self.client.get(url).context['posts_count'], 0)
+        self.assertEqual(self.client.get(detail).status_code, 404)
+
+    def test_deleted_commenter_hidden_in_archive(self):
+        archive_batch(archive_cutoff())
+        soft_delete_user(self.reader)
+        response = self.client.get(
+            reverse('posts:post_detail', args=(self.old_posts[0].id,))
+        )
+        self.assertEqual(len(response.context['comments']), 0)
+
+    def test_profile_pages_continue_into_archive(self):
+        for number in range(10):
+            Post.objects.create(author=self.author, text=f'Новый {number}')
+        archive_batch(archive_cutoff())
+        url = reverse('posts:profile', args=(self.author.username,))
+        response = self.client.get(url)
+        self.assertEqual(response.context['posts_count'], 16)
+        response = self.client.get(url, {'page': 2})
+        texts = [post.text for post in response.context['page_obj']]
+        self.assertEqual(
+            texts,
+            ['Свежий пост', 'Старый пост 4', 'Старый пост 3',
+             'Старый пост 2', 'Старый пост 1', 'Старый пост 0']
+        )
+
+    def test_chain_slices_across_tables(self):
+        archive_batch(archive_cutoff())
+        chain = ArchiveChain(
+            self.author.posts.all(), self.author.archived_posts.all()
+        )
+        self.assertEqual(len(chain), 6)
+        self.assertEqual(chain[0], self.new_post)
+        self.assertEqual(
+            [post.text for post in chain[1:3]],
+            ['Старый пост 4', 'Старый пост 3']
+        )
+
+    def test_archived_image_keeps_its_reference(self):
+        post = self.old_posts[0]
+        post.refresh_from_db()
+        post.image = SimpleUploadedFile(
+            name='old.gif', content=SMALL_GIF, content_type='image/gif'
+        )
+        post.save()
+        name = post.image.name
+        archive_batch(archive_cutoff())
+        self.assertEqual(MediaBlob.objects.get(name=name).refs, 1)
+        self.assertTrue(os.path.exists(os.path.join(TEMP_MEDIA_ROOT, name)))
+        call_command('media_gc', min_age=0, sleep=0, stdout=StringIO())
+        self.assertTrue(os.path.exists(os.path.join(TEMP_MEDIA_ROOT, name)))
+        ArchivedPost.objects.get(id=post.id).delete()
+        self.assertFalse(MediaBlob.objects.filter(name=name).exists())
+
+    def test_table_stats(self):
+        stats = table_stats(['posts_post'])
+        self.assertIn('posts_post', stats)
+        self.assertIn('post_author_feed', stats)
+        pages, size, depth = stats['posts_post']
+        self.assertGreaterEqual(pages, 1)
+        self.assertGreaterEqual(depth, 1)
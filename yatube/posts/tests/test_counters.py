@@ -0,0 +1,76 @@
+from unittest import mock
+
+from django.db import OperationalError
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from ..counters import ViewCounterBuffer, view_counter
+from ..models import Post, User
+
+
+class ViewCounterTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='counter_user')
+        cls.posts = [
+            Post.objects.create(author=cls.user, text=f'Пост {i}')
+            for i in range(3)
+        ]
+
+    def test_hits_flushed_in_one_statement(self):
+        """Просмотры копятся в памяти и пишутся одним UPDATE."""
+        buffer = ViewCounterBuffer(flush_interval=3600, flush_size=100)
+        first, second, _ = self.posts
+        for _ in range(3):
+            buffer.hit(first.id)
+        buffer.hit(second.id)
+        first.refresh_from_db()
+        self.assertEqual(first.views, 0)
+        with self.assertNumQueries(1):
+            buffer.flush()
+        first.refresh_from_db()
+        second.refresh_from_db()
+        self.assertEqual((first.views, second.views), (3, 1))
+        self.assertEqual(buffer.buffered(first.id), 0)
+
+    def setUp(self):
+        view_counter.discard()
+
+    def tearDown(self):
+        view_counter.discard()
+
+    def test_flush_on_size_threshold(self):
+        buffer = ViewCounterBuffer(flush_interval=3600, flush_size=2)
+        post = self.posts[2]
+        buffer.hit(post.id)
+        buffer.hit(post.id)
+        post.refresh_from_db()
+        self.assertEqual(post.views, 2)
+
+    def test_post_detail_counts_views(self):
+        """Страница поста учитывает ещё не записанные просмотры."""
+        post = self.posts[0]
+        url = reverse('posts:post_detail', kwargs={'post_id': post.id})
+        post.refresh_from_db()
+        Client().get(url)
+        response = Client().get(url)
+        self.assertEqual(response.context['views'], post.views + 2)
+
+    def test_failed_flush_keeps_views_and_page(self):
+        """Ошибка записи при просмотре не роняет страницу,
+        просмотры остаются в буфере."""
+        post = self.posts[1]
+        url = reverse('posts:post_detail', kwargs={'post_id': post.id})
+        locked = OperationalError('database is locked')
+        with mock.patch.object(view_counter, 'flush_size', 1), \
+                mock.patch('posts.counters.apply_increments',
+                           side_effect=locked), \
+                self.assertLogs('posts.counters', 'WARNING'):
+            response = Client().get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(view_counter.buffered(post.id), 1)
+        with mock.patch('posts.counters.apply_increments',
+                        side_effect=locked):
+            with self.assertRaises(OperationalError):
+                view_counter.flush(funnel=False)
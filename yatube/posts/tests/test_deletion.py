@@ -0,0 +1,113 @@
+from unittest import mock
+
+from core.deletion import run_deletion
+from core.models import Deletion
+from django.core.cache import cache
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from ..deletion import soft_delete_post, soft_delete_user
+from ..models import Comment, Follow, Post, User
+
+
+class BackgroundDeletionTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.author = User.objects.create_user(username='prolific')
+        self.reader = User.objects.create_user(username='reader')
+        self.posts = [
+            Post.objects.create(author=self.author, text=f'Пост {number}')
+            for number in range(5)
+        ]
+        for post in self.posts:
+            Comment.objects.create(post=post, author=self.reader, text='Да')
+        self.reader_post = Post.objects.create(
+            author=self.reader, text='Пост читателя'
+        )
+        self.author_comment = Comment.objects.create(
+            post=self.reader_post, author=self.author, text='Мой комментарий'
+        )
+        Follow.objects.create(user=self.reader, author=self.author)
+        self.client = Client()
+
+    def test_user_content_is_hidden_at_once(self):
+        deletion = soft_delete_user(self.author)
+        self.assertEqual(deletion.status, Deletion.QUEUED)
+        self.author.refresh_from_db()
+        self.assertFalse(self.author.is_active)
+        self.assertEqual(Post.objects.count(), 6)
+        response = self.client.get(reverse('posts:index'))
+        self.assertEqual(
+            [post.text for post in response.context['page_obj']],
+            ['Пост читателя']
+        )
+        response = self.client.get(
+            reverse('posts:post_detail', args=(self.posts[0].id,))
+        )
+        self.assertEqual(response.status_code, 404)
+        response = self.client.get(
+            reverse('posts:post_detail', args=(self.reader_post.id,))
+        )
+        self.assertNotIn(self.author_comment, response.context['comments'])
+
+    def test_deletion_runs_in_resumable_batches(self):
+        deletion = soft_delete_user(self.author)
+        self.assertFalse(run_deletion(deletion.id, batch_size=2,
+                                      max_batches=2))
+        deletion.refresh_from_db()
+        self.assertEqual(deletion.status, Deletion.RUNNING)
+        self.assertEqual(deletion.deleted, 4)
+        self.assertGreaterEqual(deletion.total, 13)
+        while not run_deletion(deletion.id, batch_size=2, max_batches=2):
+            pass
+        deletion.refresh_from_db()
+        self.assertEqual(deletion.status, Deletion.DONE)
+        self.assertIsNotNone(deletion.finished)
+        self.assertFalse(User.objects.filter(username='prolific').exists())
+        self.assertEqual(
+            list(Post.objects.all()), [self.reader_post]
+        )
+        self.assertFalse(Comment.objects.exists())
+        self.assertFalse(Follow.objects.exists())
+
+    def test_run_stops_within_lease(self):
+        """Запуск не выходит за отведённое время, но хотя бы одну
+        пачку удаляет."""
+        deletion = soft_delete_user(self.author)
+        with mock.patch('core.deletion.time.monotonic',
+                        side_effect=[0, 1000, 1000]):
+            self.assertFalse(run_deletion(deletion.id, batch_size=2))
+        deletion.refresh_from_db()
+        self.assertEqual(deletion.deleted, 2)
+
+    @override_settings(JOB_QUEUE_EAGER=True)
+    def test_task_requeues_itself_until_done(self):
+        with mock.patch('core.deletion.BATCH_SIZE', 1), \
+                mock.patch('core.deletion.RUN_LEASE_SHARE', 0), \
+                mock.patch('core.tasks.run_deletion',
+                           wraps=run_deletion) as runs:
+            deletion = soft_delete_post(self.posts[0])
+        self.assertGreater(runs.call_count, 1)
+        deletion.refresh_from_db()
+        self.assertEqual(deletion.status, Deletion.DONE)
+        self.assertFalse(Comment.objects.filter(post=self.posts[0]).exists())
+        self.assertFalse(Post.objects.filter(id=self.posts[0].id).exists())
+        self.assertEqual(Post.objects.count(), 5)
+
+    def test_admin_deletes_in_background(self):
+        admin = User.objects.create_superuser(
+            username='admin', email='admin@example.com', password='pass'
+        )
+        self.client.force_login(admin)
+        url = reverse('admin:auth_user_delete', args=(self.author.id,))
+        response = self.client.get(url)
+        self.assertContains(response, 'удалятся в фоне')
+        self.assertNotContains(response, 'Пост 1')
+        self.client.post(url, {'post': 'yes'})
+        self.assertTrue(
+            Deletion.objects.filter(object_id=self.author.id).exists()
+        )
+        self.assertTrue(User.objects.filter(id=self.author.id).exists())
+        self.assertFalse(Post.objects.published().filter(
+            author=self.author
+        ).exists())
@@ -0,0 +1,107 @@
+from datetime import timedelta
+from io import StringIO
+
+from django.core.management import call_command
+from django.core.paginator import Paginator
+from django.test import Client, TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from ..feed import subscription_feed
+from ..models import Follow, Group, GroupFollow, Post, User
+
+
+class SubscriptionFeedTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.reader = User.objects.create_user(username='feed_reader')
+        cls.author = User.objects.create_user(username='feed_author')
+        cls.stranger = User.objects.create_user(username='feed_stranger')
+        cls.group = Group.objects.create(
+            title='Группа', slug='feed-group', description='Описание'
+        )
+        Follow.objects.create(user=cls.reader, author=cls.author)
+        Follow.objects.create(user=cls.reader, author=cls.author)
+        GroupFollow.objects.create(user=cls.reader, group=cls.group)
+        now = timezone.now()
+        cls.posts = [
+            Post.objects.create(
+                author=author, group=group, text=f'Пост {number}'
+            )
+            for number, (author, group) in enumerate((
+                (cls.author, None),
+                (cls.stranger, cls.group),
+                (cls.author, cls.group),
+                (cls.stranger, None),
+                (cls.author, None),
+            ))
+        ]
+        # pub_date ставится автоматически, задаём порядок явно.
+        for number, post in enumerate(cls.posts):
+            post.pub_date = now - timedelta(minutes=number)
+            Post.objects.filter(pk=post.pk).update(pub_date=post.pub_date)
+
+    def setUp(self):
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.reader)
+
+    def test_feed_merges_and_deduplicates(self):
+        """Посты авторов и групп идут по дате без повторов."""
+        feed = subscription_feed(self.reader)
+        expected = [self.posts[0], self.posts[1], self.posts[2],
+                    self.posts[4]]
+        self.assertEqual(feed.count(), 4)
+        self.assertEqual(feed[0:10], expected)
+        self.assertEqual(feed[1:3], expected[1:3])
+        self.assertEqual(feed[3], expected[3])
+
+    def test_feed_with_paginator(self):
+        """Лента листается обычным Paginator: count и три запроса
+        на страницу."""
+        with self.assertNumQueries(4):
+            page = Paginator(subscription_feed(self.reader), 3).get_page(2)
+        self.assertEqual(list(page), [self.posts[4]])
+
+    def test_group_follow(self):
+        """Подписка на группу и отписка от неё."""
+        group = Group.objects.create(
+            title='Другая', slug='feed-other', description='Описание'
+        )
+        follow_url = reverse(
+            'posts:group_follow', kwargs={'slug': 'feed-other'}
+        )
+        unfollow_url = reverse(
+            'posts:group_unfollow', kwargs={'slug': 'feed-other'}
+        )
+        for _ in range(2):
+            self.authorized_client.get(follow_url)
+        self.assertEqual(
+            GroupFollow.objects.filter(user=self.reader, group=group).count(),
+            1
+        )
+        response = self.authorized_client.get(
+            reverse('posts:group_list', kwargs={'slug': 'feed-other'})
+        )
+        self.assertTrue(response.context['group_following'])
+        self.authorized_client.get(unfollow_url)
+        self.assertFalse(
+            GroupFollow.objects.filter(user=self.reader, group=group).exists()
+        )
+
+    def test_follow_index_shows_group_posts(self):
+        """Лента подписок показывает посты подписанных групп."""
+        response = self.authorized_client.get(reverse('posts:follow_index'))
+        self.assertIn(self.posts[1], response.context['page_obj'])
+        self.assertNotIn(self.posts[3], response.context['page_obj'])
+
+    def test_bench_feed(self):
+        """Замер ленты работает и ничего не оставляет в базе."""
+        posts = Post.objects.count()
+        out = StringIO()
+        call_command(
+            'bench_feed', '--authors', '5', '--groups', '5',
+            '--posts', '50', '--repeat', '1', stdout=out
+        )
+        self.assertIn('слияние', out.getvalue())
+        self.assertEqual(Post.objects.count(), posts)
@@ -1,3 +1,4 @@
+import hashlib
 import os
 import shutil
 import tempfile
@@ -6,6 +7,7 @@ from django.conf import settings
 from django.core.files.uploadedfile import SimpleUploadedFile
 from django.test import Client, TestCase, override_settings
 from django.urls import reverse
+from core.storage import hashed_name
 
 from ..models import Group, Post, User
 
@@ -90,7 +92,11 @@ class PostPagesTest(TestCase):
         new_post = Post.objects.first()
         self.assertEqual(new_post.text, 'Пост создан через create')
         self.assertEqual(new_post.group_id, self.group_1.id)
-        self.assertEqual(new_post.image, 'posts/post_create.gif')
+        self.assertEqual(
+            new_post.image,
+            hashed_name('posts/post_create.gif',
+                        hashlib.sha256(post_create_gif).hexdigest())
+        )
 
     def test_post_create_page_form_dont_save_guest_posts(self):
         """Проверка, что форма PostForm в post_create не сохраняет посты
@@ -163,7 +169,11 @@ class PostPagesTest(TestCase):
         post = Post.objects.get(id=self.post_2.id)
         self.assertEqual(post.text, '2 Тестовый setUpClass пост для редакции')
         self.assertEqual(post.group.id, self.group_2.id)
-        self.assertEqual(post.image, 'posts/post_edit.gif')
+        self.assertEqual(
+            post.image,
+            hashed_name('posts/post_edit.gif',
+                        hashlib.sha256(post_edit_gif).hexdigest())
+        )
 
     def test_cant_create_empty_text_field_post(self):
         """ Проверка выпадающих ошибок при заполнении формы."""
@@ -0,0 +1,74 @@
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from ..hashtags import extract_hashtags
+from ..models import Post, PostTag, Tag, User
+from ..utils import POST_NUMB
+
+
+class HashtagTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='tag_user')
+
+    def setUp(self):
+        self.guest_client = Client()
+
+    def test_extract_hashtags(self):
+        self.assertEqual(
+            extract_hashtags('Про #Котики и #котики, #ёж_2 но не a#b &#39;'),
+            {'котики', 'ёж_2'}
+        )
+
+    def test_tags_follow_post_text(self):
+        """Теги разбираются при сохранении и обновляются при правке."""
+        post = Post.objects.create(author=self.user, text='#один #два')
+        self.assertEqual(
+            set(post.post_tags.values_list('tag__name', flat=True)),
+            {'один', 'два'}
+        )
+        post.text = '#два #три'
+        post.save()
+        self.assertEqual(
+            set(post.post_tags.values_list('tag__name', flat=True)),
+            {'два', 'три'}
+        )
+
+    def test_tag_page_cursor_pagination(self):
+        """Лента тега листается курсором, новые посты первыми."""
+        posts = [
+            Post.objects.create(author=self.user, text=f'Пост {i} #лента')
+            for i in range(POST_NUMB + 3)
+        ]
+        url = reverse('posts:tag_list', kwargs={'name': 'Лента'})
+        response = self.guest_client.get(url)
+        self.assertTemplateUsed(response, 'posts/tag_list.html')
+        first_page = response.context['page_obj']
+        self.assertEqual(first_page.object_list[0], posts[-1])
+        self.assertEqual(len(first_page), POST_NUMB)
+        response = self.guest_client.get(
+            url, {'cursor': first_page.next_cursor}
+        )
+        second_page = response.context['page_obj']
+        self.assertEqual(list(second_page), posts[2::-1])
+        self.assertFalse(second_page.has_next())
+
+    def test_unknown_tag_is_404(self):
+        response = self.guest_client.get(
+            reverse('posts:tag_list', kwargs={'name': 'нет_такого'})
+        )
+        self.assertEqual(response.status_code, 404)
+
+    def test_backfill_hashtags(self):
+        """Команда разбирает теги постов, созданных без сигналов."""
+        Post.objects.bulk_create(
+            Post(author=self.user, text=f'#старый пост {i}')
+            for i in range(5)
+        )
+        call_command('backfill_hashtags', '--chunk-size=2', stdout=StringIO())
+        tag = Tag.objects.get(name='старый')
+        self.assertEqual(PostTag.objects.filter(tag=tag).count(), 5)
@@ -0,0 +1,144 @@
+from unittest import mock
+
+from core.identity import current_map, identity_scope
+from core.routers import REPLICA, replica_reads
+from django.core.cache import cache
+from django.db import connection, connections
+from django.http import Http404
+from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from ..lookups import get_group_or_404, get_user_or_404, load_related
+from ..models import Follow, Group, Post, User
+
+
+class IdentityMapLookupTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.authors = [
+            User.objects.create_user(username=f'lookup_{number}')
+            for number in range(2)
+        ]
+        cls.group = Group.objects.create(
+            title='Группа', slug='lookup-group', description='Описание'
+        )
+        for number in range(6):
+            Post.objects.create(
+                author=cls.authors[number % 2], text=f'Пост {number}'
+            )
+
+    def setUp(self):
+        cache.clear()
+
+    def test_repeated_lookups_hit_database_once(self):
+        with identity_scope():
+            with self.assertNumQueries(2):
+                user = get_user_or_404('lookup_0')
+                group = get_group_or_404('lookup-group')
+                self.assertIs(get_user_or_404('lookup_0'), user)
+                self.assertIs(get_group_or_404('lookup-group'), group)
+
+    def test_lookups_outside_request_are_not_remembered(self):
+        """Вне запроса реестра нет: каждый вызов — свой экземпляр."""
+        self.assertIsNone(current_map())
+        self.assertIsNot(
+            get_user_or_404('lookup_0'), get_user_or_404('lookup_0')
+        )
+
+    def test_missing_object_raises_404(self):
+        with identity_scope(), self.assertRaises(Http404):
+            get_group_or_404('нет-такой')
+
+    def test_load_related_shares_instances(self):
+        """Авторы страницы — один запрос и общие экземпляры,
+        уже найденные объекты не перечитываются."""
+        posts = list(Post.objects.order_by('id'))
+        with identity_scope():
+            author = get_user_or_404('lookup_0')
+            with self.assertNumQueries(1):
+                load_related(posts, 'author')
+                self.assertEqual(
+                    [post.author.username for post in posts],
+                    ['lookup_0', 'lookup_1'] * 3
+                )
+        self.assertIs(posts[0].author, author)
+        self.assertIs(posts[1].author, posts[3].author)
+
+    def test_profile_follow_reads_author_once(self):
+        follower = User.objects.create_user(username='lookup_follower')
+        client = Client()
+        client.force_login(follower)
+        url = reverse('posts:profile_follow', args=('lookup_0',))
+        with CaptureQueriesContext(connection) as queries:
+            client.get(url)
+        author_reads = [
+            query for query in queries.captured_queries
+            if '"auth_user"."username" =' in query['sql']
+        ]
+        self.assertEqual(len(author_reads), 1)
+        self.assertTrue(
+            Follow.objects.filter(
+                user=follower, author=self.authors[0]
+            ).exists()
+        )
+        response = client.get(
+            reverse('posts:profile_follow', args=('нет-такого',))
+        )
+        self.assertEqual(response.status_code, 404)
+
+
+class LookupCacheTest(TestCase):
+    """Кэш slug и username между запросами."""
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='cached_author')
+        self.group = Group.objects.create(
+            title='Группа', slug='cached-group', description='Описание'
+        )
+
+    def test_lookup_is_cached_between_requests(self):
+        get_group_or_404('cached-group')
+        with identity_scope(), self.assertNumQueries(0):
+            self.assertEqual(get_group_or_404('cached-group'), self.group)
+
+    def test_missing_slug_is_cached_until_group_created(self):
+        for _ in range(2):
+            with self.assertRaises(Http404):
+                get_group_or_404('new-group')
+        with self.assertNumQueries(0), self.assertRaises(Http404):
+            get_group_or_404('new-group')
+        group = Group.objects.create(
+            title='Новая', slug='new-group', description='Описание'
+        )
+        self.assertEqual(get_group_or_404('new-group'), group)
+
+    def test_cache_is_filled_from_primary(self):
+        """В представлениях read_replica кэш заполняет основная база,
+        а не отставшая реплика."""
+        replica = mock.patch.dict(connections.databases, {REPLICA: {}})
+        with replica, replica_reads():
+            self.assertEqual(get_group_or_404('cached-group'), self.group)
+            with self.assertRaises(Http404):
+                get_group_or_404('new-group')
+
+    def test_rename_and_change_invalidate_cache(self):
+        get_user_or_404('cached_author')
+        self.user.first_name = 'Лев'
+        self.user.save()
+        self.assertEqual(get_user_or_404('cached_author').first_name, 'Лев')
+        self.user.username = 'renamed_author'
+        self.user.save()
+        with self.assertRaises(Http404):
+            get_user_or_404('cached_author')
+        self.assertEqual(get_user_or_404('renamed_author'), self.user)
+        self.group.delete()
+        with self.assertRaises(Http404):
+            get_group_or_404('cached-group')
+
+    def test_save_without_name_skips_old_name_query(self):
+        """Вход пользователя сохраняет только last_login."""
+        with self.assertNumQueries(1):
+            self.user.save(update_fields=['last_login'])
@@ -0,0 +1,82 @@
+from django.core import mail
+from django.test import TestCase
+
+from ..mentions import (claim_mentions, deliver_mentions, extract_mentions,
+                        record_mentions)
+from ..models import Comment, Mention, Post, User
+
+
+class MentionTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.readers = [
+            User.objects.create_user(
+                username=f'reader{i}', email=f'reader{i}@yatube.ru'
+            )
+            for i in range(5)
+        ]
+
+    def test_extract_mentions(self):
+        self.assertEqual(
+            extract_mentions('Привет, @reader1 и @reader2. mail@x.ru'),
+            {'reader1', 'reader2'}
+        )
+
+    def test_mentions_resolved_in_one_lookup(self):
+        """Любое число упоминаний — один поиск пользователей."""
+        text = ' '.join(f'@{user.username}' for user in self.readers)
+        post = Post.objects.create(author=self.author, text='без упоминаний')
+        post.text = text + ' @nobody @author'
+        # Прежние текст и картинка, UPDATE поста, теги; SimHash: точка
+        # сохранения, корзины, отпечаток, замена корзин (6); история
+        # правок (6); поиск пользователей, уже записанные, вставка.
+        with self.assertNumQueries(18):
+            post.save()
+        self.assertEqual(
+            Mention.objects.filter(post=post).count(), len(self.readers)
+        )
+
+    def test_record_mentions_queries(self):
+        """Запись упоминаний не зависит от их числа: поиск
+        пользователей, уже записанные упоминания, вставка."""
+        text = ' '.join(f'@{user.username}' for user in self.readers)
+        post = Post.objects.create(author=self.author, text='без упоминаний')
+        with self.assertNumQueries(3):
+            record_mentions(
+                text + ' @nobody @author', self.author.id, post.id
+            )
+        self.assertEqual(
+            Mention.objects.filter(post=post).count(), len(self.readers)
+        )
+
+    def test_comment_mentions_and_batched_delivery(self):
+        """Уведомления уходят пачкой, по письму на пользователя."""
+        post = Post.objects.create(
+            author=self.author, text='@reader0 смотри'
+        )
+        Comment.objects.create(
+            post=post, author=self.readers[1], text='@reader0 и @author'
+        )
+        self.assertEqual(len(mail.outbox), 0)
+        self.assertEqual(deliver_mentions(), 3)
+        self.assertEqual(
+            sorted(message.to[0] for message in mail.outbox),
+            ['reader0@yatube.ru']
+        )
+        self.assertIn('в комментарии', mail.outbox[0].body)
+        self.assertEqual(deliver_mentions(), 0)
+
+    def test_claimed_mentions_are_sent_once(self):
+        """Упоминания в аренде одного рассыльщика другой не берёт."""
+        Post.objects.create(author=self.author, text='@reader0 и @reader1')
+        claimed = claim_mentions('first', 10)
+        self.assertEqual(len(claimed), 2)
+        self.assertEqual(claim_mentions('second', 10), [])
+        self.assertEqual(deliver_mentions(), 0)
+        self.assertEqual(len(mail.outbox), 0)
+        Mention.objects.update(locked_until=None)
+        self.assertEqual(deliver_mentions(), 2)
+        self.assertEqual(len(mail.outbox), 2)
+        self.assertFalse(Mention.objects.filter(notified=False).exists())
@@ -0,0 +1,122 @@
+from io import StringIO
+from unittest import mock
+
+from django.core.management import call_command
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from ..models import (Follow, FollowRecommendation, StaleRecommendation,
+                      User)
+from ..recommendations import FollowGraph, compute_recommendations
+
+
+class RecommendationsTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.reader = User.objects.create_user(username='rec_reader')
+        cls.friend = User.objects.create_user(username='rec_friend')
+        cls.other_friend = User.objects.create_user(username='rec_other')
+        cls.popular = User.objects.create_user(username='rec_popular')
+        cls.niche = User.objects.create_user(username='rec_niche')
+        for user, author in (
+            (cls.reader, cls.friend),
+            (cls.reader, cls.other_friend),
+            (cls.friend, cls.popular),
+            (cls.other_friend, cls.popular),
+            (cls.friend, cls.niche),
+            (cls.friend, cls.reader),
+        ):
+            Follow.objects.create(user=user, author=author)
+
+    def setUp(self):
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.reader)
+
+    def recommended(self, user):
+        return list(
+            FollowRecommendation.objects.filter(user=user)
+            .order_by('-score', 'author_id')
+            .values_list('author__username', 'score')
+        )
+
+    def test_graph_recommends_friends_of_friends(self):
+        """Друзья друзей по числу общих подписок, без себя
+        и без тех, на кого уже подписан."""
+        graph = FollowGraph.load()
+        self.assertEqual(
+            graph.recommend(self.reader.id),
+            [(self.popular.id, 2), (self.niche.id, 1)]
+        )
+        self.assertEqual(graph.recommend(self.niche.id), [])
+
+    def test_follow_marks_user_stale(self):
+        """Подписка и отписка помечают рекомендации устаревшими."""
+        self.assertTrue(
+            StaleRecommendation.objects.filter(user=self.reader).exists()
+        )
+        StaleRecommendation.objects.all().delete()
+        Follow.objects.filter(user=self.reader, author=self.friend).delete()
+        self.assertTrue(
+            StaleRecommendation.objects.filter(user=self.reader).exists()
+        )
+
+    def test_follow_marks_followers_stale(self):
+        """Подписка меняет друзей друзей у подписчиков пользователя."""
+        compute_recommendations()
+        self.assertEqual(self.recommended(self.friend), [('rec_other', 1)])
+        StaleRecommendation.objects.all().delete()
+        Follow.objects.create(user=self.niche, author=self.other_friend)
+        self.assertEqual(
+            set(StaleRecommendation.objects.values_list(
+                'user_id', flat=True)),
+            {self.niche.id, self.friend.id}
+        )
+        call_command('compute_recommendations', stdout=StringIO())
+        self.assertEqual(self.recommended(self.friend), [('rec_other', 2)])
+
+    def test_full_recompute_clears_users_without_follows(self):
+        """--all удаляет рекомендации тех, кто ни на кого не подписан."""
+        compute_recommendations()
+        Follow.objects.filter(user=self.reader).delete()
+        call_command('compute_recommendations', '--all', stdout=StringIO())
+        self.assertEqual(self.recommended(self.reader), [])
+
+    def test_incremental_command(self):
+        """Команда без --all пересчитывает только устаревших."""
+        call_command('compute_recommendations', stdout=StringIO())
+        self.assertEqual(
+            self.recommended(self.reader),
+            [('rec_popular', 2), ('rec_niche', 1)]
+        )
+        self.assertFalse(StaleRecommendation.objects.exists())
+
+        Follow.objects.create(user=self.reader, author=self.niche)
+        call_command('compute_recommendations', stdout=StringIO())
+        self.assertEqual(self.recommended(self.reader), [('rec_popular', 2)])
+
+    def test_full_recompute_with_workers(self):
+        """Полный пересчёт в нескольких процессах даёт тот же результат."""
+        compute_recommendations(workers=1)
+        expected = self.recommended(self.reader)
+        FollowRecommendation.objects.all().delete()
+        with mock.patch('posts.recommendations.SHARD_SIZE', 2):
+            call_command(
+                'compute_recommendations', '--all', '--workers', '2',
+                stdout=StringIO()
+            )
+        self.assertEqual(self.recommended(self.reader), expected)
+
+    def test_pages_show_recommendations(self):
+        """Профиль и лента подписок читают готовые рекомендации."""
+        compute_recommendations()
+        for url in (
+            reverse('posts:follow_index'),
+            reverse('posts:profile', kwargs={'username': 'rec_friend'}),
+        ):
+            with self.subTest(url=url):
+                response = self.authorized_client.get(url)
+                self.assertEqual(
+                    response.context['recommendations'],
+                    [self.popular, self.niche]
+                )
@@ -0,0 +1,110 @@
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from ..models import Post, PostRevision, User
+from ..revisions import (SNAPSHOT_INTERVAL, apply_delta, make_delta,
+                         record_revision, revision_text)
+
+
+class PostRevisionTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='rev_author')
+
+    def setUp(self):
+        self.guest_client = Client()
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.author)
+
+    def test_delta_round_trip(self):
+        """Разница восстанавливает новый текст из старого."""
+        old = 'первая\nвторая\nтретья\n'
+        new = 'первая\nновая вторая\nтретья\nчетвёртая'
+        self.assertEqual(apply_delta(old, make_delta(old, new)), new)
+
+    def test_edits_create_revisions(self):
+        """Каждая правка — версия, полные копии с заданным шагом,
+        любая версия восстанавливается."""
+        texts = [f'Строка\nверсия {number}\nконец' for number in range(25)]
+        post = Post.objects.create(author=self.author, text=texts[0])
+        for text in texts[1:]:
+            post.text = text
+            post.save()
+        post.save()
+        revisions = PostRevision.objects.filter(post=post)
+        self.assertEqual(revisions.count(), len(texts))
+        self.assertEqual(
+            list(revisions.filter(is_snapshot=True).order_by('number')
+                 .values_list('number', flat=True)),
+            list(range(1, len(texts) + 1, SNAPSHOT_INTERVAL))
+        )
+        for number, text in enumerate(texts, start=1):
+            with self.subTest(number=number):
+                with self.assertNumQueries(2):
+                    self.assertEqual(revision_text(post, number), text)
+        self.assertIsNone(revision_text(post, len(texts) + 1))
+
+    def test_new_post_has_no_revisions(self):
+        """Пока пост не правили, копия текста не хранится."""
+        post = Post.objects.create(author=self.author, text='Черновик')
+        self.assertFalse(PostRevision.objects.filter(post=post).exists())
+
+    def test_concurrent_edit_keeps_chain(self):
+        """Разница считается от последней версии, даже если текст
+        до правки устарел из-за параллельной правки."""
+        texts = [f'Строка\nправка {number}\nконец' for number in range(4)]
+        post = Post.objects.create(author=self.author, text=texts[0])
+        post.text = texts[1]
+        post.save()
+        other = Post.objects.get(pk=post.pk)
+        other.text = texts[2]
+        other.save()
+        post.text = texts[3]
+        record_revision(post, texts[1])
+        for number, text in enumerate(texts, start=1):
+            with self.subTest(number=number):
+                self.assertEqual(revision_text(post, number), text)
+
+    def test_legacy_post_keeps_original_text(self):
+        """У поста без истории первой версией становится старый текст."""
+        post = Post.objects.create(author=self.author, text='Старый текст')
+        PostRevision.objects.filter(post=post).delete()
+        self.authorized_client.post(
+            reverse('posts:post_edit', kwargs={'post_id': post.id}),
+            data={'text': 'Новый текст'}
+        )
+        self.assertEqual(revision_text(post, 1), 'Старый текст')
+        self.assertEqual(revision_text(post, 2), 'Новый текст')
+
+    def test_history_pages(self):
+        """Страницы истории и версии доступны всем."""
+        post = Post.objects.create(author=self.author, text='Первый')
+        post.text = 'Второй'
+        post.save()
+        response = self.guest_client.get(
+            reverse('posts:post_history', kwargs={'post_id': post.id})
+        )
+        self.assertEqual(len(response.context['revisions']), 2)
+        response = self.guest_client.get(reverse(
+            'posts:post_revision', kwargs={'post_id': post.id, 'number': 1}
+        ))
+        self.assertEqual(response.context['text'], 'Первый')
+        response = self.guest_client.get(reverse(
+            'posts:post_revision', kwargs={'post_id': post.id, 'number': 5}
+        ))
+        self.assertEqual(response.status_code, 404)
+
+    def test_bench_post_revisions(self):
+        out = StringIO()
+        call_command(
+            'bench_post_revisions', '--lines', '20', '--edits', '12',
+            stdout=out
+        )
+        self.assertIn('байт на правку', out.getvalue())
+        self.assertFalse(Post.objects.filter(
+            author__username='bench_post_revisions'
+        ).exists())
@@ -0,0 +1,120 @@
+from datetime import timedelta
+from io import StringIO
+
+from django.core import mail
+from django.core.management import call_command
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from ..models import FeedState, Follow, Group, Mention, Post, PostTag, User
+from ..scheduling import publish_batch, publish_due
+
+
+@override_settings(JOB_QUEUE_EAGER=True)
+class ScheduledPublishingTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='sched_author')
+        cls.reader = User.objects.create_user(username='sched_reader')
+        cls.group = Group.objects.create(
+            title='Группа', slug='sched-group', description='Описание'
+        )
+        Follow.objects.create(user=cls.reader, author=cls.author)
+
+    def setUp(self):
+        self.author_client = Client()
+        self.author_client.force_login(self.author)
+        self.reader_client = Client()
+        self.reader_client.force_login(self.reader)
+
+    def schedule(self, text, delta=timedelta(hours=1)):
+        return Post.objects.create(
+            author=self.author, group=self.group, text=text,
+            publish_at=timezone.now() + delta, is_published=False
+        )
+
+    def test_create_scheduled_post(self):
+        """Пост с временем в будущем сохраняется неопубликованным,
+        время в прошлом не принимается."""
+        publish_at = timezone.localtime() + timedelta(days=1)
+        self.author_client.post(reverse('posts:post_create'), data={
+            'text': 'Отложенный пост',
+            'publish_at': publish_at.strftime('%Y-%m-%dT%H:%M'),
+        })
+        post = Post.objects.get(text='Отложенный пост')
+        self.assertFalse(post.is_published)
+        self.assertEqual(
+            post.publish_at.replace(second=0, microsecond=0),
+            publish_at.replace(second=0, microsecond=0)
+        )
+        response = self.author_client.post(
+            reverse('posts:post_create'),
+            data={'text': 'Пост в прошлое', 'publish_at': '2000-01-01T10:00'}
+        )
+        self.assertTrue(response.context['schedule_form'].errors)
+        self.assertFalse(Post.objects.filter(text='Пост в прошлое').exists())
+
+    def test_scheduled_post_is_hidden(self):
+        """Запланированный пост не виден в лентах и чужим читателям."""
+        post = self.schedule('Скрытый пост')
+        for url in (
+            reverse('posts:index'),
+            reverse('posts:group_list', kwargs={'slug': 'sched-group'}),
+            reverse('posts:profile', kwargs={'username': 'sched_author'}),
+            reverse('posts:follow_index'),
+        ):
+            with self.subTest(url=url):
+                response = self.reader_client.get(url)
+                self.assertNotIn(post, response.context['page_obj'])
+        detail = reverse('posts:post_detail', kwargs={'post_id': post.id})
+        self.assertEqual(self.reader_client.get(detail).status_code, 404)
+        self.assertEqual(self.author_client.get(detail).status_code, 200)
+        response = self.author_client.get(
+            reverse('posts:profile', kwargs={'username': 'sched_author'})
+        )
+        self.assertIn(post, response.context['scheduled'])
+
+    def test_publish_due_posts(self):
+        """Наступившие посты публикуются пачками и один раз,
+        с fan-out подписчикам и обновлением индекса тегов."""
+        due = [self.schedule(f'#срочно пост {i}', -timedelta(minutes=i + 1))
+               for i in range(3)]
+        later = self.schedule('Потом')
+        self.assertFalse(FeedState.objects.filter(user=self.reader).exists())
+        self.assertEqual(publish_due(batch_size=2), 3)
+        self.assertEqual(publish_batch(), 0)
+        self.assertEqual(FeedState.objects.get(user=self.reader).unread, 3)
+        for post in due:
+            post.refresh_from_db()
+            self.assertTrue(post.is_published)
+            self.assertEqual(post.pub_date, post.publish_at)
+            self.assertEqual(
+                PostTag.objects.get(post=post).pub_date, post.publish_at
+            )
+        later.refresh_from_db()
+        self.assertFalse(later.is_published)
+
+    def test_publish_delivers_mentions(self):
+        """Упоминания в запланированном посте рассылаются при публикации."""
+        self.reader.email = 'sched_reader@yatube.ru'
+        self.reader.save()
+        post = self.schedule('Привет, @sched_reader')
+        self.assertEqual(len(mail.outbox), 0)
+        Post.objects.filter(id=post.id).update(
+            publish_at=timezone.now() - timedelta(minutes=1)
+        )
+        publish_batch()
+        self.assertEqual(
+            [message.to for message in mail.outbox],
+            [['sched_reader@yatube.ru']]
+        )
+        self.assertTrue(Mention.objects.get(post=post).notified)
+
+    def test_publish_scheduled_command(self):
+        """Команда публикует наступившие посты."""
+        self.schedule('Готов', -timedelta(minutes=1))
+        out = StringIO()
+        call_command('publish_scheduled', stdout=out)
+        self.assertIn('Опубликовано постов: 1', out.getvalue())
@@ -0,0 +1,80 @@
+from io import StringIO
+
+from django.contrib.admin.sites import site
+from django.core.management import call_command
+from django.db import connection
+from django.test import Client, RequestFactory, TestCase
+from django.urls import reverse
+
+from ..models import Post, User
+from ..search import FTS_TABLE, search_posts
+
+
+class PostSearchTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='search_user')
+        Post.objects.bulk_create(
+            Post(author=cls.user, text=f'Котики и собаки номер {i}')
+            for i in range(15)
+        )
+        cls.post = Post.objects.create(
+            author=cls.user,
+            text='Про котиков <script>alert(1)</script> котики котики',
+        )
+
+    def setUp(self):
+        self.guest_client = Client()
+
+    def test_search_page_uses_fts(self):
+        """Поиск находит посты, подсвечивает и экранирует совпадения."""
+        response = self.guest_client.get(
+            reverse('posts:search'), {'q': 'котики'}
+        )
+        self.assertTemplateUsed(response, 'posts/search.html')
+        page_obj = response.context['page_obj']
+        self.assertEqual(page_obj.object_list[0], self.post)
+        self.assertIn('<mark>котики</mark>', page_obj.object_list[0].snippet)
+        self.assertNotIn('<script>', response.content.decode())
+
+    def test_cursor_pagination(self):
+        """Курсор листает все результаты без повторов."""
+        seen = []
+        cursor = None
+        while True:
+            page = search_posts('котики', cursor)
+            seen.extend(post.id for post in page)
+            if not page.has_next():
+                break
+            cursor = page.next_cursor
+        self.assertEqual(len(seen), 16)
+        self.assertEqual(len(set(seen)), 16)
+
+    def test_index_follows_updates_and_deletes(self):
+        """Триггеры обновляют индекс при правке и удалении поста."""
+        post = Post.objects.get(pk=self.post.pk)
+        post.text = 'Теперь про ежей'
+        post.save()
+        self.assertEqual(list(search_posts('ежей')), [post])
+        post.delete()
+        self.assertEqual(list(search_posts('ежей')), [])
+
+    def test_admin_search(self):
+        """Поиск в админке идёт по индексу."""
+        request = RequestFactory().get('/')
+        queryset, _ = site._registry[Post].get_search_results(
+            request, Post.objects.all(), 'script'
+        )
+        self.assertEqual(list(queryset), [self.post])
+
+    def test_rebuild_search_index(self):
+        call_command('rebuild_search_index', stdout=StringIO())
+        self.assertEqual(len(search_posts('собаки', limit=100)), 15)
+        self.post.text = 'Про кошек'
+        self.post.save()
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) "
+                "VALUES ('integrity-check')"
+            )
@@ -0,0 +1,90 @@
+import random
+import string
+
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from ..models import Post, PostFingerprint, User
+from ..simhash import MAX_DISTANCE, distance, simhash
+
+SPAM = (
+    'Только сегодня лучшие скидки на телефоны и ноутбуки в нашем магазине '
+    'переходите по ссылке и получите подарок при заказе от двух товаров '
+    'доставка по всей стране бесплатно звоните нам прямо сейчас'
+)
+# Та же рассылка со случайным хвостом и с заменённым словом.
+SPAM_SUFFIX = SPAM + ' k7q2xz9'
+SPAM_REPLACED = SPAM.replace('ноутбуки', 'планшеты')
+
+
+class SimhashTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='spammer')
+
+    def test_similar_texts_are_close(self):
+        for text in (SPAM_SUFFIX, SPAM_REPLACED):
+            with self.subTest(text=text):
+                self.assertNotEqual(simhash(text), simhash(SPAM))
+                self.assertLessEqual(
+                    distance(simhash(SPAM), simhash(text)), MAX_DISTANCE
+                )
+        self.assertGreater(
+            distance(simhash(SPAM), simhash('Совсем другой пост про котов')),
+            MAX_DISTANCE
+        )
+
+    def test_one_word_variants_are_found(self):
+        """Волна рассылки со случайным словом почти вся в пределах
+        MAX_DISTANCE: и с дописанным словом, и с заменённым."""
+        rnd = random.Random(33)
+        words = SPAM.split()
+        base = simhash(SPAM)
+
+        def token():
+            return ''.join(rnd.choices(string.ascii_lowercase, k=8))
+
+        added = replaced = 0
+        for _ in range(100):
+            added += distance(
+                base, simhash(f'{SPAM} {token()}')
+            ) <= MAX_DISTANCE
+            variant = list(words)
+            variant[rnd.randrange(len(variant))] = token()
+            replaced += distance(
+                base, simhash(' '.join(variant))
+            ) <= MAX_DISTANCE
+        self.assertGreaterEqual(added, 95)
+        self.assertGreaterEqual(replaced, 75)
+
+    def test_near_duplicates_share_cluster(self):
+        """Почти одинаковые посты попадают в кластер первого из них."""
+        first = Post.objects.create(author=self.user, text=SPAM)
+        second = Post.objects.create(author=self.user, text=SPAM_SUFFIX)
+        third = Post.objects.create(author=self.user, text=SPAM_REPLACED)
+        other = Post.objects.create(author=self.user, text='Мой кот спит')
+        self.assertEqual(second.fingerprint.cluster, first.id)
+        self.assertEqual(third.fingerprint.cluster, first.id)
+        self.assertEqual(other.fingerprint.cluster, other.id)
+
+    def test_admin_lists_clusters(self):
+        """В админке видны только кластеры из нескольких постов."""
+        first = Post.objects.create(author=self.user, text=SPAM)
+        Post.objects.create(author=self.user, text=SPAM)
+        Post.objects.create(author=self.user, text='Мой кот спит')
+        admin_user = User.objects.create_superuser(
+            'admin', 'admin@yatube.ru', 'password'
+        )
+        client = Client()
+        client.force_login(admin_user)
+        response = client.get(
+            reverse('admin:posts_postfingerprint_changelist')
+        )
+        self.assertEqual(response.status_code, 200)
+        queryset = response.context['cl'].queryset
+        self.assertEqual(queryset.count(), 2)
+        self.assertEqual({fp.cluster for fp in queryset}, {first.id})
+        self.assertIsInstance(
+            PostFingerprint.objects.get(post=first).simhash, int
+        )
@@ -0,0 +1,92 @@
+from datetime import timedelta
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from ..models import (Comment, Follow, Group, Post, TrendingDecay,
+                      TrendingPost, User)
+
+
+@override_settings(TRENDING_COMMENT_WEIGHT=1.0, TRENDING_FOLLOW_WEIGHT=0.5)
+class TrendingTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='trend_author')
+        cls.reader = User.objects.create_user(username='trend_reader')
+        cls.group = Group.objects.create(
+            title='Группа', slug='trend-group', description='Описание'
+        )
+        cls.quiet_post = Post.objects.create(
+            author=cls.author, text='Тихий пост'
+        )
+        cls.hot_post = Post.objects.create(
+            author=cls.author, text='Горячий пост', group=cls.group
+        )
+
+    def setUp(self):
+        self.guest_client = Client()
+
+    def comment(self, post, count=1):
+        for _ in range(count):
+            Comment.objects.create(
+                post=post, author=self.reader, text='Комментарий'
+            )
+
+    def test_events_update_scores(self):
+        """Комментарии и подписки поднимают счёт поста."""
+        self.comment(self.hot_post, 2)
+        Follow.objects.create(user=self.reader, author=self.author)
+        self.assertEqual(
+            TrendingPost.objects.get(post=self.hot_post).score, 2.5
+        )
+        self.assertEqual(self.group.trending.score, 2.5)
+
+    def test_trending_pages(self):
+        """Популярное упорядочено по счёту, есть вариант для группы."""
+        self.comment(self.quiet_post)
+        self.comment(self.hot_post, 3)
+        response = self.guest_client.get(reverse('posts:trending'))
+        self.assertEqual(
+            response.context['posts'], [self.hot_post, self.quiet_post]
+        )
+        self.assertEqual(response.context['hot_groups'], [self.group])
+        response = self.guest_client.get(
+            reverse('posts:group_trending', kwargs={'slug': self.group.slug})
+        )
+        self.assertEqual(response.context['posts'], [self.hot_post])
+
+    @override_settings(TRENDING_HALF_LIFE=60, TRENDING_MIN_SCORE=0.3)
+    def test_decay_prunes_old_scores(self):
+        """Затухание уменьшает счета и удаляет выдохшиеся."""
+        self.comment(self.quiet_post)
+        self.comment(self.hot_post, 4)
+        call_command('decay_trending', '--interval=120', stdout=StringIO())
+        self.assertFalse(
+            TrendingPost.objects.filter(post=self.quiet_post).exists()
+        )
+        self.assertEqual(
+            TrendingPost.objects.get(post=self.hot_post).score, 1.0
+        )
+
+    @override_settings(TRENDING_HALF_LIFE=60)
+    def test_decay_uses_time_since_last_run(self):
+        """Повторный запуск затухает на прошедшее время, а не
+        на --interval."""
+        self.comment(self.hot_post, 4)
+        TrendingDecay.objects.create(
+            pk=1, decayed=timezone.now() - timedelta(seconds=60)
+        )
+        call_command('decay_trending', '--interval=600', stdout=StringIO())
+        self.assertAlmostEqual(
+            TrendingPost.objects.get(post=self.hot_post).score, 2.0,
+            places=2
+        )
+        call_command('decay_trending', '--interval=600', stdout=StringIO())
+        self.assertAlmostEqual(
+            TrendingPost.objects.get(post=self.hot_post).score, 2.0,
+            places=2
+        )
@@ -0,0 +1,78 @@
+import shutil
+import tempfile
+
+from django.conf import settings
+from django.core.cache import cache
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from ..models import FeedState, Follow, Group, GroupFollow, Post, User
+from ..unread import unread_count
+
+TEMP_CACHE_DIR = tempfile.mkdtemp(dir=settings.BASE_DIR)
+SHARED_CACHES = {'default': {
+    'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+    'LOCATION': TEMP_CACHE_DIR,
+}}
+
+
+@override_settings(JOB_QUEUE_EAGER=True)
+class UnreadCounterTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.reader = User.objects.create_user(username='unread_reader')
+        cls.author = User.objects.create_user(username='unread_author')
+        cls.group = Group.objects.create(
+            title='Группа', slug='unread-group', description='Описание'
+        )
+        Follow.objects.create(user=cls.reader, author=cls.author)
+        GroupFollow.objects.create(user=cls.reader, group=cls.group)
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_CACHE_DIR, ignore_errors=True)
+
+    def setUp(self):
+        cache.clear()
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.reader)
+
+    def test_fan_out_counts_each_post_once(self):
+        """Пост подписанного автора в подписанной группе — одна новинка."""
+        Post.objects.create(author=self.author, text='Пост', group=self.group)
+        Post.objects.create(author=self.author, text='Ещё пост')
+        self.assertEqual(FeedState.objects.get(user=self.reader).unread, 2)
+        self.assertFalse(FeedState.objects.filter(user=self.author).exists())
+
+    @override_settings(CACHES=SHARED_CACHES)
+    def test_unread_count_is_cached(self):
+        """С общим кэшем повторное чтение счётчика не ходит в базу,
+        новый пост сбрасывает кэш."""
+        cache.clear()
+        Post.objects.create(author=self.author, text='Пост')
+        self.assertEqual(unread_count(self.reader), 1)
+        with self.assertNumQueries(0):
+            self.assertEqual(unread_count(self.reader), 1)
+        Post.objects.create(author=self.author, text='Ещё пост')
+        self.assertEqual(unread_count(self.reader), 2)
+
+    def test_process_local_cache_reads_database(self):
+        """Без общего кэша счётчик, увеличенный воркером, виден сразу."""
+        Post.objects.create(author=self.author, text='Пост')
+        self.assertEqual(unread_count(self.reader), 1)
+        FeedState.objects.filter(user=self.reader).update(unread=5)
+        self.assertEqual(unread_count(self.reader), 5)
+
+    def test_badge_and_mark_seen(self):
+        """Значок на вкладке пропадает после открытия ленты."""
+        Post.objects.create(author=self.author, text='Пост')
+        response = self.authorized_client.get(reverse('posts:trending'))
+        self.assertContains(response, 'badge')
+        self.authorized_client.get(reverse('posts:follow_index'))
+        state = FeedState.objects.get(user=self.reader)
+        self.assertEqual(state.unread, 0)
+        self.assertIsNotNone(state.last_seen)
+        response = self.authorized_client.get(reverse('posts:trending'))
+        self.assertNotContains(response, 'badge')
@@ -1,7 +1,9 @@
 import shutil
 import tempfile
 import time
+from unittest import mock
 
+from core.writer import WriteTimeout
 from django import forms
 from django.conf import settings
 from django.core.cache import cache
@@ -328,6 +330,31 @@ class PostViewsTest(TestCase):
             Follow.objects.filter(user=user, author=author).exists()
         )
 
+    def test_write_timeout_asks_to_retry(self):
+        """Если запись не дождалась очереди, пользователь получает 503
+        с Retry-After, а не ошибку сервера."""
+        follow_url = reverse('posts:profile_follow',
+                             kwargs={'username': self.author_user})
+        unfollow_url = reverse('posts:profile_unfollow',
+                               kwargs={'username': self.author_user})
+        comment_url = reverse('posts:add_comment',
+                              kwargs={'post_id': self.post.id})
+        for url in (follow_url, unfollow_url, comment_url):
+            with self.subTest(url=url):
+                if url == unfollow_url:
+                    Follow.objects.create(
+                        user=PostViewsTest.simple_user,
+                        author=self.author_user
+                    )
+                with mock.patch('posts.views.write',
+                                side_effect=WriteTimeout):
+                    response = self.authorized_client.post(
+                        url, {'text': 'Комментарий'}
+                    )
+                self.assertEqual(response.status_code, 503)
+                self.assertIn('Retry-After', response)
+                self.assertTemplateUsed(response, 'core/503.html')
+
     def test_new_post_show_in_follow_page_correctly(self):
         """ Проверка follow_index на отображение правильного контекста.
         Новая запись пользователя появляется в ленте тех,
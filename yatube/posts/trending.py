@@ -0,0 +1,89 @@
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import TrendingDecay, TrendingGroup, TrendingPost
+
+TRENDING_SIZE: int = 50
+HOT_GROUPS_SIZE: int = 10
+
+
+def bump(model, key: dict, weight: float, **defaults) -> None:
+    """Прибавляет вес к счёту, создавая строку при первом событии."""
+    if model.objects.filter(**key).update(score=F('score') + weight):
+        return
+    try:
+        with transaction.atomic():
+            model.objects.create(score=weight, **key, **defaults)
+    except IntegrityError:
+        model.objects.filter(**key).update(score=F('score') + weight)
+
+
+def record_event(post, weight: float) -> None:
+    bump(TrendingPost, {'post_id': post.id}, weight, group_id=post.group_id)
+    if post.group_id:
+        bump(TrendingGroup, {'group_id': post.group_id}, weight)
+
+
+def record_comment(comment) -> None:
+    record_event(comment.post, settings.TRENDING_COMMENT_WEIGHT)
+
+
+def record_follow(follow) -> None:
+    """Подписка на автора поднимает его последний пост."""
+    latest = follow.author.posts.published().only('id', 'group_id').first()
+    if latest is not None:
+        record_event(latest, settings.TRENDING_FOLLOW_WEIGHT)
+
+
+def decay(factor: float, min_score: float = None) -> int:
+    """Умножает все счета на factor и удаляет выдохшиеся.
+    Возвращает число удалённых строк."""
+    if min_score is None:
+        min_score = settings.TRENDING_MIN_SCORE
+    removed = 0
+    with transaction.atomic():
+        for model in (TrendingPost, TrendingGroup):
+            model.objects.update(score=F('score') * factor)
+            removed += model.objects.filter(score__lt=min_score).delete()[0]
+    return removed
+
+
+def decay_since_last(first_elapsed: float) -> tuple:
+    """Затухание за время, прошедшее с прошлого затухания. Отметка
+    хранится в базе, поэтому другое расписание или ручной повтор
+    не искажают счета; при первом запуске прошедшим считается
+    first_elapsed секунд. Возвращает (множитель, удалено строк)."""
+    now = timezone.now()
+    with transaction.atomic():
+        last = TrendingDecay.objects.select_for_update().filter(
+            pk=1
+        ).values_list('decayed', flat=True).first()
+        elapsed = first_elapsed
+        if last is not None:
+            elapsed = max((now - last).total_seconds(), 0)
+        factor = 0.5 ** (elapsed / settings.TRENDING_HALF_LIFE)
+        removed = decay(factor)
+        TrendingDecay.objects.update_or_create(
+            pk=1, defaults={'decayed': now}
+        )
+    return factor, removed
+
+
+def trending_posts(group=None, limit: int = TRENDING_SIZE):
+    # Удалённый пост остаётся в рейтинге, пока его не удалит фон.
+    queryset = TrendingPost.objects.select_related(
+        'post__author', 'post__group'
+    ).filter(post__is_published=True).order_by('-score')
+    if group is not None:
+        queryset = queryset.filter(group=group)
+    return [entry.post for entry in queryset[:limit]]
+
+
+def hot_groups(limit: int = HOT_GROUPS_SIZE):
+    return [
+        entry.group for entry in
+        TrendingGroup.objects.select_related('group')
+        .order_by('-score')[:limit]
+    ]
@@ -0,0 +1,81 @@
+from core.cache import shared_cache
+from django.db.models import F
+from django.utils import timezone
+
+from .models import FeedState, Follow, GroupFollow
+
+UNREAD_CACHE_TIMEOUT: int = 24 * 60 * 60
+
+
+def cache_key(user_id: int) -> str:
+    return f'posts:unread:{user_id}'
+
+
+def subscribers(post):
+    """id подписчиков автора и группы поста, без повторов и без автора."""
+    readers = set(
+        Follow.objects.filter(author_id=post.author_id)
+        .values_list('user_id', flat=True)
+    )
+    if post.group_id:
+        readers.update(
+            GroupFollow.objects.filter(group_id=post.group_id)
+            .values_list('user_id', flat=True)
+        )
+    readers.discard(post.author_id)
+    return readers
+
+
+def fan_out(posts) -> int:
+    """Увеличивает счётчики новых постов у подписчиков.
+    Одна пачка запросов на вызов, а не на подписчика."""
+    increments = {}
+    for post in posts:
+        for user_id in subscribers(post):
+            increments[user_id] = increments.get(user_id, 0) + 1
+    if not increments:
+        return 0
+    FeedState.objects.bulk_create(
+        (FeedState(user_id=user_id) for user_id in increments),
+        ignore_conflicts=True,
+    )
+    by_count = {}
+    for user_id, count in increments.items():
+        by_count.setdefault(count, []).append(user_id)
+    for count, user_ids in by_count.items():
+        FeedState.objects.filter(user_id__in=user_ids).update(
+            unread=F('unread') + count
+        )
+    cache = shared_cache()
+    if cache is not None:
+        cache.delete_many([cache_key(user_id) for user_id in increments])
+    return len(increments)
+
+
+def mark_seen(user) -> None:
+    """Пользователь открыл ленту подписок: новых постов больше нет."""
+    FeedState.objects.update_or_create(
+        user=user, defaults={'last_seen': timezone.now(), 'unread': 0}
+    )
+    cache = shared_cache()
+    if cache is not None:
+        cache.set(cache_key(user.id), 0, UNREAD_CACHE_TIMEOUT)
+
+
+def unread_count(user) -> int:
+    """Число новых постов в ленте: из общего кэша, при промахе — одна
+    строка FeedState по первичному ключу. Счётчик растёт в процессе
+    воркера, поэтому без общего кэша он всегда читается из базы."""
+    if not user.is_authenticated:
+        return 0
+    cache = shared_cache()
+    key = cache_key(user.id)
+    count = cache.get(key) if cache is not None else None
+    if count is None:
+        count = (
+            FeedState.objects.filter(user=user)
+            .values_list('unread', flat=True).first()
+        ) or 0
+        if cache is not None:
+            cache.set(key, count, UNREAD_CACHE_TIMEOUT)
+    return count
@@ -1,4 +1,7 @@
+from django.core import signing
 from django.core.paginator import Paginator
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
 
 POST_NUMB: int = 10
 
@@ -8,3 +11,64 @@ def my_paginator(request, items_list):
     page_number = request.GET.get('page')
     page_obj = paginator.get_page(page_number)
     return page_obj
+
+
+class CursorPage:
+    """Страница курсорной пагинации.
+    Вместо номера страницы хранит подписанный курсор последней
+    записи, поэтому глубокие страницы не требуют OFFSET."""
+
+    def __init__(self, object_list, next_cursor=None):
+        self.object_list = object_list
+        self.next_cursor = next_cursor
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def has_next(self):
+        return self.next_cursor is not None
+
+
+def dump_cursor(value, salt: str) -> str:
+    return signing.dumps(value, salt=salt, compress=True)
+
+
+def load_cursor(cursor, salt: str):
+    """Разбирает курсор из GET-параметра; битый курсор — первая страница."""
+    if not cursor:
+        return None
+    try:
+        return signing.loads(cursor, salt=salt)
+    except signing.BadSignature:
+        return None
+
+
+def keyset_paginator(request, queryset, salt: str,
+                     date_field: str = 'pub_date', id_field: str = 'id',
+                     limit: int = POST_NUMB):
+    """Курсорная пагинация по убыванию (date_field, id_field).
+    Следующая страница читается условием по индексу, а не OFFSET,
+    поэтому стоит одинаково на любой глубине."""
+    after = load_cursor(request.GET.get('cursor'), salt)
+    if after:
+        after_date, after_id = parse_datetime(after[0]), after[1]
+        queryset = queryset.filter(
+            Q(**{f'{date_field}__lt': after_date})
+            | Q(**{date_field: after_date, f'{id_field}__lt': after_id})
+        )
+    items = list(
+        queryset.order_by(f'-{date_field}', f'-{id_field}')[:limit + 1]
+    )
+    next_cursor = None
+    if len(items) > limit:
+        items = items[:limit]
+        last = items[-1]
+        next_cursor = dump_cursor(
+            [getattr(last, date_field).isoformat(),
+             getattr(last, id_field)],
+            salt
+        )
+    return CursorPage(items, next_cursor)
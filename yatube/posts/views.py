@@ -1,68 +1,120 @@
 from typing import Any
 
+from core.deletion import is_scheduled_for_deletion, scheduled_deletions
+from core.jobs import enqueue
+from core.routers import read_replica
+from core.writer import write, write_view
 from django.contrib.auth.decorators import login_required
+from django.db.models.functions import Length
+from django.http import Http404
 from django.shortcuts import get_object_or_404, redirect, render
+from django.utils import timezone
 from django.views.decorators.cache import cache_page
 
-from .forms import CommentForm, PostForm
-from .models import Follow, Group, Post, User
-from .utils import my_paginator
+from .archive import ArchiveChain
+from .counters import view_counter
+from .feed import subscription_feed
+from .forms import CommentForm, PostForm, ScheduleForm
+from .lookups import get_group_or_404, get_user_or_404, load_related
+from .models import (ArchivedPost, Follow, GroupFollow, Post, PostTag, Tag,
+                     User)
+from .recommendations import recommendations_for
+from .revisions import revision_text
+from .search import search_posts
+from .tasks import warm_thumbnails
+from .trending import hot_groups, trending_posts
+from .unread import mark_seen
+from .utils import keyset_paginator, my_paginator
 
 CACHE_TIME: int = 3
 
 
 @cache_page(CACHE_TIME)
+@read_replica
 def index(request):
     """ Обработчик для главной страницы."""
+    page_obj = my_paginator(
+        request, Post.objects.published().select_related('group')
+    )
+    page_obj.object_list = load_related(page_obj.object_list, 'author')
     context = {
-        'page_obj': my_paginator(
-            request,
-            Post.objects.select_related('group')
-        )
+        'page_obj': page_obj
     }
     return render(request, 'posts/index.html', context)
 
 
+@read_replica
 def group_posts(request, slug: Any):
     """ Обработчик для страницы группы."""
-    group = get_object_or_404(Group, slug=slug)
-    items_list = group.posts.all()
+    group = get_group_or_404(slug)
+    items_list = group.posts.published()
     page_obj = my_paginator(request, items_list)
+    page_obj.object_list = load_related(page_obj.object_list, 'author')
     context = {
         'page_obj': page_obj,
-        'group': group
+        'group': group,
+        'group_following': GroupFollow.objects.filter(
+            user=request.user.id, group=group
+        ).exists(),
     }
     return render(request, 'posts/group_list.html', context)
 
 
+@read_replica
 def profile(request, username: str):
     """ Обработчик для страницы профиля автора."""
-    author = get_object_or_404(User, username=username)
-    author_posts = author.posts.all()
+    author = get_user_or_404(username)
+    # Архив автора, поставленного на удаление, скрыт, как и его посты.
+    archived = author.archived_posts.select_related('group')
+    author_posts = ArchiveChain(
+        author.posts.published(),
+        archived.none() if is_scheduled_for_deletion(author) else archived,
+    )
     posts_count = author_posts.count()
     page_obj = my_paginator(request, author_posts)
     context = {
         'page_obj': page_obj,
         'author': author,
         'posts_count': posts_count,
+        'scheduled': (
+            author.posts.filter(is_published=False, is_deleted=False)
+            .order_by('publish_at')
+            if request.user == author else ()
+        ),
         'following':
             request.user != author
             and Follow.objects.filter(user=request.user.id,
                                       author=author).exists(),
+        'recommendations': recommendations_for(request.user),
     }
     return render(request, 'posts/profile.html', context)
 
 
+def visible_post(request, post_id: int):
+    """Пост по id; запланированный видит только его автор,
+    удалённый — никто."""
+    post = get_object_or_404(Post, id=post_id, is_deleted=False)
+    if not post.is_published and request.user.id != post.author_id:
+        raise Http404
+    return post
+
+
+@read_replica
 def post_detail(request, post_id: int):
     """ Обработчик для страницы поста.
     Автор поста может перейти на страницу редакции поста,
     остальные пользователи могут только просматривать пост."""
-    post = get_object_or_404(Post, id=post_id)
-    posts_count = post.author.posts.count()
-    comments = post.comments.all()
+    try:
+        post = visible_post(request, post_id)
+    except Http404:
+        return archived_post_detail(request, post_id)
+    view_counter.hit(post.id)
+    posts_count = author_posts_count(post.author)
+    comments = post.comments.filter(is_deleted=False)
     form = CommentForm(request.POST or None)
     context = {
         'posts_count': posts_count,
+        'views': post.views + view_counter.buffered(post.id),
         'post': post,
         'form': form,
         'comments': comments,
@@ -70,17 +122,104 @@ def post_detail(request, post_id: int):
     return render(request, 'posts/post_detail.html', context)
 
 
+def author_posts_count(author) -> int:
+    return (
+        author.posts.published().count() + author.archived_posts.count()
+    )
+
+
+def archived_post(post_id: int):
+    """Пост из архива (posts.archive). Архив автора, поставленного
+    на удаление (core.deletion), скрыт до конца удаления."""
+    post = get_object_or_404(
+        ArchivedPost.objects.select_related('author', 'group'), id=post_id
+    )
+    if is_scheduled_for_deletion(post.author):
+        raise Http404
+    return post
+
+
+def readable_post(request, post_id: int):
+    """Пост из основной таблицы, а если его там нет — из архива."""
+    try:
+        return visible_post(request, post_id)
+    except Http404:
+        return archived_post(post_id)
+
+
+def archived_post_detail(request, post_id: int):
+    """ Страница поста, перенесённого в архив (posts.archive).
+    Архивный пост только читается: без правки и новых комментариев."""
+    post = archived_post(post_id)
+    context = {
+        'posts_count': author_posts_count(post.author),
+        'views': post.views,
+        'post': post,
+        'comments': post.comments.exclude(
+            author_id__in=scheduled_deletions(User)
+        ),
+        'archived': True,
+    }
+    return render(request, 'posts/post_detail.html', context)
+
+
+def post_history(request, post_id: int):
+    """ Обработчик для страницы истории правок поста.
+    Данные версий не распаковываются, только их размер."""
+    post = readable_post(request, post_id)
+    revisions = post.revisions.annotate(size=Length('data')).values(
+        'number', 'is_snapshot', 'created', 'size'
+    )
+    context = {
+        'post': post,
+        'revisions': revisions,
+    }
+    return render(request, 'posts/post_history.html', context)
+
+
+def post_revision(request, post_id: int, number: int):
+    """ Обработчик для страницы одной версии поста."""
+    post = readable_post(request, post_id)
+    text = revision_text(post, number)
+    if text is None:
+        raise Http404
+    context = {
+        'post': post,
+        'number': number,
+        'text': text,
+    }
+    return render(request, 'posts/post_revision.html', context)
+
+
+def warm_image_thumbnails(post) -> None:
+    if post.image:
+        enqueue(
+            warm_thumbnails, post.image.name,
+            key=f'thumbnails:{post.image.name}'
+        )
+
+
 @login_required
 def post_create(request):
     """ Обработчик для страницы создания поста.
-    Авторизованные пользователи через форму могут создать новый пост."""
+    Авторизованные пользователи через форму могут создать новый пост,
+    сразу или отложенно."""
     form = PostForm(request.POST or None, files=request.FILES or None)
-    if request.method == 'POST' and form.is_valid():
+    schedule_form = ScheduleForm(request.POST or None)
+    if (request.method == 'POST' and form.is_valid()
+            and schedule_form.is_valid()):
         new_post = form.save(commit=False)
         new_post.author = request.user
+        new_post.publish_at = schedule_form.cleaned_data['publish_at']
+        new_post.is_published = new_post.publish_at is None
         new_post.save()
+        warm_image_thumbnails(new_post)
         return redirect('posts:profile', request.user)
-    return render(request, 'posts/create_post.html', {'form': form})
+    context = {
+        'form': form,
+        'schedule_form': schedule_form,
+    }
+    return render(request, 'posts/create_post.html', context)
 
 
 @login_required
@@ -88,7 +227,7 @@ def post_edit(request, post_id: int):
     """ Обработчик для страницы редактирования поста.
     Авторизованный пользователь, являющийся автором поста, может править пост.
     is_edit передается в HTML-шаблон, меняя его на редактирование."""
-    post = get_object_or_404(Post, id=post_id)
+    post = get_object_or_404(Post, id=post_id, is_deleted=False)
     if request.user.id != post.author_id:
         return redirect('posts:post_detail', post_id=post_id)
     form = PostForm(
@@ -96,11 +235,25 @@ def post_edit(request, post_id: int):
         files=request.FILES or None,
         instance=post
     )
-    if request.method == 'POST' and form.is_valid():
-        form.save()
+    # Время публикации можно менять, пока пост не опубликован.
+    schedule_form = None if post.is_published else ScheduleForm(
+        request.POST or None, initial={'publish_at': post.publish_at}
+    )
+    if (request.method == 'POST' and form.is_valid()
+            and (schedule_form is None or schedule_form.is_valid())):
+        post = form.save(commit=False)
+        if schedule_form is not None:
+            # Пустое время — опубликовать при следующем запуске
+            # publish_scheduled.
+            post.publish_at = (
+                schedule_form.cleaned_data['publish_at'] or timezone.now()
+            )
+        post.save()
+        warm_image_thumbnails(post)
         return redirect('posts:post_detail', post_id=post_id)
     context = {
         'form': form,
+        'schedule_form': schedule_form,
         'post': post,
         'is_edit': True,
     }
@@ -108,50 +261,119 @@ def post_edit(request, post_id: int):
 
 
 @login_required
+@write_view
 def add_comment(request, post_id):
     """ Обработчик добавления комментариев на post_detail."""
     form = CommentForm(request.POST or None)
     if form.is_valid():
         comment = form.save(commit=False)
         comment.author = request.user
-        comment.post = get_object_or_404(Post, id=post_id)
-        comment.save()
+        comment.post = get_object_or_404(Post, id=post_id, is_deleted=False)
+        write(comment.save)
     return redirect('posts:post_detail', post_id=post_id)
 
 
 @login_required
+@read_replica
 def follow_index(request):
-    items_list = (
-        Post.objects.filter(
-            author__following__user=request.user
-        )
-    )
-    page_obj = my_paginator(request, items_list)
+    """ Обработчик для ленты подписок на авторов и группы."""
+    page_obj = my_paginator(request, subscription_feed(request.user))
+    mark_seen(request.user)
     context = {
         'page_obj': page_obj,
+        'recommendations': recommendations_for(request.user),
     }
     return render(request, 'posts/follow.html', context)
 
 
 @login_required
+@write_view
 def profile_follow(request, username):
-    if request.user.username != username and not Follow.objects.filter(
+    author = get_user_or_404(username)
+    if request.user != author and not Follow.objects.filter(
         user=request.user,
-        author=User.objects.get(username=username)
+        author=author
     ).exists():
-        Follow.objects.create(
-            user=request.user,
-            author=User.objects.get(username=username)
-        )
+        write(Follow.objects.create, user=request.user, author=author)
     return redirect('posts:profile', username=username)
 
 
 @login_required
+@write_view
 def profile_unfollow(request, username):
     follow_req = Follow.objects.filter(
         user=request.user,
-        author=User.objects.get(username=username)
+        author=get_user_or_404(username)
     )
     if follow_req:
-        follow_req.delete()
+        write(follow_req.delete)
     return redirect('posts:profile', username=username)
+
+
+@login_required
+def group_follow(request, slug):
+    group = get_group_or_404(slug)
+    GroupFollow.objects.get_or_create(user=request.user, group=group)
+    return redirect('posts:group_list', slug=slug)
+
+
+@login_required
+def group_unfollow(request, slug):
+    GroupFollow.objects.filter(user=request.user, group__slug=slug).delete()
+    return redirect('posts:group_list', slug=slug)
+
+
+def search(request):
+    """ Обработчик для страницы поиска по текстам постов.
+    Лучшие совпадения первыми, страницы листаются курсором."""
+    query = request.GET.get('q', '').strip()
+    context = {
+        'query': query,
+        'page_obj': search_posts(query, request.GET.get('cursor')),
+    }
+    return render(request, 'posts/search.html', context)
+
+
+def tag_posts(request, name: str):
+    """ Обработчик для ленты постов с #тегом.
+    Читает обратный индекс по (tag, -pub_date) с курсором."""
+    tag = get_object_or_404(Tag, name=name.lower())
+    page_obj = keyset_paginator(
+        request,
+        PostTag.objects.filter(
+            tag=tag, post__is_published=True
+        ).select_related(
+            'post__author', 'post__group'
+        ),
+        salt='posts.tag',
+        id_field='post_id',
+    )
+    page_obj.object_list = [link.post for link in page_obj.object_list]
+    context = {
+        'page_obj': page_obj,
+        'tag': tag,
+    }
+    return render(request, 'posts/tag_list.html', context)
+
+
+def trending(request):
+    """ Обработчик для страницы популярных постов.
+    Читает верхушку заранее посчитанного рейтинга."""
+    context = {
+        'posts': trending_posts(),
+        'hot_groups': hot_groups(),
+        'trending': True,
+    }
+    return render(request, 'posts/trending.html', context)
+
+
+def group_trending(request, slug: Any):
+    """ Обработчик для популярных постов группы."""
+    group = get_group_or_404(slug)
+    context = {
+        'posts': trending_posts(group),
+        'hot_groups': hot_groups(),
+        'group': group,
+        'trending': True,
+    }
+    return render(request, 'posts/trending.html', context)
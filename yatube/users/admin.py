@@ -0,0 +1,17 @@
+from core.admin import BackgroundDeletionMixin
+from django.contrib import admin
+from django.contrib.auth import get_user_model
+from django.contrib.auth.admin import UserAdmin
+from posts.deletion import soft_delete_user
+
+User = get_user_model()
+
+
+class BackgroundDeletionUserAdmin(BackgroundDeletionMixin, UserAdmin):
+    """Пользователь с тысячами постов удаляется в фоне пачками,
+    а не одной транзакцией на всё время каскада."""
+    soft_delete = staticmethod(soft_delete_user)
+
+
+admin.site.unregister(User)
+admin.site.register(User, BackgroundDeletionUserAdmin)
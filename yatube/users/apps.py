@@ -1,5 +1,15 @@
 from django.apps import AppConfig
+from django.conf import settings
+from django.db.models.signals import post_delete, post_save
 
 
 class UsersConfig(AppConfig):
     name = 'users'
+
+    def ready(self):
+        from . import signals
+
+        for signal in (post_save, post_delete):
+            signal.connect(
+                signals.forget_cached_user, sender=settings.AUTH_USER_MODEL
+            )
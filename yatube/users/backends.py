@@ -0,0 +1,28 @@
+from core.cache import shared_cache
+from django.conf import settings
+from django.contrib.auth.backends import ModelBackend
+
+
+def user_cache_key(user_id) -> str:
+    return f'users:auth:{user_id}'
+
+
+class CachedModelBackend(ModelBackend):
+    """ModelBackend, который держит пользователя запроса в кэше
+    AUTH_USER_CACHE_TIMEOUT секунд вместо чтения строки auth_user
+    на каждый запрос. Кэш сбрасывается при сохранении и удалении
+    пользователя (users.signals), в том числе при смене пароля.
+    Без общего кэша работает как ModelBackend."""
+
+    def get_user(self, user_id):
+        cache = shared_cache()
+        if cache is None:
+            return super().get_user(user_id)
+        key = user_cache_key(user_id)
+        user = cache.get(key)
+        if user is None:
+            user = super().get_user(user_id)
+            if user is None:
+                return None
+            cache.set(key, user, settings.AUTH_USER_CACHE_TIMEOUT)
+        return user if self.user_can_authenticate(user) else None
@@ -0,0 +1,10 @@
+from core.cache import shared_cache
+
+from .backends import user_cache_key
+
+
+def forget_cached_user(sender, instance, **kwargs):
+    """Пользователь изменился или удалён: в кэше он больше не верен."""
+    cache = shared_cache()
+    if cache is not None:
+        cache.delete(user_cache_key(instance.pk))
@@ -0,0 +1,98 @@
+import shutil
+import tempfile
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from ..backends import CachedModelBackend, user_cache_key
+
+User = get_user_model()
+
+TEMP_CACHE_DIR = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+
+@override_settings(
+    CACHES={'default': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': TEMP_CACHE_DIR,
+    }},
+    SESSION_ENGINE='django.contrib.sessions.backends.cached_db',
+)
+class CachedAuthTest(TestCase):
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_CACHE_DIR, ignore_errors=True)
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(
+            username='cached', password='old-Passw0rd'
+        )
+        self.client = Client()
+        self.client.login(username='cached', password='old-Passw0rd')
+
+    def test_user_is_read_once(self):
+        backend = CachedModelBackend()
+        with self.assertNumQueries(1):
+            backend.get_user(self.user.pk)
+        with self.assertNumQueries(0):
+            self.assertEqual(backend.get_user(self.user.pk), self.user)
+
+    def test_authenticated_request_skips_session_and_user_tables(self):
+        """Сессия и пользователь приходят из кэша."""
+        url = reverse('about:author')
+        self.client.get(url)
+        with self.assertNumQueries(0):
+            response = self.client.get(url)
+        self.assertEqual(response.wsgi_request.user, self.user)
+
+    def test_inactive_user_is_not_resolved(self):
+        backend = CachedModelBackend()
+        backend.get_user(self.user.pk)
+        self.user.is_active = False
+        self.user.save()
+        self.assertIsNone(cache.get(user_cache_key(self.user.pk)))
+        self.assertIsNone(backend.get_user(self.user.pk))
+
+    def test_password_change_invalidates_cached_user(self):
+        """После смены пароля другие сессии пользователя закрываются,
+        а сменившая пароль остаётся."""
+        other = Client()
+        other.login(username='cached', password='old-Passw0rd')
+        other.get(reverse('about:author'))
+        response = self.client.post(reverse('users:password_change'), {
+            'old_password': 'old-Passw0rd',
+            'new_password1': 'new-Passw0rd',
+            'new_password2': 'new-Passw0rd',
+        })
+        self.assertEqual(response.status_code, 302)
+        self.assertTrue(
+            self.client.get(reverse('about:author'))
+            .wsgi_request.user.is_authenticated
+        )
+        self.assertFalse(
+            other.get(reverse('about:author'))
+            .wsgi_request.user.is_authenticated
+        )
+
+
+class ProcessLocalCacheTest(TestCase):
+    def test_sessions_stay_in_database(self):
+        """С кэшем одного процесса сессии не кэшируются."""
+        self.assertEqual(
+            settings.SESSION_ENGINE, 'django.contrib.sessions.backends.db'
+        )
+
+    def test_user_is_not_cached_in_locmem(self):
+        """Кэш одного процесса пользователей не хранит: сброс при смене
+        пароля не дошёл бы до других процессов."""
+        user = User.objects.create_user(username='uncached')
+        backend = CachedModelBackend()
+        backend.get_user(user.pk)
+        self.assertIsNone(cache.get(user_cache_key(user.pk)))
+        with self.assertNumQueries(1):
+            self.assertEqual(backend.get_user(user.pk), user)
@@ -39,8 +39,10 @@ MIDDLEWARE = [
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'core.middleware.IdentityMapMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'core.middleware.PrimaryStickinessMiddleware',
 ]
 
 ROOT_URLCONF = 'yatube.urls'
@@ -59,6 +61,7 @@ TEMPLATES = [
                 'django.contrib.auth.context_processors.auth',
                 'django.contrib.messages.context_processors.messages',
                 'core.context_processors.year.year',
+                'core.context_processors.unread.unread',
             ],
         },
     },
@@ -69,11 +72,57 @@ WSGI_APPLICATION = 'yatube.wsgi.application'
 
 DATABASES = {
     'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
+        'ENGINE': 'core.backends.sqlite3',
         'NAME': os.path.join(BASE_DIR, 'db.sqlite3'),
+        # Соединение живёт между запросами, перед запросом
+        # core.db.check_connections проверяет, что файл базы тот же.
+        'CONN_MAX_AGE': 60,
     }
 }
 
+# Реплика для чтения — снимок основной базы (manage.py sync_replica).
+# Включается путём к файлу в YATUBE_REPLICA_DB.
+if os.environ.get('YATUBE_REPLICA_DB'):
+    DATABASES['replica'] = {
+        'ENGINE': 'core.backends.sqlite3',
+        'NAME': os.environ['YATUBE_REPLICA_DB'],
+        'CONN_MAX_AGE': 60,
+        'PRAGMAS': {'journal_mode': 'DELETE', 'query_only': 1},
+        'TEST': {'MIRROR': 'default'},
+    }
+
+DATABASE_ROUTERS = ['core.routers.PrimaryReplicaRouter']
+
+# После записи чтения пользователя идут в основную базу, пока в реплику
+# не придёт снимок новее его записи (core.routers.is_sticky). Это лишь
+# верхняя граница на случай, если sync_replica остановился.
+REPLICA_STICKY_SECONDS = 5 * 60
+
+# Мелкие записи (комментарии, подписки, счётчики) выполняет один
+# поток-писатель процесса пачками (core.writer). Запись, не начатая
+# за WRITE_FUNNEL_TIMEOUT секунд, отменяется.
+# Писатель общий только для потоков одного процесса, поэтому включать
+# его имеет смысл лишь с многопоточными воркерами и немногими
+# процессами, например
+#   gunicorn yatube.wsgi --worker-class gthread --workers 2 --threads 25
+# С синхронными воркерами процесс обслуживает один запрос за раз,
+# пачек не бывает, и процессы по-прежнему ждут друг друга
+# на BEGIN IMMEDIATE. Сравнение раскладок: manage.py bench_write_funnel.
+WRITE_FUNNEL = False
+WRITE_FUNNEL_TIMEOUT = 5
+
+# Прагмы для каждого нового соединения с SQLite (core.db).
+# WAL даёт читателям работать параллельно с писателем, busy_timeout
+# заставляет ждать блокировку, а не падать с «database is locked».
+SQLITE_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'busy_timeout': 5000,
+    'mmap_size': 256 * 1024 * 1024,
+    'cache_size': -64 * 1024,
+    'temp_store': 'MEMORY',
+}
+
 
 AUTH_PASSWORD_VALIDATORS = [
     {
@@ -106,6 +155,13 @@ STATIC_URL = '/static/'
 
 STATICFILES_DIRS = (os.path.join(BASE_DIR, 'static'),)
 
+STATIC_ROOT = os.path.join(BASE_DIR, 'collected_static')
+
+# collectstatic кладёт файлы с хэшем в имени и сжатые копии .gz/.br.
+STATICFILES_STORAGE = 'core.storage.CompressedManifestStaticFilesStorage'
+
+STATIC_CACHE_MAX_AGE = 60 * 60
+
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
@@ -115,7 +171,12 @@ LOGIN_URL = 'users:login'
 
 LOGIN_REDIRECT_URL = 'posts:index'
 
-EMAIL_BACKEND = 'django.core.mail.backends.filebased.EmailBackend'
+# Письма из запросов только ставятся в очередь (core.mail), отправляет
+# их воркер через QUEUED_EMAIL_BACKEND одним соединением на пачку.
+EMAIL_BACKEND = 'core.mail.QueuedEmailBackend'
+QUEUED_EMAIL_BACKEND = 'django.core.mail.backends.filebased.EmailBackend'
+EMAIL_BATCH_SIZE = 100
+EMAIL_MAX_ATTEMPTS = 5
 
 EMAIL_FILE_PATH = os.path.join(BASE_DIR, 'sent_emails')
 
@@ -129,3 +190,60 @@ CACHES = {
     }
 }
 CSRF_FAILURE_VIEW = 'core.views.csrf_failure'
+
+# С общим для процессов кэшем (memcached, файловым) сессии читаются
+# из кэша, в базу идут только при промахе и записи. LocMemCache у
+# каждого процесса свой: выход из аккаунта в одном процессе не был бы
+# виден остальным, поэтому с ним сессии хранятся только в базе.
+SHARED_CACHE = CACHES['default']['BACKEND'] not in (
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.dummy.DummyCache',
+)
+SESSION_ENGINE = (
+    'django.contrib.sessions.backends.cached_db' if SHARED_CACHE
+    else 'django.contrib.sessions.backends.db'
+)
+
+# Пользователь запроса тоже берётся из кэша; сохранение пользователя,
+# в том числе смена пароля, сбрасывает запись (users.signals).
+# С LocMemCache у каждого процесса свой кэш и сброс не дошёл бы
+# до остальных, поэтому пользователь тогда читается из базы.
+AUTHENTICATION_BACKENDS = ['users.backends.CachedModelBackend']
+AUTH_USER_CACHE_TIMEOUT = 60
+
+DEFAULT_FILE_STORAGE = 'core.storage.ContentHashStorage'
+
+# Миниатюры sorl называются по ключу исходника и уже уникальны,
+# хранилище с адресацией по содержимому им не нужно.
+THUMBNAIL_STORAGE = 'django.core.files.storage.FileSystemStorage'
+
+# Медиафайлы отдаёт core.views.serve_media. В продакшене тело файла
+# должен отдавать прокси: 'X-Accel-Redirect' для nginx (internal-локация
+# MEDIA_ACCEL_REDIRECT_URL с alias на MEDIA_ROOT) или 'X-Sendfile'.
+MEDIA_SENDFILE_HEADER = None
+MEDIA_ACCEL_REDIRECT_URL = '/protected-media/'
+MEDIA_CACHE_MAX_AGE = 60 * 60
+
+# Просмотры постов копятся в памяти воркера и пишутся в базу пачкой
+# при очередном просмотре, когда прошёл интервал или набрался размер.
+VIEW_COUNTER_FLUSH_INTERVAL = 10
+VIEW_COUNTER_FLUSH_SIZE = 500
+
+# Популярное: вес событий и затухание счёта вдвое за TRENDING_HALF_LIFE секунд.
+TRENDING_COMMENT_WEIGHT = 1.0
+TRENDING_FOLLOW_WEIGHT = 0.5
+TRENDING_HALF_LIFE = 6 * 60 * 60
+TRENDING_MIN_SCORE = 0.05
+
+# Фоновые задачи core.jobs выполняет manage.py run_worker.
+# JOB_QUEUE_EAGER выполняет их сразу при постановке, без воркера.
+JOB_QUEUE_EAGER = False
+JOB_MAX_ATTEMPTS = 5
+JOB_RETRY_BACKOFF = 10
+JOB_RETRY_MAX_DELAY = 60 * 60
+JOB_VISIBILITY_TIMEOUT = 5 * 60
+JOB_RETENTION = 7 * 24 * 60 * 60
+
+# Посты старше POST_ARCHIVE_DAYS дней manage.py archive_posts переносит
+# в архивные таблицы; страницы поста и профиля читают их прозрачно.
+POST_ARCHIVE_DAYS = 365